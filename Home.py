@@ -1,11 +1,16 @@
 import streamlit as st
 from PIL import Image
 
+from utils.warmup import start_warmup
+
 st.set_page_config(
     page_title="Home",
     page_icon="🎲"
 )
 
+# pré-cálculo dos estados mais usados dos filtros das páginas, uma vez por processo
+start_warmup('train.csv')
+
 image = Image.open('logo.png')
 st.sidebar.image( image,width=120)
 
@@ -0,0 +1 @@
+"""Benchmarks das etapas do dashboard ( executar com python -m benchmarks.<nome> )."""
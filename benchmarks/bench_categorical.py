@@ -0,0 +1,66 @@
+"""
+    Benchmark das colunas categóricas: compara memória e tempo dos groupby e
+    dos filtros do dashboard com as colunas como texto ( object ) e como
+    categóricas ( formato gerado pelo clean_code ).
+
+    Uso: python -m benchmarks.bench_categorical --csv train.csv --repeat 5
+"""
+# importando bibliotecas
+import argparse
+import time
+
+from utils.dataset import CATEGORIES, clean_code, read_dataset
+
+# Operações do dashboard que dependem das colunas categóricas
+OPERACOES = {
+    'traffic_order_city': lambda df: (df.loc[:, ['ID', 'City', 'Road_traffic_density']]
+                                        .groupby(['Road_traffic_density', 'City'], observed=True)
+                                        .count()),
+    'avg_std_time_on_traffic': lambda df: (df.loc[:, ['City', 'Time_taken(min)', 'Road_traffic_density']]
+                                             .groupby(['City', 'Road_traffic_density'], observed=True)
+                                             .agg({'Time_taken(min)': ['mean', 'std']})),
+    'top_delivers': lambda df: (df.loc[:, ['Time_taken(min)', 'Delivery_person_ID', 'City']]
+                                  .groupby(['City', 'Delivery_person_ID'], observed=True)
+                                  .max()),
+    'ratings por entregador': lambda df: (df.loc[:, ['Delivery_person_Ratings', 'Delivery_person_ID']]
+                                            .groupby('Delivery_person_ID', observed=True)
+                                            .mean()),
+    'filtro isin': lambda df: df.loc[df['Road_traffic_density'].isin(['Low', 'Jam'])
+                                     & df['Weatherconditions'].isin(['conditions Sunny', 'conditions Fog']), :],
+}
+
+def melhor_tempo(func, repeat):
+    """Retorna o melhor tempo ( em ms ) entre `repeat` execuções."""
+    melhor = float('inf')
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='train.csv')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    categorico = clean_code(read_dataset(args.csv))
+    texto = categorico.astype({col: object for col in CATEGORIES})
+
+    colunas = list(CATEGORIES)
+    mem_texto = texto[colunas].memory_usage(deep=True).sum()
+    mem_cat = categorico[colunas].memory_usage(deep=True).sum()
+    print(f'{len(categorico)} linhas')
+    print(f'memória das colunas categóricas: object {mem_texto / 2**20:.1f} MiB, '
+          f'category {mem_cat / 2**20:.1f} MiB ({mem_texto / mem_cat:.1f}x menor)')
+    print(f'memória do dataframe inteiro: object {texto.memory_usage(deep=True).sum() / 2**20:.1f} MiB, '
+          f'category {categorico.memory_usage(deep=True).sum() / 2**20:.1f} MiB')
+
+    print(f'{"operação":<26} {"object":>10} {"category":>10} {"ganho":>8}')
+    for nome, operacao in OPERACOES.items():
+        t_texto = melhor_tempo(lambda: operacao(texto), args.repeat)
+        t_cat = melhor_tempo(lambda: operacao(categorico), args.repeat)
+        print(f'{nome:<26} {t_texto:8.1f}ms {t_cat:8.1f}ms {t_texto / t_cat:7.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+    Benchmark da limpeza do dataset: compara a versão original do clean_code
+    (várias cópias e apply linha a linha) com a versão vetorizada de
+    utils.dataset.
+
+    Uso: python -m benchmarks.bench_clean_code --csv train.csv --repeat 5
+"""
+# importando bibliotecas
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+from utils.dataset import CATEGORIES, clean_code, read_dataset
+
+def clean_code_original(df):
+    """Cópia da versão original do clean_code, usada como referência."""
+    df.loc[:, 'ID'] = df.loc[:, 'ID'].str.strip()
+    df.loc[:, 'Road_traffic_density'] = df.loc[:, 'Road_traffic_density'].str.strip()
+    df.loc[:, 'Type_of_order'] = df.loc[:, 'Type_of_order'].str.strip()
+    df.loc[:, 'Type_of_vehicle'] = df.loc[:, 'Type_of_vehicle'].str.strip()
+    df.loc[:, 'City'] = df.loc[:, 'City'].str.strip()
+
+    df = df.loc[df['Delivery_person_Age'] != 'NaN ', :]
+    df = df.loc[df['Festival'] != 'NaN ', :]
+    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype(int)
+    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype(float)
+    df['Order_Date'] = pd.to_datetime(df['Order_Date'], format='%d-%m-%Y')
+    df = df.loc[df['multiple_deliveries'] != 'NaN ', :]
+    df['multiple_deliveries'] = df['multiple_deliveries'].astype(int)
+    df['Time_taken(min)'] = df['Time_taken(min)'].apply(lambda x: x.split('(min)')[1])
+    df['Time_taken(min)'] = df['Time_taken(min)'].astype(int)
+    df = df.loc[df['Weatherconditions'] != 'conditions NaN', :]
+    df = df.loc[df['Road_traffic_density'] != 'NaN', :]
+    df = df.loc[df['City'] != 'NaN', :]
+    return df
+
+def medir(func, repeat):
+    """
+        Executa a função `repeat` vezes e retorna o melhor tempo, o pico de
+        memória alocada (tracemalloc) e o último resultado.
+    """
+    melhor = float('inf')
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        resultado = func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    func()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return melhor, pico, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='train.csv')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pd.options.mode.chained_assignment = None
+
+    etapas = {
+        'original (read_csv + clean_code)': lambda: clean_code_original(pd.read_csv(args.csv)),
+        'vetorizado (read_dataset + clean_code)': lambda: clean_code(read_dataset(args.csv)),
+    }
+
+    resultados = {}
+    for nome, func in etapas.items():
+        tempo, pico, resultado = medir(func, args.repeat)
+        resultados[nome] = resultado
+        print(f'{nome:<42} {tempo * 1000:10.1f} ms   pico {pico / 2**20:8.1f} MiB   {len(resultado)} linhas')
+
+    # as duas versões devem produzir os mesmos dados; a versão nova também
+    # tira os espaços do Festival e do Delivery_person_ID, usa categorias,
+    # ordena as linhas por Order_Date e acrescenta a coluna distance
+    original, vetorizado = resultados.values()
+    for col in ['Festival', 'Delivery_person_ID']:
+        original[col] = original[col].str.strip()
+    original = original.sort_values('Order_Date', kind='stable')
+    vetorizado = vetorizado.drop(columns='distance').astype({col: object for col in CATEGORIES})
+    pd.testing.assert_frame_equal(original, vetorizado)
+    print('resultados idênticos')
+
+if __name__ == '__main__':
+    main()
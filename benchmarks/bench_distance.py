@@ -0,0 +1,53 @@
+"""
+    Benchmark da distância das entregas: compara o cálculo original linha a
+    linha com o pacote haversine ( DataFrame.apply ) com a versão vetorizada
+    de utils.geo, e confere que as duas dão o mesmo resultado.
+
+    Uso: python -m benchmarks.bench_distance --csv train.csv
+"""
+# importando bibliotecas
+import argparse
+import time
+
+import numpy as np
+from haversine import haversine
+
+from utils.dataset import clean_code, read_dataset
+from utils.geo import COORD_COLUMNS, delivery_distance
+
+# Tolerância relativa aceita entre as duas versões
+RTOL = 1e-9
+
+def distance_original(df):
+    """Cálculo original da página de restaurantes, linha a linha."""
+    return (df.loc[:, COORD_COLUMNS]
+              .apply(lambda x: haversine((x['Restaurant_latitude'], x['Restaurant_longitude']),
+                                         (x['Delivery_location_latitude'], x['Delivery_location_longitude'])), axis=1)
+              .to_numpy())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='train.csv')
+    args = parser.parse_args()
+
+    df = clean_code(read_dataset(args.csv))
+
+    inicio = time.perf_counter()
+    original = distance_original(df)
+    t_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    vetorizado = delivery_distance(df)
+    t_vetorizado = time.perf_counter() - inicio
+
+    print(f'{len(df)} linhas')
+    print(f'haversine com apply: {t_original * 1000:10.1f} ms')
+    print(f'numpy vetorizado:    {t_vetorizado * 1000:10.1f} ms ({t_original / t_vetorizado:.0f}x mais rápido)')
+
+    erro = np.max(np.abs(original - vetorizado) / np.maximum(np.abs(original), 1e-12))
+    print(f'maior erro relativo: {erro:.2e}')
+    np.testing.assert_allclose(vetorizado, original, rtol=RTOL, atol=1e-9)
+    print('resultados iguais dentro da tolerância')
+
+if __name__ == '__main__':
+    main()
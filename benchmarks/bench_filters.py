@@ -0,0 +1,56 @@
+"""
+    Benchmark dos filtros de trânsito e clima: roda todas as 2^4 x 2^6
+    combinações das multiselects da barra lateral, com o corte de data,
+    usando isin e usando o índice de bitmaps, confere que os resultados são
+    iguais e mostra a distribuição da latência de cada versão.
+
+    Uso: python -m benchmarks.bench_filters --csv train.csv --date 2022-03-20
+"""
+# importando bibliotecas
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.dataset import CATEGORIES, clean_code, read_dataset
+from utils.filters import build_bitmap_index, filter_rows
+
+def subconjuntos(valores):
+    """Retorna todos os subconjuntos da lista ( inclusive o vazio )."""
+    return [list(c) for n in range(len(valores) + 1) for c in itertools.combinations(valores, n)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='train.csv')
+    parser.add_argument('--date', default='2022-04-13', help='data limite do filtro de data')
+    args = parser.parse_args()
+
+    df = clean_code(read_dataset(args.csv))
+    inicio = time.perf_counter()
+    index = build_bitmap_index(df)
+    print(f'{len(df)} linhas, índice montado em {(time.perf_counter() - inicio) * 1000:.1f} ms')
+
+    date_max = pd.Timestamp(args.date)
+    combinacoes = list(itertools.product(subconjuntos(CATEGORIES['Road_traffic_density']),
+                                         subconjuntos(CATEGORIES['Weatherconditions'])))
+
+    tempos = {'isin': [], 'bitmap': []}
+    for traffic, weather in combinacoes:
+        resultados = {}
+        for nome, idx in [('isin', None), ('bitmap', index)]:
+            inicio = time.perf_counter()
+            resultados[nome] = filter_rows(df, date_max, traffic, weather, index=idx)
+            tempos[nome].append(time.perf_counter() - inicio)
+        # as duas versões devem selecionar exatamente as mesmas linhas
+        assert resultados['isin'].index.equals(resultados['bitmap'].index)
+
+    print(f'{len(combinacoes)} combinações, resultados idênticos')
+    print(f'{"versão":<8} {"mín":>9} {"mediana":>9} {"p95":>9} {"máx":>9}')
+    for nome, valores in tempos.items():
+        ms = np.array(valores) * 1000
+        print(f'{nome:<8} {ms.min():7.2f}ms {np.median(ms):7.2f}ms {np.percentile(ms, 95):7.2f}ms {ms.max():7.2f}ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+    Benchmark da limpeza em paralelo: mede o parse + clean_code + agregados
+    parciais do utils.parallel com 1 até N processos e compara com a versão
+    sequencial ( read_dataset + clean_code + builders ). Confere também se o
+    dataframe de cada execução é idêntico ao sequencial.
+
+    Uso: python -m benchmarks.bench_parallel --csv train.csv --max-workers 8
+"""
+# importando bibliotecas
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from utils.dataset import clean_code, read_dataset
+from utils.parallel import PARTIALS, parallel_clean
+
+def sequencial(csv):
+    """Versão sequencial: o csv inteiro em um processo, com os mesmos agregados."""
+    df = clean_code(read_dataset(csv))
+    for builder, _ in PARTIALS.values():
+        builder(df)
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='train.csv')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    referencia = sequencial(args.csv)
+    base = time.perf_counter() - inicio
+    for _ in range(args.repeat - 1):
+        inicio = time.perf_counter()
+        sequencial(args.csv)
+        base = min(base, time.perf_counter() - inicio)
+    print(f'{"sequencial":<14} {base * 1000:10.1f} ms')
+
+    # 1, 2, 4, ... até o máximo ( incluído )
+    contagens = sorted({2 ** i for i in range(args.max_workers.bit_length()) if 2 ** i <= args.max_workers}
+                       | {args.max_workers})
+    for workers in contagens:
+        melhor = float('inf')
+        for _ in range(args.repeat):
+            inicio = time.perf_counter()
+            df, _, _ = parallel_clean(args.csv, workers)
+            melhor = min(melhor, time.perf_counter() - inicio)
+        pd.testing.assert_frame_equal(df, referencia)
+        print(f'{workers:>2} processo(s) {melhor * 1000:10.1f} ms   speedup {base / melhor:5.2f}x')
+    print('resultados idênticos')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+    Benchmark do cache colunar compartilhado: abre N processos que carregam
+    o dataset limpo e leem todas as colunas, e mostra a memória de cada
+    processo ( RSS ) separando a parte anônima ( cópia privada do processo )
+    da parte mapeada do arquivo, que o sistema operacional divide entre todos
+    os processos. Compara o modo compartilhado com o modo com cópia
+    ( CURRY_SHARED_CACHE=0 ). Só funciona no Linux ( /proc/self/smaps_rollup ).
+
+    Uso: python -m benchmarks.bench_shared --csv train.csv --processes 4
+"""
+# importando bibliotecas
+import argparse
+import os
+import subprocess
+import sys
+
+from utils.dataset import load_dataset
+
+def memoria():
+    """Lê o RSS e a memória anônima do processo em MiB."""
+    valores = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for linha in f:
+            partes = linha.split()
+            if partes[0] in ('Rss:', 'Anonymous:'):
+                valores[partes[0][:-1]] = int(partes[1]) / 1024
+    return valores['Rss'], valores['Anonymous']
+
+def carregar(csv):
+    """Carrega o dataset, lê todas as colunas e imprime a memória ( roda no subprocesso )."""
+    antes = memoria()
+    df = load_dataset(csv)
+    for col in df.columns:
+        if df[col].dtype.kind in 'iufM':
+            df[col].to_numpy().max()
+        else:
+            df[col].iloc[::1000].tolist()
+    depois = memoria()
+    print(f'{depois[0] - antes[0]} {depois[1] - antes[1]}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='train.csv')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--filho', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        carregar(args.csv)
+        return
+
+    # o cache é gravado antes, para que os processos só façam a leitura
+    load_dataset(args.csv)
+
+    for nome, valor in [('compartilhado', '1'), ('cópia por processo', '0')]:
+        env = dict(os.environ, CURRY_SHARED_CACHE=valor)
+        filhos = [subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_shared', '--csv', args.csv, '--filho'],
+                                   env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+                  for _ in range(args.processes)]
+        medidas = [tuple(map(float, filho.communicate()[0].split()[-2:])) for filho in filhos]
+        rss = sum(m[0] for m in medidas) / len(medidas)
+        anonima = sum(m[1] for m in medidas) / len(medidas)
+        print(f'{nome:<20} por processo: RSS {rss:8.1f} MiB   anônima {anonima:8.1f} MiB   '
+              f'total anônima ( {args.processes} processos ) {anonima * args.processes:8.1f} MiB')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+    Benchmark da leitura em blocos: compara o tempo e o pico de memória
+    ( RSS ) da gravação do cache colunar com o csv inteiro em memória, da
+    gravação em blocos ( build_cache_chunked ) e dos agregados montados
+    direto dos blocos ( stream_aggregates ). Cada modo roda em um processo
+    separado, para que o pico de RSS de um não esconda o do outro.
+
+    Uso: python -m benchmarks.bench_streaming --csv train.csv --chunksize 50000
+"""
+# importando bibliotecas
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from utils.dataset import peak_rss_mb, read_cache
+
+def rodar_modo(modo, csv, chunksize):
+    """Executa um modo neste processo ( chamado pelo subprocesso )."""
+    from utils.dataset import build_cache, build_cache_chunked
+    from utils.cube import stream_aggregates
+
+    inicio = time.perf_counter()
+    if modo == 'memoria':
+        build_cache(csv)
+    elif modo == 'blocos':
+        build_cache_chunked(csv, chunksize)
+    else:
+        stream_aggregates(csv, chunksize)
+    print(f'{time.perf_counter() - inicio} {peak_rss_mb()}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default='train.csv')
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    parser.add_argument('--modo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        rodar_modo(args.modo, args.csv, args.chunksize)
+        return
+
+    # cópias do csv para que os dois caches gravados possam ser comparados
+    pasta = tempfile.mkdtemp()
+    try:
+        copias = {}
+        for modo in ['memoria', 'blocos', 'agregados']:
+            copias[modo] = os.path.join(pasta, f'{modo}.csv')
+            shutil.copyfile(args.csv, copias[modo])
+
+        # pico de RSS só com as bibliotecas importadas
+        base = subprocess.run([sys.executable, '-c', 'import benchmarks.bench_streaming as b; print(b.peak_rss_mb())'],
+                              capture_output=True, text=True, check=True)
+        print(f'{"processo vazio":<34} {"":>10}      pico {float(base.stdout):8.1f} MiB')
+
+        nomes = {'memoria': 'csv inteiro ( build_cache )',
+                 'blocos': 'em blocos ( build_cache_chunked )',
+                 'agregados': 'agregados ( stream_aggregates )'}
+        for modo, nome in nomes.items():
+            saida = subprocess.run([sys.executable, '-m', 'benchmarks.bench_streaming', '--csv', copias[modo],
+                                    '--chunksize', str(args.chunksize), '--modo', modo],
+                                   capture_output=True, text=True, check=True)
+            tempo, pico = saida.stdout.split()[-2:]
+            print(f'{nome:<34} {float(tempo) * 1000:10.1f} ms   pico {float(pico):8.1f} MiB')
+
+        # os dois caches devem ter o mesmo conteúdo
+        pd.testing.assert_frame_equal(read_cache(copias['memoria']), read_cache(copias['blocos']))
+        print('caches idênticos')
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
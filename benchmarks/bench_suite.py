@@ -0,0 +1,206 @@
+"""
+    Suíte de benchmarks das páginas em escala: gera pedidos sintéticos no
+    formato do train.csv ( benchmarks.synthetic ) em várias escalas e mede,
+    sem o streamlit, cada etapa do dashboard: parse do csv, clean_code, os
+    agregados ( cubo, conjuntos de entregadores, maior tempo por entregador,
+    bitmaps ), os filtros da barra lateral e as funções de gráfico e tabela
+    das três páginas ( utils.figures e utils.metrics ).
+
+    O resultado é gravado em JSON; com --compare, cada etapa é comparada com um JSON anterior e as que
+    ficaram mais lentas que o limite são marcadas ( e o processo sai com
+    código 1 ).
+
+    As escalas grandes precisam de memória para o dataset inteiro ( ~0.5 GB
+    por 1M de linhas ); o csv é gerado em blocos e reaproveitado em --workdir.
+
+    Uso: python -m benchmarks.bench_suite --scales 1 10 --output bench.json
+         python -m benchmarks.bench_suite --scales 1 10 --compare bench.json
+"""
+# importando bibliotecas
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import TRAIN_ROWS, write_orders
+from utils.cube import (build_courier_max, build_courier_sets, build_cube, filter_mask, slice_courier_sets,
+                        slice_cube)
+from utils.dataset import clean_code, read_dataset
+from utils.figures import (avg_std_time_graph, avg_std_time_on_traffic, contry_maps, distance, order_metric,
+                           order_share_by_week, ordern_by_week, traffic_order_city, traffic_order_share)
+from utils.filters import build_bitmap_index, filter_rows
+from utils.metrics import avg_std_time, overall_metrics, ratings_by, ratings_by_courier, time_stats, top_delivers
+
+# Pasta raiz do repositório ( commit gravado junto dos resultados )
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Estados dos filtros medidos: o padrão da barra lateral ( tudo marcado ) e
+# um recorte seletivo
+FILTER_STATES = {
+    'padrao': {'date_max': pd.Timestamp(2022, 4, 13), 'traffic': ['Low', 'Medium', 'High', 'Jam'],
+               'weather': ['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms',
+                           'conditions Stormy', 'conditions Sunny', 'conditions Windy']},
+    'seletivo': {'date_max': pd.Timestamp(2022, 3, 15), 'traffic': ['Jam'],
+                 'weather': ['conditions Fog', 'conditions Stormy']},
+}
+
+def medir(func, repeat):
+    """
+        Executa a função `repeat` vezes e retorna o melhor tempo, a mediana e
+        o último resultado.
+    """
+    tempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), float(np.median(tempos)), resultado
+
+def bench_scale(csv, repeat):
+    """
+        Esta função mede todas as etapas para um csv.
+
+        Input: caminho do csv e repetições de cada etapa
+        Output: lista de dicionários com stage, best_s e median_s
+    """
+    resultados = []
+    def etapa(nome, func, vezes=repeat):
+        melhor, mediana, valor = medir(func, vezes)
+        resultados.append({'stage': nome, 'best_s': melhor, 'median_s': mediana, 'repeat': vezes})
+        print(f'    {nome:<44} {melhor * 1000:10.1f} ms')
+        return valor
+
+    # o parse e a limpeza são as etapas mais longas: uma medida só
+    raw = etapa('read_csv', lambda: read_dataset(csv), 1)
+    df = etapa('clean_code', lambda: clean_code(raw), 1)
+    del raw
+
+    cube = etapa('build_cube', lambda: build_cube(df))
+    couriers = etapa('build_courier_sets', lambda: build_courier_sets(df))
+    courier_max = etapa('build_courier_max', lambda: build_courier_max(df))
+    bitmaps = etapa('build_bitmap_index', lambda: build_bitmap_index(df))
+
+    def paginas(etapa, estado, filtros):
+        rows = etapa(f'filter_rows[{estado}]', lambda: filter_rows(df, index=bitmaps, **filtros))
+        cells = etapa(f'slice_cube[{estado}]', lambda: slice_cube(cube, **filtros))
+        sets = etapa(f'slice_courier_sets[{estado}]', lambda: slice_courier_sets(couriers, **filtros))
+        max_cells = etapa(f'filter_courier_max[{estado}]',
+                          lambda: courier_max.loc[filter_mask(courier_max, **filtros), :])
+
+        # visão empresa
+        for func in [order_metric, traffic_order_share, traffic_order_city, ordern_by_week]:
+            etapa(f'{func.__name__}[{estado}]', lambda: func(cells))
+        etapa(f'order_share_by_week[{estado}]', lambda: order_share_by_week(cells, sets))
+        etapa(f'contry_maps[{estado}]', lambda: contry_maps(rows), 1)
+
+        # visão entregadores
+        etapa(f'overall_metrics[{estado}]', lambda: overall_metrics(rows))
+        etapa(f'ratings_by_courier[{estado}]', lambda: ratings_by_courier(rows))
+        etapa(f'ratings_by_traffic[{estado}]', lambda: ratings_by(rows, 'Road_traffic_density'))
+        etapa(f'ratings_by_weather[{estado}]', lambda: ratings_by(rows, 'Weatherconditions'))
+        etapa(f'top_delivers[{estado}]', lambda: top_delivers(max_cells, k=10))
+
+        # visão restaurantes
+        stats = etapa(f'time_stats[{estado}]', lambda: time_stats(cells))
+        etapa(f'avg_std_time_on_traffic[{estado}]', lambda: avg_std_time_on_traffic(stats))
+        etapa(f'avg_std_time_graph[{estado}]', lambda: avg_std_time_graph(stats))
+        etapa(f'avg_std_time[{estado}]', lambda: avg_std_time(stats, 'Yes', 'avg_time'))
+        etapa(f'distance[{estado}]', lambda: distance(cells, fig=True))
+
+    # uma passada sem medir, para que os imports e caches internos do
+    # plotly e do folium não caiam na primeira medida
+    def aquecer(nome, func, vezes=1):
+        return func()
+    paginas(aquecer, 'padrao', FILTER_STATES['padrao'])
+    for estado, filtros in FILTER_STATES.items():
+        paginas(etapa, estado, filtros)
+    return resultados
+
+def metadata():
+    """Versões e commit usados na medida, gravados junto dos resultados."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=ROOT_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'created': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+def compare(atual, anterior, limite, minimo=0.001):
+    """
+        Esta função compara o melhor tempo de cada etapa com o de um JSON
+        anterior e imprime a razão ( atual / anterior ). Etapas que ficaram
+        menos de `minimo` segundos mais lentas não contam ( ruído de medida ).
+
+        Input: resultados atuais, resultados anteriores, razão limite e
+               diferença mínima em segundos
+        Output: quantidade de etapas mais lentas que o limite
+    """
+    antes = {(r['scale'], r['stage']): r['best_s'] for r in anterior['results']}
+    regressoes = 0
+    print(f'\ncomparação com {anterior["meta"].get("commit")} ( {anterior["meta"].get("created")} )')
+    for r in atual['results']:
+        chave = (r['scale'], r['stage'])
+        if chave not in antes or antes[chave] <= 0:
+            continue
+        razao = r['best_s'] / antes[chave]
+        marca = ''
+        if razao > limite and r['best_s'] - antes[chave] > minimo:
+            marca = '  <-- mais lento'
+            regressoes += 1
+        print(f'  {r["scale"]:>6}x {r["stage"]:<44} {antes[chave] * 1000:10.1f} -> {r["best_s"] * 1000:10.1f} ms'
+              f'   {razao:5.2f}x{marca}')
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10],
+                        help='múltiplos do tamanho do train.csv ( ex: 1 10 100 1000 )')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'curry_bench'),
+                        help='pasta dos csvs sintéticos ( reaproveitados entre execuções )')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='JSON de uma execução anterior')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='razão de tempo a partir da qual a etapa conta como regressão')
+    parser.add_argument('--min-ms', type=float, default=1.0,
+                        help='diferença mínima em ms para contar como regressão')
+    args = parser.parse_args()
+
+    # lido antes, porque --output pode ser o mesmo arquivo
+    anterior = None
+    if args.compare:
+        with open(args.compare) as f:
+            anterior = json.load(f)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    atual = {'meta': metadata(), 'results': []}
+    for escala in args.scales:
+        linhas = int(TRAIN_ROWS * escala)
+        csv = os.path.join(args.workdir, f'synthetic_{linhas}_{args.seed}.csv')
+        if not os.path.exists(csv):
+            print(f'gerando {linhas} pedidos em {csv}')
+            write_orders(csv, linhas, seed=args.seed)
+        print(f'escala {escala:g}x ( {linhas} linhas )')
+        for r in bench_scale(csv, args.repeat):
+            atual['results'].append({'scale': escala, 'rows': linhas, **r})
+
+    with open(args.output, 'w') as f:
+        json.dump(atual, f, indent=2)
+    print(f'resultados gravados em {args.output}')
+
+    if anterior is not None and compare(atual, anterior, args.threshold, args.min_ms / 1000):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
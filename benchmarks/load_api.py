@@ -0,0 +1,154 @@
+"""
+    Teste de carga do serviço de métricas ( utils.api ): vários clientes
+    concorrentes, cada um com uma conexão keep-alive, pedem as métricas para
+    estados dos filtros sorteados de uma lista e o script mede a latência
+    ( p50, p90, p99 ), a vazão e a origem das respostas ( cache, cálculo
+    compartilhado ou cálculo novo ).
+
+    Com --spawn o serviço é iniciado em um subprocesso local na porta
+    escolhida e encerrado no fim; sem ele, o serviço já deve estar rodando.
+    Com --etag os clientes repetem a ETag recebida em If-None-Match, como um
+    cliente com cache, e as respostas iguais voltam como 304.
+
+    Uso: python -m benchmarks.load_api --spawn --clients 50 --requests 40
+         python -m benchmarks.load_api --port 8502 --clients 200 --etag
+"""
+# importando bibliotecas
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+import numpy as np
+
+from utils.api import ENDPOINTS
+
+# Estados dos filtros sorteados pelos clientes: o padrão da barra lateral,
+# cada nível de trânsito sozinho e alguns recortes de data e clima
+TRAFFIC = ['Low', 'Medium', 'High', 'Jam']
+FILTER_STATES = ([{}, {'date_max': '2022-04-13', 'traffic': ','.join(TRAFFIC)}]
+                 + [{'traffic': t} for t in TRAFFIC]
+                 + [{'date_max': d, 'traffic': ','.join(TRAFFIC)} for d in ['2022-03-01', '2022-03-15', '2022-04-01']]
+                 + [{'weather': 'Fog,Stormy'}, {'traffic': 'Jam', 'weather': 'Sunny'}])
+
+async def request(reader, writer, host, target, headers=None):
+    """
+        Envia um GET na conexão aberta e lê a resposta.
+
+        Output: tupla ( status, cabeçalhos em minúsculas, corpo )
+    """
+    linhas = [f'GET {target} HTTP/1.1', f'Host: {host}'] + [f'{k}: {v}' for k, v in (headers or {}).items()]
+    writer.write(('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1'))
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    resposta = {}
+    while True:
+        linha = await reader.readline()
+        if linha in (b'\r\n', b'\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        resposta[nome.strip().lower()] = valor.strip()
+    corpo = await reader.readexactly(int(resposta.get('content-length', '0')))
+    return status, resposta, corpo
+
+async def client(host, port, requests, metrics, states, etag, rng, medidas):
+    """Um cliente: abre uma conexão e faz `requests` pedidos sorteados."""
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    try:
+        for _ in range(requests):
+            estado = rng.choice(states)
+            target = f'/metrics/{rng.choice(metrics)}' + (f'?{urlencode(estado)}' if estado else '')
+            headers = {'If-None-Match': etags[target]} if etag and target in etags else None
+
+            inicio = time.perf_counter()
+            status, resposta, _ = await request(reader, writer, host, target, headers)
+            medidas.append((time.perf_counter() - inicio, status, resposta.get('x-cache', '-')))
+            if 'etag' in resposta:
+                etags[target] = resposta['etag']
+    finally:
+        writer.close()
+
+async def wait_ready(host, port, timeout):
+    """Espera o /health do serviço responder."""
+    limite = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                status, _, _ = await request(reader, writer, host, '/health', {'Connection': 'close'})
+            finally:
+                writer.close()
+            if status == 200:
+                return
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            pass
+        if time.monotonic() > limite:
+            raise TimeoutError(f'o serviço em {host}:{port} não respondeu em {timeout:g} s')
+        await asyncio.sleep(0.2)
+
+async def fetch_json(host, port, target):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, _, corpo = await request(reader, writer, host, target, {'Connection': 'close'})
+    finally:
+        writer.close()
+    return json.loads(corpo)
+
+async def run(args):
+    await wait_ready(args.host, args.port, args.timeout)
+    rng = random.Random(args.seed)
+    medidas = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*[client(args.host, args.port, args.requests, args.metrics, FILTER_STATES, args.etag,
+                                  random.Random(rng.random()), medidas) for _ in range(args.clients)])
+    duracao = time.perf_counter() - inicio
+
+    ms = np.array([m[0] for m in medidas]) * 1000
+    print(f'{len(medidas)} requisições de {args.clients} clientes em {duracao:.2f} s '
+          f'( {len(medidas) / duracao:.0f} req/s )')
+    print('latência ms: ' + '  '.join(f'p{q}={np.percentile(ms, q):.1f}' for q in [50, 90, 99])
+          + f'  max={ms.max():.1f}')
+    print('status: ' + ', '.join(f'{k}={v}' for k, v in sorted(Counter(m[1] for m in medidas).items())))
+    print('origem: ' + ', '.join(f'{k}={v}' for k, v in sorted(Counter(m[2] for m in medidas).items())))
+    print('serviço: ' + json.dumps(await fetch_json(args.host, args.port, '/stats')))
+    return all(m[1] in (200, 304) for m in medidas)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--clients', type=int, default=50, help='clientes concorrentes')
+    parser.add_argument('--requests', type=int, default=40, help='requisições por cliente')
+    parser.add_argument('--metrics', nargs='+', default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument('--etag', action='store_true', help='revalida com If-None-Match')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help='inicia o serviço local ( python -m utils.api )')
+    parser.add_argument('--csv', default='train.csv', help='csv do serviço iniciado com --spawn')
+    parser.add_argument('--timeout', type=float, default=300, help='segundos esperando o serviço responder')
+    args = parser.parse_args()
+
+    servico = None
+    if args.spawn:
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [raiz, os.environ.get('PYTHONPATH')]))}
+        servico = subprocess.Popen([sys.executable, '-m', 'utils.api', '--host', args.host, '--port', str(args.port),
+                                    '--csv', args.csv], env=env)
+    try:
+        ok = asyncio.run(run(args))
+    finally:
+        if servico is not None:
+            servico.terminate()
+            servico.wait()
+    if not ok:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
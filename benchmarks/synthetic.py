@@ -0,0 +1,195 @@
+"""
+    Gerador de pedidos sintéticos com o mesmo formato do train.csv, para
+    medir as páginas em escalas maiores que o dataset original ( 10x, 100x,
+    1000x ). Reproduz as manias do csv original: textos com espaço no fim,
+    'NaN ' nas colunas numéricas, 'conditions NaN' no clima, '(min) NN' no
+    tempo de entrega, datas em dd-mm-aaaa e algumas coordenadas negativas.
+
+    Cada entregador fica sempre na mesma cidade e perto do mesmo
+    restaurante, com idade e avaliação própria, e a quantidade de
+    entregadores cresce junto com a escala. O csv é gravado em blocos, então
+    o gerador não precisa de memória proporcional à escala.
+
+    Uso: python -m benchmarks.synthetic --scale 10 --out train_10x.csv
+"""
+# importando bibliotecas
+import argparse
+
+import numpy as np
+import pandas as pd
+
+#===================================================#
+#     Formato do train.csv
+#===================================================#
+# Linhas e entregadores do train.csv original ( escala 1 )
+TRAIN_ROWS = 45_593
+TRAIN_COURIERS = 1_320
+
+# Linhas geradas por bloco gravado
+BLOCK_ROWS = 500_000
+
+# Prefixo do Delivery_person_ID -> centro aproximado ( latitude, longitude )
+CITY_CENTERS = {
+    'INDO': (22.72, 75.86), 'BANG': (12.97, 77.59), 'COIMB': (11.02, 76.96), 'CHEN': (13.08, 80.27),
+    'HYD': (17.39, 78.49), 'RANCHI': (23.34, 85.31), 'MYS': (12.30, 76.64), 'DEH': (30.32, 78.03),
+    'KOC': (9.93, 76.27), 'PUNE': (18.52, 73.86), 'LUDH': (30.90, 75.86), 'KNP': (26.45, 80.33),
+    'MUM': (19.08, 72.88), 'KOL': (22.57, 88.36), 'JAP': (26.91, 75.79), 'SUR': (21.17, 72.83),
+    'GOA': (15.49, 73.83), 'AURG': (19.88, 75.34), 'AGR': (27.18, 78.01), 'VAD': (22.31, 73.18),
+    'ALH': (25.44, 81.85), 'BHP': (23.26, 77.41),
+}
+
+# Valores das colunas categóricas ( com os espaços do csv ) e probabilidades
+WEATHER = (['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms', 'conditions Stormy',
+            'conditions Sunny', 'conditions Windy', 'conditions NaN'],
+           [0.166, 0.17, 0.165, 0.168, 0.162, 0.158, 0.011])
+TRAFFIC = (['Low ', 'Medium ', 'High ', 'Jam ', 'NaN '], [0.34, 0.24, 0.10, 0.31, 0.01])
+ORDER = (['Snack ', 'Meal ', 'Drinks ', 'Buffet '], [0.25, 0.25, 0.25, 0.25])
+VEHICLE = (['motorcycle ', 'scooter ', 'electric_scooter ', 'bicycle '], [0.58, 0.33, 0.08, 0.01])
+FESTIVAL = (['No ', 'Yes ', 'NaN '], [0.975, 0.02, 0.005])
+CITY = (['Metropolitian ', 'Urban ', 'Semi-Urban ', 'NaN '], [0.745, 0.22, 0.004, 0.031])
+MULTIPLE = (['0', '1', '2', '3', 'NaN '], [0.31, 0.62, 0.035, 0.013, 0.022])
+
+# Período das datas dos pedidos
+FIRST_DATE = pd.Timestamp('2022-02-11')
+DAYS = 55
+
+def _couriers(couriers, rng):
+    """
+        Sorteia os atributos fixos de cada entregador: id, centro do
+        restaurante, idade, avaliação média e condição do veículo.
+    """
+    prefixos = np.array(list(CITY_CENTERS), dtype=object)
+    # RESxx e DELyy numerados dentro de cada cidade, como no csv ( um id
+    # diferente para cada entregador, em qualquer escala )
+    numero = np.arange(couriers)
+    cidade = numero % len(prefixos)
+    ids = np.array([f'{p}RES{r:02d}DEL{d:02d} ' for p, r, d in
+                    zip(prefixos[cidade], numero // (3 * len(prefixos)) + 1, numero // len(prefixos) % 3 + 1)],
+                   dtype=object)
+    centros = np.array(list(CITY_CENTERS.values()))[cidade]
+    return {'id': ids,
+            'lat': centros[:, 0] + rng.uniform(-0.08, 0.08, couriers),
+            'lon': centros[:, 1] + rng.uniform(-0.08, 0.08, couriers),
+            'age': rng.integers(20, 40, couriers),
+            'rating': np.clip(rng.normal(4.6, 0.3, couriers), 2.5, 5.0),
+            'vehicle': rng.integers(0, 4, couriers)}
+
+def _choice(rng, valores, n):
+    """Sorteia n valores de uma coluna categórica ( valores, probabilidades )."""
+    opcoes, p = valores
+    p = np.asarray(p) / np.sum(p)
+    return np.asarray(opcoes, dtype=object)[rng.choice(len(opcoes), n, p=p)]
+
+def _com_nan(rng, valores, fracao):
+    """Troca uma fração dos valores pelo 'NaN ' do csv."""
+    valores = valores.astype(str).astype(object)
+    valores[rng.random(len(valores)) < fracao] = 'NaN '
+    return valores
+
+def generate_orders(rows, start=0, couriers=None, seed=0):
+    """
+        Esta função gera um bloco de pedidos sintéticos com as colunas e o
+        formato do train.csv.
+
+        Input:
+            - rows: quantidade de pedidos
+            - start: número do primeiro ID ( para blocos seguidos )
+            - couriers: quantidade de entregadores ( padrão: proporcional às
+              linhas, como no train.csv )
+            - seed: semente; o mesmo ( seed, start ) gera sempre o mesmo bloco
+        Output: dataframe com as colunas do train.csv, todas como texto ou
+                número exatamente como aparecem no csv
+    """
+    couriers = couriers or max(TRAIN_COURIERS * rows // TRAIN_ROWS, 1)
+    entregadores = _couriers(couriers, np.random.default_rng(seed))
+    rng = np.random.default_rng([seed, start])
+
+    quem = rng.integers(0, couriers, rows)
+    rest_lat = entregadores['lat'][quem] + rng.normal(0, 0.01, rows)
+    rest_lon = entregadores['lon'][quem] + rng.normal(0, 0.01, rows)
+    entrega_lat = rest_lat + rng.uniform(-0.15, 0.15, rows)
+    entrega_lon = rest_lon + rng.uniform(-0.15, 0.15, rows)
+    # no csv original ~1% dos restaurantes têm a latitude com o sinal trocado
+    negativos = rng.random(rows) < 0.01
+    rest_lat[negativos] = -rest_lat[negativos]
+
+    cidade = _choice(rng, CITY, rows)
+    transito = _choice(rng, TRAFFIC, rows)
+    clima = _choice(rng, WEATHER, rows)
+    festival = _choice(rng, FESTIVAL, rows)
+    multiplas = _choice(rng, MULTIPLE, rows)
+
+    # tempo de entrega maior com trânsito, neblina ou nuvens, festival e nas cidades semi-urbanas
+    tempo = (rng.normal(22, 5, rows)
+             + np.select([transito == 'Jam ', transito == 'High '], [8, 4], 0)
+             + np.where(np.isin(clima, ['conditions Fog', 'conditions Cloudy']), 5, 0)
+             + np.where(festival == 'Yes ', 18, 0)
+             + np.where(cidade == 'Semi-Urban ', 20, 0))
+    tempo = np.clip(np.round(tempo), 10, 54).astype(int)
+
+    datas = FIRST_DATE + pd.to_timedelta(rng.integers(0, DAYS, rows), unit='D')
+    hora = rng.integers(8, 24, rows)
+    minuto = rng.choice([0, 15, 25, 30, 35, 40, 45, 50, 55], rows)
+    pedido = np.array([f'{h:02d}:{m:02d}:00' for h, m in zip(hora, minuto)], dtype=object)
+    retirada = np.array([f'{(h + (m + 15) // 60) % 24:02d}:{(m + 15) % 60:02d}:00' for h, m in zip(hora, minuto)],
+                        dtype=object)
+    pedido[rng.random(rows) < 0.04] = 'NaN '
+
+    avaliacao = np.round(np.clip(entregadores['rating'][quem] + rng.normal(0, 0.15, rows), 1, 5), 1)
+    # alguns entregadores do csv original têm avaliação 6
+    avaliacao[rng.random(rows) < 0.001] = 6
+
+    return pd.DataFrame({
+        'ID': [f'0x{i:x} ' for i in range(start, start + rows)],
+        'Delivery_person_ID': entregadores['id'][quem],
+        'Delivery_person_Age': _com_nan(rng, entregadores['age'][quem], 0.04),
+        'Delivery_person_Ratings': _com_nan(rng, avaliacao, 0.04),
+        'Restaurant_latitude': np.round(rest_lat, 6),
+        'Restaurant_longitude': np.round(rest_lon, 6),
+        'Delivery_location_latitude': np.round(entrega_lat, 6),
+        'Delivery_location_longitude': np.round(entrega_lon, 6),
+        'Order_Date': datas.strftime('%d-%m-%Y'),
+        'Time_Orderd': pedido,
+        'Time_Order_picked': retirada,
+        'Weatherconditions': clima,
+        'Road_traffic_density': transito,
+        'Vehicle_condition': entregadores['vehicle'][quem],
+        'Type_of_order': _choice(rng, ORDER, rows),
+        'Type_of_vehicle': _choice(rng, VEHICLE, rows),
+        'multiple_deliveries': multiplas,
+        'Festival': festival,
+        'City': cidade,
+        'Time_taken(min)': [f'(min) {t}' for t in tempo],
+    })
+
+def write_orders(path, rows, couriers=None, seed=0, block_rows=BLOCK_ROWS):
+    """
+        Esta função grava um csv com `rows` pedidos sintéticos no formato do
+        train.csv, gerando e gravando um bloco de cada vez.
+
+        Input: caminho do csv, quantidade de pedidos, quantidade de
+               entregadores ( padrão: proporcional ), semente e linhas por bloco
+        Output: caminho do csv
+    """
+    couriers = couriers or max(TRAIN_COURIERS * rows // TRAIN_ROWS, 1)
+    with open(path, 'w', newline='') as f:
+        for start in range(0, rows, block_rows):
+            bloco = generate_orders(min(block_rows, rows - start), start, couriers, seed)
+            bloco.to_csv(f, index=False, header=start == 0)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1, help='múltiplo do tamanho do train.csv')
+    parser.add_argument('--rows', type=int, help='quantidade de pedidos ( no lugar de --scale )')
+    parser.add_argument('--couriers', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='train_synthetic.csv')
+    args = parser.parse_args()
+
+    rows = args.rows or int(TRAIN_ROWS * args.scale)
+    write_orders(args.out, rows, args.couriers, args.seed)
+    print(f'{rows} pedidos gravados em {args.out}')
+
+if __name__ == '__main__':
+    main()
@@ -5,214 +5,50 @@ import plotly.express as px
 import re
 import folium
 import streamlit as st
+import streamlit.components.v1 as components
 from haversine import haversine
 from PIL import Image
 from streamlit_folium import folium_static
 
-st.set_page_config( page_title="Visão Empresa", page_icon="📈", layout ='wide' )
-
-#===================================================#
-#     Funções
-#===================================================#
-def contry_maps (df):
-    """
-        Esta função vai retornar um mapa com a localização de cada cidade por tipo de 
-        tráfego.
-
-        Input: dataframe 
-        output: mapa
-    """
-    data_plot = (df.loc[:, ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude']]
-                   .groupby( ['City','Road_traffic_density'])
-                   .median()
-                   .reset_index())
-
-    # Desenhar o mapa
-    map = folium.Map()
-
-    for index, location_info in data_plot.iterrows():
-        folium.Marker( [location_info['Delivery_location_latitude'],
-             location_info['Delivery_location_longitude']],
-             popup=location_info[['City', 'Road_traffic_density']] ).add_to( map)
-    folium_static( map, width = 1024, height = 600 )
-    
-def order_share_by_week (df):
-    """
-        Esta função vai retornar um grafico de linhas com a quantidades
-        de pedidos por entregador por semana.
-
-        Input: dataframe 
-        output: grafico de linhas
-    """
-    df_aux1 = (df.loc[:, ['ID', 'week_of_year']]
-                 .groupby( 'week_of_year' )
-                 .count()
-                 .reset_index())
-    df_aux2 = (df.loc[:, ['Delivery_person_ID', 'week_of_year']]
-                 .groupby( 'week_of_year')
-                 .nunique()
-                 .reset_index())
-
-    df_aux = pd.merge( df_aux1, df_aux2, how='inner' )
-    df_aux['order_by_delivery'] = df_aux['ID'] / df_aux['Delivery_person_ID']
-
-    # gráfico
-    fig = px.line( df_aux, x='week_of_year', y='order_by_delivery' )
-    return fig
-
-def ordern_by_week (df):
-    """
-        Esta função vai retornar um grafico de linhas com a quantidades
-        de pedidos por semana.
-
-        Input: dataframe 
-        output: grafico de linhas
-    """
-    # criar coluna da semana
-    df['week_of_year'] = df['Order_Date'].dt.strftime('%U')
-    df_aux = (df.loc[:,['ID', 'week_of_year']]
-                .groupby('week_of_year')
-                .count()
-                .reset_index())
-    #grafico
-    fig = px.line(df_aux, x= 'week_of_year', y = 'ID')
-    return fig
-
-def traffic_order_city (df):
-    """
-        Esta função retorna um grafico de bolhas comparando o volume de pedidos
-        por cidade e tipo de tráfego.
-        
-        Input: dataframe com os dados para realizar os calculos
-        Output: grafico de bolhas
-    """
-    df_aux = (df.loc[:,['ID', 'City','Road_traffic_density']]
-                .groupby(['Road_traffic_density','City'])
-                .count()
-                .reset_index())
-    #grafico
-    fig = px.scatter(df_aux, x = 'City', y = 'Road_traffic_density', size ='ID', color = 'City')
-    return fig
-
-def traffic_order_share(df):
-    """
-       Esta função vai retornar um grafico de pizza com a distribuição dos
-       pedidos por tipo de tráfego.
-       
-       Input: datafram com os dados para o calculo
-       Output: grafico de pizza.
-    """
-    df_aux = (df.loc[:,['ID', 'Road_traffic_density']]
-                .groupby('Road_traffic_density')
-                .count()
-                .reset_index())
-    
-    df_aux['perc_ID'] = 100*(df_aux['ID'] / df_aux['ID'].sum())
-    
-    #grafico
-    fig = px.pie(df_aux, values = 'perc_ID', names = 'Road_traffic_density')
-    return fig
-            
-def order_metric(df):
-    """
-        Esta função vai retornar um grafico de barras com a quantidades
-        de pedidos por dia.
-        
-        Input: dataframe 
-        output: grafico de barras
-    """
-    df_aux = (df.loc[:,['ID', 'Order_Date']]
-                .groupby('Order_Date')
-                .count()
-                .reset_index())
-    #grafico
-    fig = px.bar(df_aux, x = 'Order_Date', y ='ID')
-    return fig
-        
-def clean_code(df):
-    """Esta função tem a responsabilidade de limapra o dataframe
-    
-        Tipos de limpeza:
-        1. Remoção de dados do NaN
-        2. Conversão de numeros e strings
-        3. Mudança do tipo de coluna de dados
-        4. Remoção dos espaços das variáveis
-        5. Formatação da colunas de datas
-        6.Limpeza da coluna tempo ( remoção do texto da variavel )
-        
-        Input: Dataframe
-        Output: Dataframe
-    """
-    
-    # Remover spaco da string o comando strip excluir espaços vazios no início
-    df.loc[:, 'ID'] = df.loc[:, 'ID'].str.strip()
-    df.loc[:, 'Road_traffic_density'] = df.loc[:, 'Road_traffic_density'].str.strip()
-    df.loc[:, 'Type_of_order'] = df.loc[:, 'Type_of_order'].str.strip()
-    df.loc[:, 'Type_of_vehicle'] = df.loc[:, 'Type_of_vehicle'].str.strip()
-    df.loc[:, 'City'] = df.loc[:, 'City'].str.strip()
-
-    # Excluir as linhas com a idade dos entregadores vazia
-    # ( Conceitos de seleção condicional )
-
-    linhas_vazias = df['Delivery_person_Age'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # excluindo linhas fazias da coluna Estival
-    linhas_vazias = df['Festival'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # Conversao de texto/categoria/string para numeros inteiros
-
-    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype( int )
-
-    # Conversao de texto/categoria/strings para numeros decimais
-
-    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype( float )
-
-    # Conversao de texto para data
+from utils.cube import load_courier_sets, load_cube
+from utils.dataset import load_dataset
+from utils.filters import load_bitmap_index
+from utils.lazy import lazy_tabs, prefetch_tabs
+from utils.maps import cluster_map, heatmap_map
+from utils.figures import PAGE_CHARTS, contry_maps
+from utils.metrics import FilteredData, geo_drilldown
+from utils.profiling import profile_page, profile_panel, stage
+from utils.render_cache import cached_render, filter_fingerprint
+from utils.spatial import load_spatial_index
+from utils.warmup import start_warmup
 
-    df['Order_Date'] = pd.to_datetime( df['Order_Date'], format='%d-%m-%Y' )
-
-    # conversao de texto para numeros inteiros (int)
-
-    linhas_vazias = df['multiple_deliveries'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-    df['multiple_deliveries'] = df['multiple_deliveries'].astype( int )
-
-    # Comando para remover o texto de números e convertendo numeros
-
-    df['Time_taken(min)'] = df['Time_taken(min)'].apply( lambda x: x.split ( '(min)' ) [1])
-    df['Time_taken(min)'] = df['Time_taken(min)'].astype(int)   
-
-    # Excluir as linhas com condicoes climaticas dos entregadores vazia
-    # ( Conceitos de seleção condicional )
-
-    linhas_vazias = df['Weatherconditions'] != 'conditions NaN'
-    df = df.loc[linhas_vazias, :]
-
-    # Excluir as linhas com condicoes trafegas dos entregadores vazia
-    # ( Conceitos de seleção condicional )
+st.set_page_config( page_title="Visão Empresa", page_icon="📈", layout ='wide' )
 
-    linhas_vazias = df['Road_traffic_density'] != 'NaN'
-    df = df.loc[linhas_vazias, :]
+# tempos de cada etapa desta página ( painel de debug com ?debug=1 )
+profile_page('visao_empresa')
 
-    # Excluir as linhas com cidades vazias
-    # ( Conceitos de seleção condicional )
+# pré-cálculo dos estados mais usados dos filtros, uma vez por processo
+start_warmup('train.csv')
 
-    linhas_vazias = df['City'] != 'NaN'
-    df = df.loc[linhas_vazias, :]
-    
-    return df
 # -------------------------------- Inicio da Estrutura lógica do código-----------------------------------
 # ------------------------
 # Import dataset
 # ------------------------
-df1 = pd.read_csv('train.csv')
+with stage('load'):
+    # o csv é lido e limpo uma única vez e fica em memória entre os reruns
+    # ( o FilteredData abaixo lê estes mesmos caches do processo )
+    df = load_dataset('train.csv')
 
-# ------------------------
-# Limpando dados
-# ------------------------
-df = clean_code( df1 )
+    # bitmaps por categoria usados nos filtros de transito e clima
+    load_bitmap_index('train.csv')
+
+    # cubo pré-agregado usado pelos graficos de contagem
+    load_cube('train.csv')
+    load_courier_sets('train.csv')
+
+# pontos do drill-down geográfico: rótulo -> índice espacial em grade ( montado
+# só quando a aba geográfica é aberta )
+spatial_points = {'Restaurantes': 'restaurant', 'Locais de entrega': 'delivery'}
 
 #===================================================#
 #     Barra lateral
@@ -247,25 +83,48 @@ traffic_options = st.sidebar.multiselect(
 
 st.sidebar.markdown('''---''') 
 
-# adicionando o dataframe no filtro das datas da barra lateral
-linhas_selecionadas = df['Order_Date'] < date_slider
-df = df.loc[linhas_selecionadas,:]
-
-# filtro de transito da barra lateral
-linhas_selecionadas = df['Road_traffic_density'].isin(traffic_options)
-df = df.loc[linhas_selecionadas,:]
+with stage('filters'):
+    # entradas das métricas com os filtros de data e transito: as células do
+    # cubo, os conjuntos de entregadores e as linhas filtradas ( usadas pelo
+    # mapa ) só são calculados se algum gráfico fora do cache precisar deles
+    data = FilteredData('train.csv', date_max = date_slider, traffic = traffic_options)
+
+# chave do estado dos filtros: os graficos já montados para ela são reaproveitados
+fingerprint = data.fingerprint()
+
+# graficos de cada aba: nome no cache -> ( função, argumentos ); os mesmos
+# nomes são pré-calculados pelo utils.warmup
+charts = {nome: (func, data) for nome, func in PAGE_CHARTS['visao_empresa'].items()}
+# modos do mapa da aba geográfica: o primeiro é o mapa original das
+# medianas; os outros mostram todos os pontos agregados no servidor
+map_modes = {
+    'Medianas por cidade e tráfego': ('contry_maps', contry_maps),
+    'Entregas ( agrupadas )': ('cluster_map_delivery', lambda d: cluster_map(d, 'delivery')),
+    'Entregas ( mapa de calor )': ('heatmap_map_delivery', lambda d: heatmap_map(d, 'delivery')),
+    'Restaurantes ( agrupados )': ('cluster_map_restaurant', lambda d: cluster_map(d, 'restaurant')),
+}
+
+# granularidades da visão tática: rótulo do seletor -> granularidade
+TACTICAL_GRANULARITIES = {'Semana': 'week', 'Dia': 'day', 'Mês': 'month'}
+
+tabs = {
+    'Visão Gerencial': ['order_metric', 'traffic_order_share', 'traffic_order_city'],
+    'Visão Tática': [f'{nome}_{g}' for nome in ['ordern_by', 'order_share_by'] for g in TACTICAL_GRANULARITIES.values()],
+    'Visão Geográfica': ['contry_maps'],
+}
 
 #===================================================#
 #     layout no streamlit
 #===================================================#
 
-tab1,tab2,tab3 = st.tabs(['Visão Gerencial','Visão Tática','Visão Geográfica'])
+# só a aba ativa é montada; as outras vão para o cache em segundo plano
+aba = lazy_tabs(list(tabs), key = 'aba_empresa')
 
-with tab1:
+if aba == 'Visão Gerencial':
     with st.container():
         #order matric 
         st.markdown('# Orders by Day')
-        fig = order_metric (df)
+        fig = cached_render('order_metric', fingerprint, *charts['order_metric'])
         #exibir o grafico
         st.plotly_chart(fig, use_container_width = True)
         
@@ -274,27 +133,59 @@ with tab1:
         
         with col1:
             st.header('Traffic Order Share')
-            fig = traffic_order_share (df)     
+            fig = cached_render('traffic_order_share', fingerprint, *charts['traffic_order_share'])
             st.plotly_chart(fig, use_container_width = True)
 
         with col2:
             st.header('Traffic Order City')
-            fig = traffic_order_city (df)
+            fig = cached_render('traffic_order_city', fingerprint, *charts['traffic_order_city'])
             st.plotly_chart(fig, use_container_width = True)
             
-with tab2:
+elif aba == 'Visão Tática':
+    # períodos calculados das contagens por dia do cubo e dos conjuntos de
+    # entregadores de cada dia
+    periodo = st.radio('Período', list(TACTICAL_GRANULARITIES), horizontal = True)
+    granularidade = TACTICAL_GRANULARITIES[periodo]
+
     with st.container():        
-        st.markdown('# Orders By Week') 
-        fig = ordern_by_week (df)
+        st.markdown(f'# Orders By {granularidade.capitalize()}') 
+        fig = cached_render(f'ordern_by_{granularidade}', fingerprint, *charts[f'ordern_by_{granularidade}'])
         st.plotly_chart(fig, use_container_width = True) 
         
     with st.container():        
-        st.markdown('# Orders Share By Week') 
-        fig = order_share_by_week (df)
+        st.markdown(f'# Orders Share By {granularidade.capitalize()}') 
+        fig = cached_render(f'order_share_by_{granularidade}', fingerprint, *charts[f'order_share_by_{granularidade}'])
         st.plotly_chart(fig, use_container_width = True)
         
-with tab3:
+elif aba == 'Visão Geográfica':
         st.markdown('# Country Maps') 
-        contry_maps (df)
-
-        
+        modo = st.selectbox('Pontos do mapa', list(map_modes))
+        nome, map_func = map_modes[modo]
+        html = cached_render(nome, fingerprint, lambda: map_func(data.rows))
+        components.html( html, width = 1024, height = 610 )
+
+        st.markdown('# Drill-down Geográfico')
+        pontos = st.radio('Pontos do drill-down', list(spatial_points), horizontal = True)
+        with stage('spatial_index'):
+            index = load_spatial_index(spatial_points[pontos], 'train.csv')
+        # o centro padrão é a célula com mais pedidos
+        centro = index['cells'].loc[index['cells']['count'].idxmax()]
+
+        col1,col2,col3 = st.columns(3)
+        lat = col1.number_input('Latitude', value = float(centro['lat']), format = '%.4f')
+        lon = col2.number_input('Longitude', value = float(centro['lon']), format = '%.4f')
+        raio = col3.slider('Raio ( km )', 1, 50, 10)
+
+        df_aux = cached_render('geo_drilldown', filter_fingerprint(fingerprint, pontos, lat, lon, raio),
+                               geo_drilldown, df, index, lat, lon, raio, **data.filters)
+
+        col1,col2,col3 = st.columns(3)
+        pedidos = df_aux['pedidos'].sum()
+        col1.metric('Pedidos no raio', pedidos)
+        col2.metric('Tempo Médio', np.round(np.average(df_aux['tempo_medio'], weights = df_aux['pedidos']), 2) if pedidos else '-')
+        col3.metric('Distância Média', np.round(np.average(df_aux['distancia_media'], weights = df_aux['pedidos']), 2) if pedidos else '-')
+        st.dataframe(df_aux)
+
+prefetch_tabs(aba, fingerprint, tabs, charts)
+
+profile_panel()
@@ -9,122 +9,37 @@ from haversine import haversine
 from PIL import Image
 from streamlit_folium import folium_static
 
-st.set_page_config( page_title="Visão Entregadores", page_icon=":truck:", layout ='wide' )
-
-#===================================================#
-#     Funções
-#===================================================#
-def top_delivers (df,top_asc):
-    """
-        Esta função vai retornar os 10 entregadores mais rapidos ou os 10 
-        entregadores mais lentos de cada cidade.
-        
-        Parâmetros:
-            1- df: dataframe com os dados para o calculo
-            2- top_asc: True para selecionar os entregadores rapidos e False para 
-            os mais lentos.
-            
-        Input: dataframe, top_asc = True ou top_asc = False
-        output: Dataframe
-    """
-    df2 = (df.loc[:,['Time_taken(min)','Delivery_person_ID','City']]
-             .groupby(['City','Delivery_person_ID'])
-             .max()
-             .sort_values(['City','Time_taken(min)'],ascending = top_asc)
-             .reset_index())
-
-    df_aux01 = df2.loc[df2['City'] == 'Metropolitian',:].head(10)
-    df_aux02 = df2.loc[df2['City'] == 'Urban',:].head(10)
-    df_aux03 = df2.loc[df2['City'] == 'Semi-Urban',:].head(10)
-
-    df3 = pd.concat ([df_aux01,df_aux02,df_aux03]).reset_index(drop = True)
-    return df3
-
-def clean_code(df):
-    """Esta função tem a responsabilidade de limpar o dataframe
-    
-        Tipos de limpeza:
-        1. Remoção de dados do NaN
-        2. Conversão de numeros e strings
-        3. Mudança do tipo de coluna de dados
-        4. Remoção dos espaços das variáveis
-        5. Formatação da colunas de datas
-        6.Limpeza da coluna tempo ( remoção do texto da variavel )
-        
-        Input: Dataframe
-        Output: Dataframe
-    """
-    
-    # Remover spaco da string o comando strip excluir espaços vazios no início
-    df.loc[:, 'ID'] = df.loc[:, 'ID'].str.strip()
-    df.loc[:, 'Road_traffic_density'] = df.loc[:, 'Road_traffic_density'].str.strip()
-    df.loc[:, 'Type_of_order'] = df.loc[:, 'Type_of_order'].str.strip()
-    df.loc[:, 'Type_of_vehicle'] = df.loc[:, 'Type_of_vehicle'].str.strip()
-    df.loc[:, 'City'] = df.loc[:, 'City'].str.strip()
-
-    # Excluir as linhas com a idade dos entregadores vazia
-    # ( Conceitos de seleção condicional )
-
-    linhas_vazias = df['Delivery_person_Age'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # excluindo linhas fazias da coluna Estival
-    linhas_vazias = df['Festival'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-
-    # Conversao de texto/categoria/string para numeros inteiros
-
-    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype( int )
-
-    # Conversao de texto/categoria/strings para numeros decimais
-
-    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype( float )
+from utils.cube import load_courier_max
+from utils.dataset import load_dataset
+from utils.filters import load_bitmap_index
+from utils.figures import PAGE_CHARTS
+from utils.metrics import FilteredData
+from utils.profiling import profile_page, profile_panel, stage
+from utils.render_cache import cached_render
+from utils.warmup import start_warmup
 
-    # Conversao de texto para data
-
-    df['Order_Date'] = pd.to_datetime( df['Order_Date'], format='%d-%m-%Y' )
-
-    # conversao de texto para numeros inteiros (int)
-
-    linhas_vazias = df['multiple_deliveries'] != 'NaN '
-    df = df.loc[linhas_vazias, :]
-    df['multiple_deliveries'] = df['multiple_deliveries'].astype( int )
-
-    # Comando para remover o texto de números e convertendo numeros
-
-    df['Time_taken(min)'] = df['Time_taken(min)'].apply( lambda x: x.split ( '(min)' ) [1])
-    df['Time_taken(min)'] = df['Time_taken(min)'].astype(int)   
-
-    # Excluir as linhas com condicoes climaticas dos entregadores vazia
-    # ( Conceitos de seleção condicional )
-
-    linhas_vazias = df['Weatherconditions'] != 'conditions NaN'
-    df = df.loc[linhas_vazias, :]
-
-    # Excluir as linhas com condicoes trafegas dos entregadores vazia
-    # ( Conceitos de seleção condicional )
-
-    linhas_vazias = df['Road_traffic_density'] != 'NaN'
-    df = df.loc[linhas_vazias, :]
+st.set_page_config( page_title="Visão Entregadores", page_icon=":truck:", layout ='wide' )
 
-    # Excluir as linhas com cidades vazias
-    # ( Conceitos de seleção condicional )
+# tempos de cada etapa desta página ( painel de debug com ?debug=1 )
+profile_page('visao_entregadores')
 
-    linhas_vazias = df['City'] != 'NaN'
-    df = df.loc[linhas_vazias, :]
-    
-    return df
+# pré-cálculo dos estados mais usados dos filtros, uma vez por processo
+start_warmup('train.csv')
 
 # -------------------------------- Inicio da Estrutura lógica do código-----------------------------------
 # ------------------------
 # Import dataset
 # ------------------------
-df1 = pd.read_csv('train.csv')
+with stage('load'):
+    # o csv é lido e limpo uma única vez e fica em memória entre os reruns;
+    # os caches do processo são carregados aqui e o FilteredData abaixo os lê
+    load_dataset('train.csv')
 
-# ------------------------
-# Limpando dados
-# ------------------------
-df = clean_code( df1 )
+    # bitmaps por categoria usados nos filtros de transito e clima
+    load_bitmap_index('train.csv')
+
+    # maior tempo de cada entregador por dia, trânsito, clima e cidade ( top_delivers )
+    load_courier_max('train.csv')
 
 #===================================================#
 #     Barra lateral
@@ -175,17 +90,16 @@ Weatherconditions = st.sidebar.multiselect(
 
 st.sidebar.markdown('''---''') 
 
-# adicionando o dataframe no filtro das datas da barra lateral
-linhas_selecionadas = df['Order_Date'] < date_slider
-df = df.loc[linhas_selecionadas,:]
+# entradas das métricas com os filtros de data, transito e clima da barra
+# lateral: as linhas filtradas e as células do maior tempo por entregador só
+# são calculadas se alguma tabela não estiver no cache
+data = FilteredData('train.csv', date_max = date_slider, traffic = traffic_options, weather = Weatherconditions)
 
-# filtro de transito da barra lateral
-linhas_selecionadas = df['Road_traffic_density'].isin(traffic_options)
-df = df.loc[linhas_selecionadas,:]
+# chave do estado dos filtros: as tabelas já montadas para ela são reaproveitadas
+fingerprint = data.fingerprint()
 
-# filtro de transito da barra lateral
-linhas_selecionadas = df['Weatherconditions'].isin(Weatherconditions)
-df = df.loc[linhas_selecionadas,:]
+# tabelas da página: nome no cache -> função ( pré-calculadas pelo utils.warmup )
+charts = PAGE_CHARTS['visao_entregadores']
 
 #===================================================#
 #     layout no streamlit
@@ -197,26 +111,24 @@ with tab1:
     with st.container():
         st.title('Overall Metrics')
 
+        metrics = cached_render('overall_metrics', fingerprint, charts['overall_metrics'], data)
+
         col1,col2,col3,col4 = st.columns(4, gap = 'large')
         with col1:
             #maior idade dos entregadores
-            maior_idade = df.loc[:,'Delivery_person_Age'].max()
-            col1.metric('Maior idade', maior_idade)
+            col1.metric('Maior idade', metrics['maior_idade'])
 
         with col2:
             #menor idade dos entregadores
-            menor_idade = df.loc[:,'Delivery_person_Age'].min()
-            col2.metric('Menor idade', menor_idade)
+            col2.metric('Menor idade', metrics['menor_idade'])
         
         with col3:
             #melhor condição de veiculo
-            melhor_condicao = df.loc[:,'Vehicle_condition'].max()
-            col3.metric('Melhor condição de veiculo', melhor_condicao)
+            col3.metric('Melhor condição de veiculo', metrics['melhor_condicao'])
 
         with col4:
             #pior condição de veiculo
-            pior_condicao = df.loc[:,'Vehicle_condition'].min()
-            col4.metric('Pior condição de veiculo', pior_condicao)
+            col4.metric('Pior condição de veiculo', metrics['pior_condicao'])
     
     with st.container():
         st.markdown('''---''')
@@ -225,26 +137,17 @@ with tab1:
         col1,col2 = st.columns(2)
         with col1:
             st.markdown('#### Avaliação Média por Entregador')
-            df_avg = (df.loc[:,['Delivery_person_Ratings','Delivery_person_ID']]
-               .groupby('Delivery_person_ID')
-               .mean()
-               .reset_index())
+            df_avg = cached_render('ratings_by_courier', fingerprint, charts['ratings_by_courier'], data)
             st.dataframe(df_avg)    
     
         with col2:
             st.markdown('### Avaliação Média por Trânsito')
-            df_agg = (df.loc[:,['Delivery_person_Ratings','Road_traffic_density']].groupby('Road_traffic_density')
-                        .agg({'Delivery_person_Ratings':['mean','std']}).reset_index())
-            #mudando as colunuas
-            df_agg.columns = ['Road_traffic_density','Delivery_mean', 'Delivery_std']
+            df_agg = cached_render('ratings_by_traffic', fingerprint, charts['ratings_by_traffic'], data)
             st.dataframe(df_agg)    
 
             
             st.markdown('### Avaliação Média por Clima')
-            df_aggc = (df.loc[:,['Delivery_person_Ratings','Weatherconditions']].groupby('Weatherconditions')
-                        .agg({'Delivery_person_Ratings':['mean','std']}).reset_index())
-            #mudando as colunuas
-            df_aggc.columns = ['Weatherconditions','Delivery_mean', 'Delivery_std']
+            df_aggc = cached_render('ratings_by_weather', fingerprint, charts['ratings_by_weather'], data)
             st.dataframe(df_aggc)   
 
     with st.container():
@@ -253,13 +156,15 @@ with tab1:
         
         col1,col2 = st.columns(2)
         
+        # os mais rapidos e os mais lentos saem da mesma passada
+        df_rapidos, df_lentos = cached_render('top_delivers', fingerprint, charts['top_delivers'], data)
+
         with col1:
             st.markdown('### Top Entregadores Mais Rapidos')
-            df3 = top_delivers (df, top_asc = True)
-            st.dataframe(df3)
+            st.dataframe(df_rapidos)
 
         with col2:
             st.markdown('### Top Entregadores Mais Lentos')
-            df3 = top_delivers (df, top_asc = False)
-            st.dataframe(df3)
+            st.dataframe(df_lentos)
 
+profile_panel()
@@ -0,0 +1,27 @@
+# importando bibliotecas
+import pytest
+
+from benchmarks.synthetic import generate_orders
+from utils import dataset
+from utils.render_cache import RENDER_CACHE
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    """Cada teste começa sem o dataset e as estruturas derivadas do processo."""
+    monkeypatch.setattr(dataset, '_cache', {})
+    RENDER_CACHE.clear()
+    yield
+    RENDER_CACHE.clear()
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """
+        Grava um csv de pedidos sintéticos no formato do train.csv.
+
+        Uso: write_csv('train.csv', 500, start=0, couriers=None, seed=0)
+    """
+    def gravar(name, rows, start=0, couriers=None, seed=0):
+        path = tmp_path / name
+        generate_orders(rows, start, couriers, seed).to_csv(path, index=False)
+        return str(path)
+    return gravar
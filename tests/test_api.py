@@ -0,0 +1,151 @@
+# importando bibliotecas
+import asyncio
+import json
+import threading
+import types
+
+import pandas as pd
+import pytest
+
+from utils import api
+from utils.api import MetricsServer, ResponseCache, parse_filters
+
+#===================================================#
+#     parse_filters
+#===================================================#
+def test_parse_filters_without_query():
+    assert parse_filters('') == {'date_max': None, 'traffic': None, 'weather': None}
+
+def test_parse_filters_valid():
+    filtros = parse_filters('date_max=2022-03-01&traffic=Low,Jam&weather=conditions+Fog')
+    assert filtros == {'date_max': pd.Timestamp(2022, 3, 1), 'traffic': ['Low', 'Jam'],
+                       'weather': ['conditions Fog']}
+
+def test_parse_filters_repeated_and_short_weather():
+    filtros = parse_filters('traffic=Low&traffic=High,Jam&weather=Fog&weather=conditions+Sunny&date_max=2022-02-20'
+                            '&date_max=2022-03-05')
+    assert filtros['traffic'] == ['Low', 'High', 'Jam']
+    assert filtros['weather'] == ['conditions Fog', 'conditions Sunny']
+    # o último date_max vale
+    assert filtros['date_max'] == pd.Timestamp(2022, 3, 5)
+
+def test_parse_filters_blank_selects_nothing():
+    # parâmetro vazio = nenhuma opção marcada, diferente de parâmetro ausente
+    filtros = parse_filters('traffic=&weather=+,')
+    assert filtros['traffic'] == [] and filtros['weather'] == []
+
+@pytest.mark.parametrize('query, mensagem', [
+    ('city=Urban', 'parâmetros desconhecidos'),
+    ('date_max=ontem', 'date_max inválida'),
+    ('traffic=Low,Heavy', 'traffic inválido'),
+    ('weather=Rain', 'weather inválido'),
+])
+def test_parse_filters_invalid(query, mensagem):
+    with pytest.raises(ValueError, match=mensagem):
+        parse_filters(query)
+
+#===================================================#
+#     ResponseCache
+#===================================================#
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio do utils.api controlado pelo teste ( clock[0] em segundos )."""
+    agora = [1000.0]
+    monkeypatch.setattr(api, 'time', types.SimpleNamespace(monotonic=lambda: agora[0]))
+    return agora
+
+def test_response_cache_etag(clock):
+    cache = ResponseCache(ttl=60)
+    etag, body, expira = cache.put('a', b'{"x": 1}')
+    assert cache.get('a') == (etag, b'{"x": 1}', 1060.0)
+    # o mesmo corpo tem a mesma ETag em qualquer chave; outro corpo, outra ETag
+    assert cache.put('b', b'{"x": 1}')[0] == etag
+    assert cache.put('c', b'{"x": 2}')[0] != etag
+    assert etag.startswith('"') and etag.endswith('"') and len(etag) == 18
+
+def test_response_cache_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.put('a', b'1')
+    clock[0] += 59.9
+    assert cache.get('a') is not None
+    clock[0] += 0.1
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+def test_response_cache_lru(clock):
+    cache = ResponseCache(ttl=60, max_entries=2)
+    cache.put('a', b'1')
+    cache.put('b', b'2')
+    cache.get('a')
+    cache.put('c', b'3')
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+#===================================================#
+#     MetricsServer
+#===================================================#
+@pytest.fixture
+def server(write_csv):
+    servidor = MetricsServer(path=write_csv('train.csv', 2_000), ttl=60, workers=4)
+    yield servidor
+    servidor.executor.shutdown(wait=True)
+
+def test_concurrent_requests_are_coalesced(server):
+    liberar = threading.Event()
+    build = server._build
+    chamadas = []
+
+    def build_lento(name, data):
+        # segura o cálculo até todas as requisições estarem esperando
+        chamadas.append(name)
+        liberar.wait(10)
+        return build(name, data)
+
+    server._build = build_lento
+    filtros = parse_filters('traffic=Low,Jam')
+
+    async def run():
+        tarefas = [asyncio.ensure_future(server.metric('traffic_order_share', filtros)) for _ in range(6)]
+        while server.counters['misses'] + server.counters['coalesced'] < len(tarefas):
+            await asyncio.sleep(0.01)
+        liberar.set()
+        respostas = await asyncio.gather(*tarefas)
+        depois = await server.metric('traffic_order_share', filtros)
+        return respostas, depois
+
+    respostas, depois = asyncio.run(run())
+    assert chamadas == ['traffic_order_share']
+    assert sorted(r[3] for r in respostas) == ['coalesced'] * 5 + ['miss']
+    assert len({r[:3] for r in respostas}) == 1
+    assert depois[3] == 'hit' and depois[:3] == respostas[0][:3]
+    assert server._inflight == {}
+    assert server.counters['misses'] == 1 and server.counters['coalesced'] == 5 and server.counters['hits'] == 1
+
+def test_dispatch_etag_and_not_modified(server):
+    async def run():
+        primeira = await server.dispatch('GET', '/metrics/order_metric?traffic=Low', {})
+        etag = primeira[2]['ETag']
+        igual = await server.dispatch('GET', '/metrics/order_metric?traffic=Low', {'if-none-match': f'"x", {etag}'})
+        outra = await server.dispatch('GET', '/metrics/order_metric?traffic=Low', {'if-none-match': '"x"'})
+        return primeira, igual, outra
+
+    primeira, igual, outra = asyncio.run(run())
+    status, body, extras = primeira
+    assert status == 200 and extras['X-Cache'] == 'miss'
+    assert extras['Cache-Control'] in ('max-age=59', 'max-age=60')
+    assert json.loads(body)['filters']['traffic'] == ['Low']
+
+    assert igual[0] == 304 and igual[1] == b'' and igual[2]['ETag'] == extras['ETag']
+    assert outra[0] == 200 and outra[1] == body and outra[2]['X-Cache'] == 'hit'
+    assert server.counters['not_modified'] == 1
+
+def test_dispatch_errors(server):
+    async def run():
+        return [await server.dispatch(*pedido) for pedido in [
+            ('POST', '/metrics/order_metric', {}),
+            ('GET', '/metrics/nada', {}),
+            ('GET', '/metrics/order_metric?traffic=Heavy', {}),
+        ]]
+
+    assert [r[0] for r in asyncio.run(run())] == [405, 404, 400]
+    assert server.counters['misses'] == 0 and server.counters['requests'] == 3
@@ -0,0 +1,92 @@
+# importando bibliotecas
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.cube
+from utils import dataset
+from utils.cube import load_courier_max, load_courier_sets, load_cube
+from utils.dataset import append_batch, derived_path, load_dataset
+from utils.filters import load_bitmap_index
+
+def assert_same_aggregates(path, expected_path):
+    pd.testing.assert_frame_equal(load_dataset(path), load_dataset(expected_path))
+    pd.testing.assert_frame_equal(load_cube(path), load_cube(expected_path))
+
+    sets, expected = load_courier_sets(path), load_courier_sets(expected_path)
+    pd.testing.assert_index_equal(sets['couriers'], expected['couriers'])
+    pd.testing.assert_frame_equal(sets['keys'], expected['keys'])
+    np.testing.assert_array_equal(sets['bits'], expected['bits'])
+
+    pd.testing.assert_frame_equal(load_courier_max(path), load_courier_max(expected_path))
+
+    index, expected = load_bitmap_index(path), load_bitmap_index(expected_path)
+    assert index['rows'] == expected['rows']
+    for col, bitmaps in expected['bitmaps'].items():
+        assert bitmaps.keys() == index['bitmaps'][col].keys()
+        for valor, bits in bitmaps.items():
+            np.testing.assert_array_equal(index['bitmaps'][col][valor], bits)
+
+@pytest.fixture
+def appended(write_csv, tmp_path):
+    """
+        csv com um lote acrescentado por append_batch ( com os agregados já
+        carregados ) e o mesmo csv montado do zero em outro diretório.
+    """
+    path = write_csv('train.csv', 3_000, couriers=60)
+    # o lote repete datas do histórico e traz entregadores novos
+    batch = write_csv('lote.csv', 700, start=3_000, couriers=90, seed=1)
+
+    load_cube(path)
+    load_courier_sets(path)
+    load_courier_max(path)
+    load_bitmap_index(path)
+    novos = append_batch(batch, path)
+    assert 0 < novos <= 700
+
+    (tmp_path / 'full').mkdir()
+    expected_path = str(tmp_path / 'full' / 'train.csv')
+    shutil.copyfile(path, expected_path)
+    return path, expected_path
+
+def test_append_batch_equals_full_rebuild(appended):
+    path, expected_path = appended
+    assert_same_aggregates(path, expected_path)
+
+def test_append_batch_in_a_process_that_never_loaded_the_aggregates(write_csv, tmp_path):
+    # como o `python -m utils.dataset --append`: só o dataset foi carregado
+    path = write_csv('train.csv', 2_000, couriers=40)
+    batch = write_csv('lote.csv', 500, start=2_000, couriers=70, seed=2)
+    load_dataset(path)
+    append_batch(batch, path)
+
+    (tmp_path / 'full').mkdir()
+    expected_path = str(tmp_path / 'full' / 'train.csv')
+    shutil.copyfile(path, expected_path)
+    assert_same_aggregates(path, expected_path)
+
+def test_persisted_aggregates_are_read_back(appended, monkeypatch):
+    path, expected_path = appended
+    for name in ['cube', 'courier_sets', 'courier_max']:
+        assert os.path.exists(derived_path(path, name))
+
+    # um processo novo: sem nada em memória, os agregados com merge vêm dos
+    # arquivos gravados pelo append_batch, sem passar pelos builders
+    monkeypatch.setattr(dataset, '_cache', {})
+
+    def falha(df):
+        raise AssertionError('agregado montado de novo a partir das linhas')
+
+    for builder in ['build_cube', 'build_courier_sets', 'build_courier_max']:
+        monkeypatch.setattr(utils.cube, builder, falha)
+    persisted = {'cube': load_cube(path), 'courier_sets': load_courier_sets(path),
+                 'courier_max': load_courier_max(path)}
+    monkeypatch.undo()
+
+    monkeypatch.setattr(dataset, '_cache', {})
+    pd.testing.assert_frame_equal(persisted['cube'], load_cube(expected_path))
+    np.testing.assert_array_equal(persisted['courier_sets']['bits'], load_courier_sets(expected_path)['bits'])
+    pd.testing.assert_frame_equal(persisted['courier_max'], load_courier_max(expected_path))
@@ -0,0 +1,48 @@
+# importando bibliotecas
+import numpy as np
+import pandas as pd
+
+from utils.cube import build_cube
+from utils.dataset import CATEGORIES
+from utils.figures import avg_std_time_on_traffic, distance, traffic_order_city, traffic_order_share
+from utils.metrics import time_stats
+
+def cleaned_rows(cities):
+    """Linhas limpas com as colunas do cubo, só com as cidades de `cities`."""
+    rng = np.random.default_rng(0)
+    n = 40
+    df = pd.DataFrame({
+        'Order_Date': pd.Timestamp(2022, 2, 11) + pd.to_timedelta(rng.integers(0, 5, n), unit='D'),
+        'City': [cities[i % len(cities)] for i in range(n)],
+        'Road_traffic_density': ['Jam'] * n,
+        'Weatherconditions': ['conditions Sandstorms'] * n,
+        'Festival': ['No'] * n,
+        'Type_of_order': ['Meal'] * n,
+        'Time_taken(min)': rng.integers(10, 50, n),
+        'Delivery_person_Ratings': rng.uniform(3, 5, n),
+        'distance': rng.uniform(1, 20, n),
+    })
+    for col in ['City', 'Road_traffic_density', 'Weatherconditions', 'Festival', 'Type_of_order']:
+        df[col] = pd.Categorical(df[col], categories=CATEGORIES[col])
+    return df
+
+def test_charts_with_a_city_without_orders():
+    # um estado dos filtros que deixa Semi-Urban sem pedidos
+    cube = build_cube(cleaned_rows(['Metropolitian', 'Urban']))
+    stats = time_stats(cube)
+
+    fig = traffic_order_city(cube)
+    assert sorted(trace.name for trace in fig.data) == ['Metropolitian', 'Urban']
+    traffic_order_share(cube)
+    fig = avg_std_time_on_traffic(stats)
+    assert 'Semi-Urban' not in set(fig.data[0].labels)
+
+    fig = distance(cube, fig=True)
+    assert list(fig.data[0].labels) == ['Metropolitian', 'Urban']
+    assert list(fig.data[0].pull) == [0, 0]
+
+def test_distance_pull_highlights_semi_urban():
+    cube = build_cube(cleaned_rows(['Metropolitian', 'Urban', 'Semi-Urban']))
+    fig = distance(cube, fig=True)
+    pull = dict(zip(fig.data[0].labels, fig.data[0].pull))
+    assert pull == {'Metropolitian': 0, 'Urban': 0, 'Semi-Urban': 0.1}
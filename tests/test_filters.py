@@ -0,0 +1,74 @@
+# importando bibliotecas
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.dataset import CATEGORIES, load_dataset
+from utils.filters import bitmap_mask, build_bitmap_index, filter_rows
+
+TRAFFIC = CATEGORIES['Road_traffic_density']
+WEATHER = CATEGORIES['Weatherconditions']
+CITY = CATEGORIES['City']
+
+# Filtros com todas as categorias, uma só, nenhuma ( multiselect vazio ),
+# valores que não existem no dataset e cortes de data
+STATES = [
+    {},
+    {'traffic': TRAFFIC, 'weather': WEATHER, 'city': CITY},
+    {'traffic': ['Jam']},
+    {'weather': ['conditions Fog']},
+    {'city': ['Semi-Urban']},
+    {'traffic': []},
+    {'weather': [], 'traffic': TRAFFIC},
+    {'traffic': ['Low', 'High'], 'weather': ['conditions Sunny', 'conditions Windy'], 'city': ['Urban']},
+    {'traffic': ['Jam', 'Engarrafado']},
+    {'date_max': pd.Timestamp(2022, 3, 1)},
+    {'date_max': pd.Timestamp(2022, 3, 1), 'traffic': ['Medium'], 'city': ['Metropolitian', 'Urban']},
+    {'date_max': pd.Timestamp(2022, 2, 11), 'traffic': ['Low']},
+    {'date_max': pd.Timestamp(2030, 1, 1), 'weather': ['conditions Stormy']},
+]
+
+@pytest.fixture
+def df(write_csv):
+    df = load_dataset(write_csv('train.csv', 1_003, couriers=40))
+    # o último byte dos bitmaps fica incompleto
+    assert len(df) % 8
+    return df
+
+def isin_reference(df, date_max=None, traffic=None, weather=None, city=None):
+    """Os filtros como as páginas faziam antes: comparação de data e isin em cada coluna."""
+    mask = np.ones(len(df), dtype=bool)
+    if date_max is not None:
+        mask &= (df['Order_Date'] < date_max).to_numpy()
+    for col, selecionadas in [('Road_traffic_density', traffic), ('Weatherconditions', weather), ('City', city)]:
+        if selecionadas is not None:
+            mask &= df[col].isin(selecionadas).to_numpy()
+    return df.loc[mask, :]
+
+@pytest.mark.parametrize('state', STATES)
+def test_bitmap_filter_equals_isin(df, state):
+    esperado = isin_reference(df, **state)
+    pd.testing.assert_frame_equal(filter_rows(df, index=build_bitmap_index(df), **state), esperado)
+    pd.testing.assert_frame_equal(filter_rows(df, **state), esperado)
+
+@pytest.mark.parametrize('rows', [0, 1, 7, 8, 9, 500, None])
+def test_bitmap_mask_on_date_prefix(df, rows):
+    # a fatia do corte de data são as primeiras `rows` linhas ( None = todas )
+    rows = len(df) if rows is None else rows
+    index = build_bitmap_index(df)
+    filtros = {'Road_traffic_density': ['Low', 'Jam'], 'Weatherconditions': ['conditions Cloudy'], 'City': None}
+    mask = bitmap_mask(index, filtros, rows)
+    parte = df.iloc[:rows]
+    esperado = (parte['Road_traffic_density'].isin(['Low', 'Jam'])
+                & parte['Weatherconditions'].isin(['conditions Cloudy'])).to_numpy()
+    assert mask.dtype == bool
+    np.testing.assert_array_equal(mask, esperado)
+
+def test_bitmap_mask_without_restrictions(df):
+    index = build_bitmap_index(df)
+    assert bitmap_mask(index, {'Road_traffic_density': None, 'Weatherconditions': WEATHER}, len(df)) is None
+    assert not bitmap_mask(index, {'Road_traffic_density': []}, len(df)).any()
+
+def test_index_from_another_dataframe(df):
+    with pytest.raises(ValueError):
+        filter_rows(df, traffic=['Jam'], index=build_bitmap_index(df.iloc[:10]))
@@ -0,0 +1,41 @@
+# importando bibliotecas
+import numpy as np
+from haversine import haversine
+
+from utils.geo import haversine_np
+
+def reference(lat1, lon1, lat2, lon2):
+    """Distâncias do pacote haversine, ponto a ponto."""
+    return np.array([haversine((a, b), (c, d)) for a, b, c, d in zip(lat1, lon1, lat2, lon2)])
+
+def test_matches_haversine_package_on_random_points():
+    rng = np.random.default_rng(0)
+    n = 2_000
+    lat1, lat2 = rng.uniform(-90, 90, (2, n))
+    lon1, lon2 = rng.uniform(-180, 180, (2, n))
+    np.testing.assert_allclose(haversine_np(lat1, lon1, lat2, lon2), reference(lat1, lon1, lat2, lon2),
+                               rtol=1e-9)
+
+def test_matches_haversine_package_on_edge_cases():
+    pontos = np.array([
+        # pontos iguais
+        (22.745049, 75.892471, 22.745049, 75.892471),
+        (-33.8688, 151.2093, -33.8688, 151.2093),
+        # latitudes negativas ( as coordenadas negativas do dataset )
+        (-22.745049, -75.892471, -22.765049, -75.912471),
+        (-12.97, 77.59, 12.97, 77.59),
+        # quase antípodas
+        (0.0, 0.0, 0.0, 179.9999),
+        (45.0, 10.0, -45.0, -169.9999),
+        (89.9999, 0.0, -89.9999, 0.0),
+        # poucos metros
+        (12.9716, 77.5946, 12.97161, 77.59461),
+    ])
+    lat1, lon1, lat2, lon2 = pontos.T
+    np.testing.assert_allclose(haversine_np(lat1, lon1, lat2, lon2), reference(lat1, lon1, lat2, lon2),
+                               rtol=1e-9, atol=1e-12)
+    assert haversine_np(*pontos[0]) == 0
+
+def test_scalar_input():
+    assert np.isclose(haversine_np(22.745049, 75.892471, 22.765049, 75.912471),
+                      haversine((22.745049, 75.892471), (22.765049, 75.912471)), rtol=1e-9)
@@ -0,0 +1,133 @@
+# importando bibliotecas
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.dataset import load_dataset
+from utils.metrics import METRICS, batch, compute
+
+# Estados dos filtros da barra lateral: sem filtro, cortes de data, trânsito e
+# clima, combinados e um estado sem nenhum pedido ( multiselect vazio )
+STATES = [
+    {},
+    {'date_max': pd.Timestamp(2022, 3, 1)},
+    {'traffic': ['Jam']},
+    {'traffic': ['Low', 'High'], 'weather': ['conditions Fog', 'conditions Sunny']},
+    {'date_max': pd.Timestamp(2022, 2, 20), 'traffic': ['Medium'], 'weather': ['conditions Windy']},
+    {'traffic': []},
+]
+
+@pytest.fixture
+def path(write_csv):
+    return write_csv('train.csv', 2_000, couriers=50)
+
+def filtered_rows(path, date_max=None, traffic=None, weather=None):
+    """Linhas filtradas com pandas puro, como as páginas faziam antes do motor."""
+    df = load_dataset(path)
+    mask = np.ones(len(df), dtype=bool)
+    if date_max is not None:
+        mask &= df['Order_Date'] < date_max
+    if traffic is not None:
+        mask &= df['Road_traffic_density'].isin(traffic)
+    if weather is not None:
+        mask &= df['Weatherconditions'].isin(weather)
+    return df.loc[mask, :]
+
+def by_label(serie):
+    """Série indexada pelos rótulos como texto, em ordem ( compara sem depender da ordem dos grupos )."""
+    serie = serie.copy()
+    serie.index = serie.index.map(lambda v: tuple(map(str, v)) if isinstance(v, tuple) else str(v))
+    return serie.sort_index()
+
+def assert_close(a, b):
+    pd.testing.assert_series_equal(by_label(a), by_label(b), check_names=False, check_index_type=False,
+                                   check_dtype=False, rtol=1e-9)
+
+def assert_same(a, b):
+    """Compara os resultados das métricas ( tabelas, tuplas, dicionários e números )."""
+    if isinstance(a, pd.DataFrame):
+        pd.testing.assert_frame_equal(a, b, check_exact=False, rtol=1e-9)
+    elif isinstance(a, (tuple, list)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            assert_same(x, y)
+    elif isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for chave in a:
+            assert_same(a[chave], b[chave])
+    else:
+        np.testing.assert_allclose(a, b, rtol=1e-9)
+
+def test_batch_equals_compute_for_each_state(path):
+    # o primeiro estado repetido no fim: estados iguais saem do mesmo cálculo
+    states = STATES + [STATES[0]]
+    resultados = batch(states, path=path)
+    assert len(resultados) == len(states)
+    for state, resultado in zip(states, resultados):
+        assert_same(resultado, compute(path=path, **state))
+
+@pytest.mark.parametrize('state', STATES)
+def test_cube_metrics_match_rows(path, state):
+    rows = filtered_rows(path, **state)
+    tabelas = compute(path=path, **state)
+
+    por_dia = rows.groupby('Order_Date').size()
+    orders_by_day = tabelas['orders_by_day']
+    assert orders_by_day['Order_Date'].tolist() == por_dia.index.tolist()
+    assert orders_by_day['ID'].tolist() == por_dia.tolist()
+
+    por_transito = rows['Road_traffic_density'].astype(str).value_counts()
+    share = tabelas['traffic_share'].set_index(tabelas['traffic_share']['Road_traffic_density'].astype(str))
+    assert share['ID'].to_dict() == por_transito.to_dict()
+    np.testing.assert_allclose(share['perc_ID'].sum(), 100 if len(rows) else 0)
+
+    por_cidade = rows.groupby(['Road_traffic_density', 'City'], observed=True).size()
+    assert tabelas['traffic_city'].set_index(['Road_traffic_density', 'City'])['ID'].sort_index().to_dict() == \
+        por_cidade.sort_index().to_dict()
+
+    semanas = rows['Order_Date'].dt.to_period('W').dt.start_time
+    por_semana = rows.groupby(semanas).agg(ID=('ID', 'size'), couriers=('Delivery_person_ID', 'nunique'))
+    by_week = tabelas['orders_per_courier_by_week'].set_index('bucket')
+    assert by_week.index.tolist() == por_semana.index.tolist()
+    assert by_week['ID'].tolist() == por_semana['ID'].tolist()
+    assert by_week['Delivery_person_ID'].tolist() == por_semana['couriers'].tolist()
+    np.testing.assert_allclose(by_week['order_by_delivery'], por_semana['ID'] / por_semana['couriers'])
+
+    assert tabelas['distinct_couriers'] == rows['Delivery_person_ID'].nunique()
+
+def test_time_and_distance_metrics_match_rows(path):
+    state = STATES[3]
+    rows = filtered_rows(path, **state)
+    tabelas = compute(path=path, **state)
+
+    assert tabelas['avg_distance'] == np.round(rows['distance'].mean(), 2)
+    distancia = rows.groupby('City', observed=True)['distance'].mean()
+    assert_close(tabelas['distance_by_city'].set_index('City')['distance'], distancia)
+
+    festival = rows.groupby('Festival', observed=True)['Time_taken(min)'].agg(['mean', 'std'])
+    stats = tabelas['time_stats']['Festival']
+    assert_close(stats['avg_time'], festival['mean'])
+    assert_close(stats['std_time'], festival['std'])
+
+    cidade_transito = rows.groupby(['City', 'Road_traffic_density'], observed=True)['Time_taken(min)'].agg(['count', 'mean'])
+    stats = tabelas['time_stats']['City_traffic']
+    assert_close(stats['count'], cidade_transito['count'])
+    assert_close(stats['avg_time'], cidade_transito['mean'])
+
+    notas = rows.groupby('Road_traffic_density', observed=True)['Delivery_person_Ratings'].agg(['mean', 'std'])
+    ratings = tabelas['ratings_by_traffic'].set_index('Road_traffic_density')
+    assert_close(ratings['Delivery_mean'], notas['mean'])
+    assert_close(ratings['Delivery_std'], notas['std'])
+
+    assert tabelas['overall_metrics']['maior_idade'] == rows['Delivery_person_Age'].max()
+    assert tabelas['overall_metrics']['pior_condicao'] == rows['Vehicle_condition'].min()
+
+def test_empty_filter_state(path):
+    tabelas = compute(path=path, traffic=[])
+    assert set(tabelas) == set(METRICS)
+    for nome in ['orders_by_day', 'traffic_share', 'traffic_city', 'orders_by_week', 'orders_by_month',
+                 'orders_per_courier_by_week', 'distance_by_city', 'ratings_by_courier', 'ratings_by_traffic']:
+        assert len(tabelas[nome]) == 0, nome
+    assert tabelas['distinct_couriers'] == 0
+    assert all(len(df) == 0 for df in tabelas['top_delivers'])
+    assert all(len(df) == 0 for df in tabelas['time_stats'].values())
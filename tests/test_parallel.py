@@ -0,0 +1,69 @@
+# importando bibliotecas
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cube import build_courier_max, build_courier_sets, build_cube
+from utils.dataset import clean_code, read_dataset
+from utils.parallel import parallel_clean, partition_csv
+
+def serial(path):
+    """Dataframe limpo e agregados montados sem partições."""
+    raw = read_dataset(path)
+    df = clean_code(raw)
+    return df, len(raw), {'cube': build_cube(df), 'courier_sets': build_courier_sets(df),
+                          'courier_max': build_courier_max(df)}
+
+def assert_same_as_serial(path, workers):
+    df, rows, derived = parallel_clean(path, workers)
+    esperado, esperado_rows, esperados = serial(path)
+    assert rows == esperado_rows
+    pd.testing.assert_frame_equal(df, esperado)
+
+    pd.testing.assert_frame_equal(derived['cube'][0], esperados['cube'])
+    sets = derived['courier_sets'][0]
+    pd.testing.assert_frame_equal(sets['keys'], esperados['courier_sets']['keys'])
+    pd.testing.assert_index_equal(sets['couriers'], esperados['courier_sets']['couriers'])
+    np.testing.assert_array_equal(sets['bits'], esperados['courier_sets']['bits'])
+
+    # o maior tempo comparado com as linhas ordenadas
+    cols = list(esperados['courier_max'].columns)
+    ordenar = lambda t: t.astype(str).sort_values(cols).reset_index(drop=True)
+    pd.testing.assert_frame_equal(ordenar(derived['courier_max'][0]), ordenar(esperados['courier_max']))
+
+@pytest.mark.parametrize('workers', [1, 2, 3, 4])
+def test_parallel_clean_equals_serial(write_csv, workers):
+    assert_same_as_serial(write_csv('train.csv', 1_500, couriers=40), workers)
+
+@pytest.mark.parametrize('workers', [1, 2, 3, 4])
+def test_last_line_without_newline(write_csv, workers):
+    path = write_csv('train.csv', 301, couriers=20)
+    with open(path, 'rb') as f:
+        conteudo = f.read()
+    with open(path, 'wb') as f:
+        f.write(conteudo.rstrip(b'\r\n'))
+    assert_same_as_serial(path, workers)
+
+def test_more_workers_than_rows(write_csv):
+    path = write_csv('train.csv', 3, couriers=3)
+    assert len(partition_csv(path, 8)) <= 3
+    assert_same_as_serial(path, 8)
+
+def test_partitions_cover_every_line_once(write_csv):
+    path = write_csv('train.csv', 997, couriers=30)
+    with open(path, 'rb') as f:
+        cabecalho = f.readline()
+        linhas = f.read()
+    for partitions in range(1, 12):
+        trechos = partition_csv(path, partitions)
+        # contínuos, sem o cabeçalho e cortados no fim de uma linha
+        assert trechos[0][0] == len(cabecalho)
+        assert trechos[-1][1] == len(cabecalho) + len(linhas)
+        assert all(b == c for (_, b), (c, _) in zip(trechos, trechos[1:]))
+        with open(path, 'rb') as f:
+            partes = []
+            for a, b in trechos:
+                f.seek(a)
+                partes.append(f.read(b - a))
+        assert all(p.endswith(b'\n') for p in partes[:-1])
+        assert b''.join(partes) == linhas
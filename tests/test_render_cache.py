@@ -0,0 +1,76 @@
+# importando bibliotecas
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.render_cache import RenderCache, filter_fingerprint
+
+def test_lru_eviction_under_max_bytes():
+    # textos de 100 bytes: cabem 3 entradas em 350 bytes
+    cache = RenderCache(max_bytes=350)
+    for nome in ['a', 'b', 'c']:
+        cache.put((nome, 'fp'), nome * 100)
+    # a leitura de 'a' o torna o mais recente: 'b' passa a ser o mais antigo
+    assert cache.get(('a', 'fp')) == 'a' * 100
+    cache.put(('d', 'fp'), 'd' * 100)
+
+    assert ('b', 'fp') not in cache
+    assert all((nome, 'fp') in cache for nome in ['a', 'c', 'd'])
+    assert cache.stats()['bytes'] == 300 <= cache.max_bytes
+
+    cache.put(('e', 'fp'), 'e' * 300)
+    assert cache.stats()['entries'] == 1 and ('e', 'fp') in cache
+
+def test_value_larger_than_the_cache_is_not_stored():
+    cache = RenderCache(max_bytes=100)
+    cache.put(('a', 'fp'), 'a' * 50)
+    cache.put(('grande', 'fp'), 'x' * 101)
+    assert ('grande', 'fp') not in cache and ('a', 'fp') in cache
+
+def test_replacing_a_key_updates_the_size():
+    cache = RenderCache(max_bytes=1_000)
+    cache.put(('a', 'fp'), 'a' * 100)
+    cache.put(('a', 'fp'), 'a' * 40)
+    assert cache.stats()['entries'] == 1 and cache.stats()['bytes'] == 40
+
+def test_memoize_calls_the_function_once_per_key():
+    cache = RenderCache()
+    chamadas = []
+
+    def montar(x):
+        chamadas.append(x)
+        return pd.DataFrame({'x': [x]})
+
+    primeiro = cache.memoize('tabela', 'fp1', montar, 1)
+    segundo = cache.memoize('tabela', 'fp1', montar, 1)
+    assert chamadas == [1]
+    pd.testing.assert_frame_equal(primeiro, segundo)
+
+    cache.memoize('tabela', 'fp2', montar, 2)
+    cache.memoize('outra', 'fp1', montar, 3)
+    assert chamadas == [1, 2, 3]
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 3
+
+def test_figures_are_rebuilt_for_each_read():
+    cache = RenderCache()
+    cache.memoize('fig', 'fp', lambda: go.Figure(go.Bar(x=[1, 2], y=[3, 4])))
+    a = cache.memoize('fig', 'fp', lambda: None)
+    b = cache.memoize('fig', 'fp', lambda: None)
+    # cada sessão recebe o seu objeto
+    assert a is not b
+    assert list(a.data[0].y) == list(b.data[0].y) == [3, 4]
+
+def test_fingerprint_ignores_selection_order():
+    data = pd.Timestamp(2022, 3, 1)
+    a = filter_fingerprint('v1', date_max=data, traffic=['Low', 'Jam'], weather=('conditions Fog', 'conditions Sunny'))
+    b = filter_fingerprint('v1', weather=['conditions Sunny', 'conditions Fog'], traffic={'Jam', 'Low'},
+                           date_max=data.to_pydatetime())
+    assert a == b
+    assert len(a) == 16
+
+def test_fingerprint_distinguishes_states():
+    base = filter_fingerprint('v1', date_max=None, traffic=['Low'])
+    assert filter_fingerprint('v2', date_max=None, traffic=['Low']) != base
+    assert filter_fingerprint('v1', date_max=None, traffic=['Jam']) != base
+    assert filter_fingerprint('v1', date_max=None, traffic=[]) != base
+    assert filter_fingerprint('v1', date_max=None, traffic=None) != filter_fingerprint('v1', date_max=None, traffic=[])
+    assert filter_fingerprint('v1', date_max=pd.Timestamp(2022, 3, 1), traffic=['Low']) != base
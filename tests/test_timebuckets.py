@@ -0,0 +1,58 @@
+# importando bibliotecas
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.timebuckets import GRANULARITIES, bucket_columns, bucket_start, iso_year_week
+
+# Datas nas viradas de ano, onde o ano ISO difere do ano da data
+EDGE_DATES = pd.Series(pd.to_datetime([
+    '2020-12-28', '2020-12-31', '2021-01-01', '2021-01-03', '2021-01-04',
+    '2021-12-31', '2022-01-02', '2022-01-03', '2024-02-29', '2024-12-29',
+    '2024-12-30', '2025-01-01', '2025-12-31', '2026-01-01', '1970-01-01', '1969-12-29',
+]))
+
+# Todos os dias de 2019 a 2027 ( anos com 52 e 53 semanas ISO e anos bissextos )
+ALL_DATES = pd.Series(pd.date_range('2019-01-01', '2027-12-31', freq='D'))
+
+@pytest.mark.parametrize('dates', [EDGE_DATES, ALL_DATES])
+def test_iso_year_week_matches_isocalendar(dates):
+    ano, semana = iso_year_week(dates)
+    esperado = dates.dt.isocalendar()
+    np.testing.assert_array_equal(ano, esperado['year'].to_numpy(dtype=np.int64))
+    np.testing.assert_array_equal(semana, esperado['week'].to_numpy(dtype=np.int64))
+
+def test_known_iso_weeks():
+    ano, semana = iso_year_week(pd.to_datetime(['2020-12-31', '2021-01-03', '2024-12-30']))
+    assert list(zip(ano, semana)) == [(2020, 53), (2020, 53), (2025, 1)]
+
+@pytest.mark.parametrize('dates', [EDGE_DATES, ALL_DATES])
+def test_bucket_start_matches_periods(dates):
+    np.testing.assert_array_equal(bucket_start(dates, 'day'), dates.to_numpy())
+    # o período 'W' do pandas vai de segunda a domingo, como a semana ISO
+    np.testing.assert_array_equal(bucket_start(dates, 'week'), dates.dt.to_period('W').dt.start_time.to_numpy())
+    np.testing.assert_array_equal(bucket_start(dates, 'month'), dates.dt.to_period('M').dt.start_time.to_numpy())
+
+def test_bucket_start_keeps_time_of_day_out():
+    datas = pd.Series(pd.to_datetime(['2021-01-03 23:59:59', '2021-01-04 00:00:01']))
+    np.testing.assert_array_equal(bucket_start(datas, 'week'), pd.to_datetime(['2020-12-28', '2021-01-04']).to_numpy())
+
+@pytest.mark.parametrize('granularity', GRANULARITIES)
+def test_bucket_columns(granularity):
+    inicios = bucket_start(ALL_DATES, granularity)
+    colunas = bucket_columns(inicios, granularity)
+    inicios = pd.Series(inicios)
+    if granularity == 'week':
+        esperado = inicios.dt.isocalendar()
+        assert list(colunas) == ['year', 'week']
+        np.testing.assert_array_equal(colunas['year'], esperado['year'].to_numpy(dtype=np.int64))
+        np.testing.assert_array_equal(colunas['week'], esperado['week'].to_numpy(dtype=np.int64))
+    else:
+        np.testing.assert_array_equal(colunas['year'], inicios.dt.year)
+        np.testing.assert_array_equal(colunas['month'], inicios.dt.month)
+        if granularity == 'day':
+            np.testing.assert_array_equal(colunas['day'], inicios.dt.day)
+
+def test_invalid_granularity():
+    with pytest.raises(ValueError):
+        bucket_start(EDGE_DATES, 'year')
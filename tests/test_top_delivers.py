@@ -0,0 +1,71 @@
+# importando bibliotecas
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.cube import build_courier_max
+from utils.dataset import CATEGORIES, category_list
+from utils.metrics import top_delivers
+
+def baseline(df, top_asc):
+    """top_delivers da página original: ordenação completa e head(10) por cidade."""
+    df2 = (df.loc[:,['Time_taken(min)','Delivery_person_ID','City']]
+             .groupby(['City','Delivery_person_ID'])
+             .max()
+             .sort_values(['City','Time_taken(min)'],ascending = top_asc)
+             .reset_index())
+
+    df_aux01 = df2.loc[df2['City'] == 'Metropolitian',:].head(10)
+    df_aux02 = df2.loc[df2['City'] == 'Urban',:].head(10)
+    df_aux03 = df2.loc[df2['City'] == 'Semi-Urban',:].head(10)
+
+    df3 = pd.concat ([df_aux01,df_aux02,df_aux03]).reset_index(drop = True)
+    return df3.loc[:, ['City','Delivery_person_ID','Time_taken(min)']]
+
+def orders(cities, seed=0):
+    """
+        Pedidos com poucos valores de tempo ( muitos empates no maior tempo
+        de cada entregador ). cities: cidade -> quantidade de entregadores.
+    """
+    rng = np.random.default_rng(seed)
+    partes = []
+    for city, couriers in cities.items():
+        ids = [f'{city[:3].upper()}RES{i:02d}DEL01' for i in range(couriers)]
+        n = couriers * 4
+        partes.append(pd.DataFrame({'City': city,
+                                    'Delivery_person_ID': rng.choice(ids, n),
+                                    'Time_taken(min)': rng.integers(20, 26, n)}))
+    df = pd.concat(partes, ignore_index=True).sample(frac=1, random_state=seed)
+    df['City'] = pd.Categorical(df['City'], categories=CATEGORIES['City'])
+    df['Delivery_person_ID'] = pd.Categorical(
+        df['Delivery_person_ID'], categories=category_list([], set(df['Delivery_person_ID'])))
+    df['Order_Date'] = pd.Timestamp(2022, 3, 1)
+    df['Road_traffic_density'] = pd.Categorical(['Low'] * len(df), categories=CATEGORIES['Road_traffic_density'])
+    df['Weatherconditions'] = pd.Categorical(['conditions Fog'] * len(df), categories=CATEGORIES['Weatherconditions'])
+    return df
+
+def as_text(df):
+    return df.astype({'City': str, 'Delivery_person_ID': str}).reset_index(drop=True)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_baseline_sort_and_head(seed):
+    # Urban sem pedidos e Semi-Urban com menos de 10 entregadores
+    df = orders({'Metropolitian': 60, 'Semi-Urban': 6}, seed)
+    texto = df.astype({'City': object, 'Delivery_person_ID': object})
+    rapidos, lentos = top_delivers(df)
+    pd.testing.assert_frame_equal(as_text(rapidos), as_text(baseline(texto, True)))
+    pd.testing.assert_frame_equal(as_text(lentos), as_text(baseline(texto, False)))
+
+    # as células do maior tempo por entregador dão o mesmo resultado
+    rapidos, lentos = top_delivers(build_courier_max(df))
+    pd.testing.assert_frame_equal(as_text(rapidos), as_text(baseline(texto, True)))
+    pd.testing.assert_frame_equal(as_text(lentos), as_text(baseline(texto, False)))
+
+def test_k_and_missing_cities():
+    df = orders({'Urban': 3}, 0)
+    rapidos, lentos = top_delivers(df, k=10)
+    assert set(rapidos['City']) == set(lentos['City']) == {'Urban'}
+    assert len(rapidos) == len(lentos) == 3
+
+    rapidos, lentos = top_delivers(df.iloc[:0])
+    assert len(rapidos) == len(lentos) == 0
@@ -0,0 +1,359 @@
+# importando bibliotecas
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from utils.dataset import CATEGORIES, DATASET_PATH
+from utils.metrics import METRICS, FilteredData, compute, orders_by_day, traffic_share
+
+#===================================================#
+#     Serviço HTTP/JSON das métricas
+#===================================================#
+# Endereço padrão do serviço ( o streamlit usa a 8501 )
+API_HOST = os.environ.get('CURRY_API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('CURRY_API_PORT', '8502'))
+
+# Tempo em segundos que uma resposta fica no cache ( e no Cache-Control )
+API_TTL = float(os.environ.get('CURRY_API_TTL', '60'))
+
+# Respostas guardadas no cache ( as mais antigas saem primeiro )
+API_CACHE_ENTRIES = int(os.environ.get('CURRY_API_CACHE_ENTRIES', '1024'))
+
+# Threads que calculam as métricas fora do loop do asyncio
+API_WORKERS = int(os.environ.get('CURRY_API_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Tabelas servidas em /metrics/<nome>: os nomes são os dos gráficos e tabelas
+# das páginas, e cada função recebe o FilteredData do estado dos filtros
+ENDPOINTS = {
+    'order_metric': lambda data: orders_by_day(data.cube),
+    'traffic_order_share': lambda data: traffic_share(data.cube),
+    'avg_std_time_graph': lambda data: data.stats['City'].reset_index(),
+    'ratings_by_courier': METRICS['ratings_by_courier'],
+    'ratings_by_traffic': METRICS['ratings_by_traffic'],
+    'ratings_by_weather': METRICS['ratings_by_weather'],
+}
+
+# Parâmetros de filtro aceitos na url -> coluna com os valores válidos
+FILTER_COLUMNS = {'traffic': 'Road_traffic_density', 'weather': 'Weatherconditions'}
+
+def parse_filters(query):
+    """
+        Esta função converte a query string nos filtros da barra lateral.
+
+        Uso: date_max=2022-03-01&traffic=Low,Jam&weather=conditions+Fog
+             ( traffic e weather aceitam vírgulas ou o parâmetro repetido, e
+             o clima também sem o 'conditions ', ex: weather=Fog )
+
+        Input: query string da url
+        Output: dicionário com date_max, traffic e weather ( None = sem filtro )
+    """
+    params = parse_qs(query, keep_blank_values=True)
+    desconhecidos = set(params) - {'date_max', *FILTER_COLUMNS}
+    if desconhecidos:
+        raise ValueError(f'parâmetros desconhecidos: {", ".join(sorted(desconhecidos))}')
+
+    filtros = {'date_max': None, 'traffic': None, 'weather': None}
+    if 'date_max' in params:
+        try:
+            filtros['date_max'] = pd.Timestamp(params['date_max'][-1])
+        except ValueError:
+            raise ValueError(f'date_max inválida: {params["date_max"][-1]!r}') from None
+
+    for nome, coluna in FILTER_COLUMNS.items():
+        if nome not in params:
+            continue
+        validos = CATEGORIES[coluna]
+        valores = []
+        for valor in (v.strip() for p in params[nome] for v in p.split(',')):
+            if not valor:
+                continue
+            if valor not in validos and f'conditions {valor}' in validos:
+                valor = f'conditions {valor}'
+            if valor not in validos:
+                raise ValueError(f'{nome} inválido: {valor!r} ( válidos: {", ".join(validos)} )')
+            valores.append(valor)
+        filtros[nome] = valores
+    return filtros
+
+def to_json(name, filters, df):
+    """
+        Esta função monta o corpo JSON da resposta de uma tabela.
+
+        Input: nome da métrica, filtros e dataframe
+        Output: bytes do JSON com metric, filters, columns e rows
+    """
+    filtros = {k: (v.isoformat() if isinstance(v, pd.Timestamp) else v) for k, v in filters.items()}
+    rows = df.to_json(orient='records', date_format='iso', double_precision=6)
+    cabecalho = json.dumps({'metric': name, 'filters': filtros, 'columns': [str(c) for c in df.columns]})
+    return (cabecalho[:-1] + f', "rows": {rows}}}').encode()
+
+class ResponseCache:
+    """
+        Cache LRU das respostas prontas ( corpo JSON e ETag ), cada uma válida
+        por `ttl` segundos. A chave inclui a versão do dataset, então uma
+        atualização do csv gera chaves novas.
+
+        Usado só pela thread do loop do asyncio, por isso sem lock.
+    """
+
+    def __init__(self, ttl=API_TTL, max_entries=API_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Retorna ( etag, corpo, expira ) ou None se não existir ou tiver expirado."""
+        entrada = self._entries.get(key)
+        if entrada is None:
+            return None
+        if entrada[2] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entrada
+
+    def put(self, key, body):
+        """Guarda o corpo com a sua ETag e retorna a entrada."""
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        entrada = (etag, body, time.monotonic() + self.ttl)
+        self._entries[key] = entrada
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entrada
+
+    def __len__(self):
+        return len(self._entries)
+
+class MetricsServer:
+    """
+        Serviço HTTP/JSON das métricas do dashboard sobre o asyncio.
+
+        Todas as requisições usam o mesmo dataset em memória ( os caches do
+        processo do utils.dataset e do utils.cube ). As métricas são
+        calculadas em um pool de threads, fora do loop; requisições iguais
+        que chegam enquanto a primeira ainda está sendo calculada esperam o
+        mesmo cálculo, e as respostas ficam no ResponseCache com ETag
+        ( If-None-Match -> 304 ).
+
+        Rotas:
+            GET /health            -> {"status": "ok"}
+            GET /metrics           -> lista das métricas
+            GET /metrics/<nome>    -> tabela com os filtros da query string
+            GET /stats             -> contadores do serviço e do cache
+    """
+
+    def __init__(self, path=DATASET_PATH, ttl=API_TTL, workers=API_WORKERS, max_entries=API_CACHE_ENTRIES):
+        self.path = path
+        self.cache = ResponseCache(ttl, max_entries)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='curry-api')
+        self.counters = {'requests': 0, 'hits': 0, 'misses': 0, 'coalesced': 0, 'not_modified': 0, 'errors': 0}
+        # chave -> tarefa do cálculo em andamento
+        self._inflight = {}
+
+    async def warm(self):
+        """Carrega o dataset e os agregados antes de aceitar conexões."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, lambda: compute(data=FilteredData(self.path)))
+
+    def _build(self, name, data):
+        return to_json(name, data.filters, ENDPOINTS[name](data))
+
+    async def _compute(self, key, name, data):
+        loop = asyncio.get_running_loop()
+        try:
+            body = await loop.run_in_executor(self.executor, self._build, name, data)
+            return self.cache.put(key, body)
+        finally:
+            self._inflight.pop(key, None)
+
+    async def metric(self, name, filters):
+        """
+            Esta função retorna a resposta da métrica para os filtros: do
+            cache, de um cálculo igual em andamento ou de um cálculo novo.
+
+            Input: nome da métrica e filtros
+            Output: tupla ( etag, corpo, expira, origem ) com origem 'hit',
+                    'coalesced' ou 'miss'
+        """
+        data = FilteredData(self.path, **filters)
+        # a versão do dataset faz um stat no csv e, se ele mudou, recarrega o
+        # dataset; por isso a chave é calculada no pool, fora do loop
+        loop = asyncio.get_running_loop()
+        key = (name, await loop.run_in_executor(self.executor, data.fingerprint))
+        entrada = self.cache.get(key)
+        if entrada is not None:
+            self.counters['hits'] += 1
+            return (*entrada, 'hit')
+
+        tarefa = self._inflight.get(key)
+        if tarefa is None:
+            self.counters['misses'] += 1
+            origem = 'miss'
+            tarefa = self._inflight[key] = asyncio.ensure_future(self._compute(key, name, data))
+        else:
+            self.counters['coalesced'] += 1
+            origem = 'coalesced'
+        # shield: um cliente que desconecta não cancela o cálculo dos outros
+        return (*await asyncio.shield(tarefa), origem)
+
+    async def dispatch(self, method, target, headers):
+        """
+            Esta função responde uma requisição.
+
+            Input: método, alvo ( caminho e query ) e cabeçalhos em minúsculas
+            Output: tupla ( status, corpo, cabeçalhos extras )
+        """
+        self.counters['requests'] += 1
+        if method != 'GET':
+            return _error(HTTPStatus.METHOD_NOT_ALLOWED, 'só GET é aceito', {'Allow': 'GET'})
+
+        url = urlsplit(target)
+        partes = [p for p in url.path.split('/') if p]
+        if partes == ['health']:
+            return HTTPStatus.OK, json.dumps({'status': 'ok'}).encode(), {}
+        if partes == ['stats']:
+            stats = {**self.counters, 'cache_entries': len(self.cache), 'inflight': len(self._inflight)}
+            return HTTPStatus.OK, json.dumps(stats).encode(), {}
+        if partes == ['metrics']:
+            return HTTPStatus.OK, json.dumps({'metrics': list(ENDPOINTS)}).encode(), {}
+        if len(partes) != 2 or partes[0] != 'metrics' or partes[1] not in ENDPOINTS:
+            return _error(HTTPStatus.NOT_FOUND, f'rota desconhecida: {url.path}')
+
+        try:
+            filtros = parse_filters(url.query)
+        except ValueError as e:
+            return _error(HTTPStatus.BAD_REQUEST, str(e))
+
+        try:
+            etag, body, expira, origem = await self.metric(partes[1], filtros)
+        except Exception as e:
+            self.counters['errors'] += 1
+            return _error(HTTPStatus.INTERNAL_SERVER_ERROR, f'{type(e).__name__}: {e}')
+
+        extras = {'ETag': etag, 'Cache-Control': f'max-age={max(int(expira - time.monotonic()), 0)}',
+                  'X-Cache': origem}
+        if etag in [t.strip() for t in headers.get('if-none-match', '').split(',')]:
+            self.counters['not_modified'] += 1
+            return HTTPStatus.NOT_MODIFIED, b'', extras
+        return HTTPStatus.OK, body, extras
+
+    async def handle(self, reader, writer):
+        """Atende uma conexão ( HTTP/1.1 com keep-alive )."""
+        try:
+            while True:
+                try:
+                    pedido = await _read_request(reader)
+                except ValueError as e:
+                    status, body, extras = _error(HTTPStatus.BAD_REQUEST, str(e))
+                    writer.write(_http_response(status, body, extras, False))
+                    break
+                if pedido is None:
+                    break
+                method, target, version, headers = pedido
+                status, body, extras = await self.dispatch(method, target, headers)
+
+                conexao = headers.get('connection', '').lower()
+                manter = conexao == 'keep-alive' or (version == 'HTTP/1.1' and conexao != 'close')
+                writer.write(_http_response(status, body, extras, manter))
+                await writer.drain()
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def _error(status, message, extras=None):
+    """Resposta de erro em JSON."""
+    return status, json.dumps({'error': message}).encode(), extras or {}
+
+async def _read_request(reader):
+    """
+        Lê a linha de requisição e os cabeçalhos ( o corpo, se houver, é
+        descartado ).
+
+        Output: tupla ( método, alvo, versão, cabeçalhos ) ou None no fim da conexão
+    """
+    linha = await reader.readline()
+    if not linha:
+        return None
+    partes = linha.decode('latin-1').split()
+    if len(partes) != 3:
+        raise ValueError('linha de requisição inválida')
+    method, target, version = partes
+
+    headers = {}
+    while True:
+        linha = await reader.readline()
+        if linha in (b'\r\n', b'\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        headers[nome.strip().lower()] = valor.strip()
+
+    tamanho = int(headers.get('content-length', '0') or 0)
+    if tamanho:
+        await reader.readexactly(tamanho)
+    return method, target, version, headers
+
+def _http_response(status, body, extras, keep_alive):
+    """Monta os bytes da resposta HTTP/1.1."""
+    headers = {'Content-Type': 'application/json; charset=utf-8', 'Content-Length': str(len(body)),
+               'Connection': 'keep-alive' if keep_alive else 'close', **extras}
+    linhas = [f'HTTP/1.1 {status.value} {status.phrase}'] + [f'{k}: {v}' for k, v in headers.items()]
+    return ('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1') + body
+
+async def serve(host=API_HOST, port=API_PORT, path=DATASET_PATH, ttl=API_TTL, workers=API_WORKERS):
+    """
+        Esta função carrega o dataset e atende as requisições até o processo
+        ser interrompido.
+
+        Input: endereço, porta, caminho do csv, ttl do cache e threads
+        Output: None
+    """
+    server = MetricsServer(path, ttl, workers)
+    inicio = time.perf_counter()
+    await server.warm()
+    print(f'dataset {path} carregado em {time.perf_counter() - inicio:.1f} s')
+
+    tcp = await asyncio.start_server(server.handle, host, port)
+    print(f'servindo as métricas em http://{host}:{port}/metrics', flush=True)
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        server.close()
+
+def main():
+    """
+        Linha de comando do serviço.
+
+        Uso: python -m utils.api --port 8502
+             curl 'http://127.0.0.1:8502/metrics/order_metric?date_max=2022-03-01&traffic=Low,Jam'
+    """
+    parser = argparse.ArgumentParser(description='Serve as métricas do dashboard como JSON.')
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    parser.add_argument('--csv', default=DATASET_PATH, help='csv do dataset')
+    parser.add_argument('--ttl', type=float, default=API_TTL, help='segundos que uma resposta fica no cache')
+    parser.add_argument('--workers', type=int, default=API_WORKERS, help='threads que calculam as métricas')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.csv, args.ttl, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
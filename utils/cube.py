@@ -0,0 +1,413 @@
+# importando bibliotecas
+import numpy as np
+import pandas as pd
+
+from utils.dataset import CATEGORIES, DATASET_PATH, category_list, iter_clean_chunks, load_derived
+
+#===================================================#
+#     Cubo pré-agregado das métricas do dashboard
+#===================================================#
+# Dimensões do cubo: cada célula é uma combinação única destes valores
+CUBE_DIMENSIONS = ['Order_Date', 'City', 'Road_traffic_density', 'Weatherconditions',
+                   'Festival', 'Type_of_order']
+
+# Medidas guardadas em cada célula como contagem de valores válidos, soma e
+# soma dos quadrados, o que permite calcular média e desvio padrão exatos de
+# qualquer agregação das células
+CUBE_MEASURES = ['Time_taken(min)', 'Delivery_person_Ratings', 'distance']
+
+def build_cube(df):
+    """
+        Esta função monta o cubo com uma linha por célula de CUBE_DIMENSIONS,
+        com a quantidade de pedidos ( count ) e, para cada medida, as colunas
+        <medida>_n, <medida>_sum e <medida>_sumsq.
+
+        Input: dataframe limpo
+        Output: dataframe do cubo
+    """
+    aux = df.loc[:, CUBE_DIMENSIONS]
+    aux['count'] = 1
+    for col in CUBE_MEASURES:
+        valores = df[col].astype(float)
+        aux[f'{col}_n'] = valores.notna().astype(int)
+        aux[f'{col}_sum'] = valores
+        aux[f'{col}_sumsq'] = valores ** 2
+
+    # o sum do groupby ignora os NaN das medidas ( ex: avaliação vazia ); com
+    # observed=True a ordem dos grupos pode seguir a ordem das linhas, então as
+    # células são ordenadas para o build e o merge darem o mesmo cubo
+    cube = aux.groupby(CUBE_DIMENSIONS, observed=True, sort=True).sum().sort_index().reset_index()
+    return cube
+
+def load_cube(path=DATASET_PATH):
+    """
+        Esta função retorna o cubo do dataset, montado uma única vez para cada
+        versão do csv e compartilhado entre as sessões.
+
+        Input: caminho do csv
+        Output: dataframe do cubo
+    """
+    return load_derived('cube', build_cube, path, merge=merge_cube)
+
+def _unify_categories(a, b, cols):
+    """
+        Converte as colunas categóricas dos dois dataframes para a mesma lista
+        de categorias ( a que o clean_code daria para as linhas dos dois ),
+        para que possam ser concatenados sem virar texto.
+    """
+    a = a.copy(deep=False)
+    b = b.copy(deep=False)
+    for col in cols:
+        if col not in CATEGORIES or a[col].dtype == b[col].dtype:
+            continue
+        todas = category_list(CATEGORIES[col], set(a[col].cat.categories) | set(b[col].cat.categories))
+        a[col] = a[col].cat.set_categories(todas)
+        b[col] = b[col].cat.set_categories(todas)
+    return a, b
+
+def merge_cube(cube, new):
+    """
+        Esta função soma as células de dois cubos ( ex: o cubo atual e o cubo
+        das linhas novas, ou os cubos parciais de cada partição ): as
+        contagens, somas e somas dos quadrados de uma mesma célula são
+        somadas, então médias e desvios continuam exatos.
+
+        Input: os dois cubos
+        Output: dataframe do cubo somado
+    """
+    cube, new = _unify_categories(cube, new, CUBE_DIMENSIONS)
+    return (pd.concat([cube, new], ignore_index=True)
+              .groupby(CUBE_DIMENSIONS, observed=True, sort=True)
+              .sum()
+              .sort_index()
+              .reset_index())
+
+def filter_mask(cells, date_max=None, traffic=None, weather=None):
+    """
+        Esta função retorna a máscara dos filtros da barra lateral sobre as
+        células, com a mesma regra usada nas linhas do dataset.
+
+        Input:
+            - cells: dataframe com as colunas das dimensões filtradas
+            - date_max: data limite ( exclusiva )
+            - traffic: lista de condições de trânsito selecionadas
+            - weather: lista de condições climáticas selecionadas
+        Output: array booleano
+    """
+    mask = np.ones(len(cells), dtype=bool)
+    if date_max is not None:
+        mask &= (cells['Order_Date'] < date_max).to_numpy()
+    if traffic is not None:
+        mask &= cells['Road_traffic_density'].isin(traffic).to_numpy()
+    if weather is not None:
+        mask &= cells['Weatherconditions'].isin(weather).to_numpy()
+    return mask
+
+def slice_cube(cube, date_max=None, traffic=None, weather=None):
+    """
+        Esta função aplica os filtros da barra lateral sobre as células do
+        cubo ( ver filter_mask ).
+
+        Input: dataframe do cubo e filtros
+        Output: células do cubo que atendem os filtros
+    """
+    return cube.loc[filter_mask(cube, date_max, traffic, weather), :]
+
+def rollup(cube, by, measure='Time_taken(min)'):
+    """
+        Esta função agrega as células do cubo pelas colunas de `by`,
+        retornando a quantidade de pedidos e a média e o desvio padrão
+        ( amostral, como o pandas ) da medida.
+
+        Input:
+            - cube: células do cubo ( já filtradas )
+            - by: coluna ou lista de colunas de CUBE_DIMENSIONS
+            - measure: medida de CUBE_MEASURES
+        Output: dataframe com as colunas de `by`, count, mean e std
+    """
+    cols = ['count', f'{measure}_n', f'{measure}_sum', f'{measure}_sumsq']
+    # com observed=True a ordem dos grupos pode seguir a ordem das células;
+    # ordenados, o resultado não depende de como as células foram montadas
+    grouped = cube.groupby(by, observed=True)[cols].sum().sort_index()
+
+    n = grouped[f'{measure}_n']
+    soma = grouped[f'{measure}_sum']
+    media = soma / n.where(n > 0)
+    var = (grouped[f'{measure}_sumsq'] - soma * media) / (n - 1).where(n > 1)
+
+    df_aux = pd.DataFrame({'count': grouped['count'],
+                           'mean': media,
+                           'std': np.sqrt(var.clip(lower=0))})
+    return df_aux.reset_index()
+
+# Máscaras somadas juntas no rollup_many ( limita a memória da passada )
+ROLLUP_BLOCK = 16
+
+def rollup_many(cube, by, masks, measure='Time_taken(min)'):
+    """
+        Esta função faz o rollup do cubo para várias seleções de células de uma
+        vez: as células são agrupadas uma única vez por `by` e as colunas de
+        contagem e somas, multiplicadas pela máscara de cada seleção, são
+        somadas por grupo em uma passada ( reduceat ).
+
+        O resultado de cada seleção é o mesmo de
+        rollup(cube.loc[mask, :], by, measure).
+
+        Input:
+            - cube: dataframe do cubo ( sem filtro )
+            - by: coluna ou lista de colunas de CUBE_DIMENSIONS
+            - masks: matriz booleana ( células x seleções ), ex: uma coluna de
+              filter_mask para cada estado dos filtros
+            - measure: medida de CUBE_MEASURES
+        Output: lista com o dataframe de rollup de cada seleção
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    cols = ['count', f'{measure}_n', f'{measure}_sum', f'{measure}_sumsq']
+    if len(cube) == 0:
+        return [rollup(cube, by, measure) for _ in range(masks.shape[1])]
+
+    # grupos na ordem das colunas de `by`, como no rollup
+    codigos = cube.groupby(by, observed=True).ngroup().to_numpy()
+    ordem = np.argsort(codigos, kind='stable')
+    inicio = np.flatnonzero(np.r_[True, np.diff(codigos[ordem]) != 0])
+    chaves = cube[by].iloc[ordem[inicio]].reset_index(drop=True)
+    ordenados = chaves.sort_values(by, kind='stable').index.to_numpy()
+    chaves = chaves.iloc[ordenados].reset_index(drop=True)
+
+    valores = cube[cols].to_numpy(dtype=float)[ordem]
+    masks = masks[ordem]
+    somas = np.concatenate([np.add.reduceat(masks[:, b:b + ROLLUP_BLOCK, None] * valores[:, None, :], inicio, axis=0)
+                            for b in range(0, masks.shape[1], ROLLUP_BLOCK)], axis=1)[ordenados]
+
+    # grupos x seleções
+    count, n, soma, sumsq = (somas[:, :, j] for j in range(4))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.where(n > 0, soma / n, np.nan)
+        var = np.where(n > 1, (sumsq - soma * media) / (n - 1), np.nan)
+    std = np.sqrt(np.clip(var, 0, None))
+
+    resultado = []
+    for i in range(masks.shape[1]):
+        presentes = count[:, i] > 0
+        df_aux = chaves.loc[presentes].reset_index(drop=True)
+        df_aux['count'] = count[presentes, i].round().astype(np.int64)
+        df_aux['mean'] = media[presentes, i]
+        df_aux['std'] = std[presentes, i]
+        resultado.append(df_aux)
+    return resultado
+
+#===================================================#
+#     Entregadores distintos pré-agregados
+#===================================================#
+# Dimensões dos conjuntos de entregadores: os filtros da barra lateral
+COURIER_DIMENSIONS = ['Order_Date', 'Road_traffic_density', 'Weatherconditions']
+
+# Quantidade de bits ligados em cada byte, para contar os entregadores
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def _sorted_cells(keys, bits):
+    """
+        Ordena as células dos conjuntos de entregadores pelas dimensões ( as
+        categóricas pela ordem das categorias ), para que o build e o merge
+        deem as células na mesma ordem: com observed=True a ordem dos grupos
+        do groupby pode seguir a ordem das linhas.
+    """
+    colunas = [keys[col].cat.codes.to_numpy() if keys[col].dtype == 'category' else keys[col].to_numpy()
+               for col in reversed(COURIER_DIMENSIONS)]
+    ordem = np.lexsort(colunas)
+    return keys.iloc[ordem].reset_index(drop=True), bits[ordem]
+
+def build_courier_sets(df):
+    """
+        Esta função monta, para cada célula de COURIER_DIMENSIONS, o conjunto
+        exato de entregadores que fizeram pedidos nela, como um bitset sobre
+        os códigos da categoria Delivery_person_ID ( bit i ligado = entregador
+        de código i presente na célula ).
+
+        Como a contagem de distintos não pode ser somada entre células, a
+        união dos bitsets ( OR ) das células selecionadas dá a quantidade
+        exata de entregadores únicos sem voltar às linhas do dataset.
+
+        Input: dataframe limpo
+        Output: dicionário com
+            - keys: dataframe com as dimensões de cada célula
+            - bits: matriz uint8 ( células x bytes ) com os bitsets
+            - couriers: categorias de Delivery_person_ID
+    """
+    grouped = df.groupby(COURIER_DIMENSIONS, observed=True, sort=True)
+    keys = grouped.size().reset_index().loc[:, COURIER_DIMENSIONS]
+    cells = grouped.ngroup().to_numpy().astype(np.int64)
+
+    couriers = df['Delivery_person_ID'].cat.categories
+    codes = df['Delivery_person_ID'].cat.codes.to_numpy().astype(np.int64)
+    n_bytes = (len(couriers) + 7) // 8
+
+    # pares ( célula, entregador ) únicos, já ordenados
+    pares = np.unique(cells * len(couriers) + codes)
+    cells, codes = np.divmod(pares, len(couriers))
+
+    # os bits de um mesmo byte são distintos, então a soma equivale ao OR
+    bytes_ = cells * n_bytes + (codes >> 3)
+    valores = (0x80 >> (codes & 7)).astype(np.uint8)
+    inicio = np.flatnonzero(np.r_[True, bytes_[1:] != bytes_[:-1]])
+
+    bits = np.zeros(len(keys) * n_bytes, dtype=np.uint8)
+    bits[bytes_[inicio]] = np.add.reduceat(valores, inicio)
+    keys, bits = _sorted_cells(keys, bits.reshape(len(keys), n_bytes))
+    return {'keys': keys, 'bits': bits, 'couriers': couriers}
+
+def load_courier_sets(path=DATASET_PATH):
+    """
+        Esta função retorna os conjuntos de entregadores do dataset, montados
+        uma única vez para cada versão do csv.
+
+        Input: caminho do csv
+        Output: dicionário de build_courier_sets
+    """
+    return load_derived('courier_sets', build_courier_sets, path, merge=merge_courier_sets)
+
+def merge_courier_sets(sets, new):
+    """
+        Esta função une dois conjuntos de entregadores ( ex: os atuais e os das
+        linhas novas, ou os parciais de cada partição ): os bitsets são levados
+        para a união das categorias de entregadores e as células com as mesmas
+        dimensões são unidas com OR.
+
+        Input: os dois conjuntos de entregadores
+        Output: dicionário de build_courier_sets com a união
+    """
+    couriers = pd.Index(category_list(CATEGORIES['Delivery_person_ID'],
+                                      set(sets['couriers']) | set(new['couriers'])))
+
+    def remapear(bits, atuais):
+        if atuais.equals(couriers):
+            return bits
+        presentes = np.unpackbits(bits, axis=1, count=len(atuais)).astype(bool)
+        remapeados = np.zeros((len(bits), len(couriers)), dtype=bool)
+        remapeados[:, couriers.get_indexer(atuais)] = presentes
+        return np.packbits(remapeados, axis=1)
+
+    keys = pd.concat(_unify_categories(sets['keys'], new['keys'], COURIER_DIMENSIONS), ignore_index=True)
+    bits = np.concatenate([remapear(sets['bits'], sets['couriers']), remapear(new['bits'], new['couriers'])])
+
+    # une as células repetidas, na mesma ordem do build_courier_sets
+    grupos = keys.groupby(COURIER_DIMENSIONS, observed=True, sort=True).ngroup().to_numpy()
+    ordem = np.argsort(grupos, kind='stable')
+    inicio = np.flatnonzero(np.r_[True, np.diff(grupos[ordem]) != 0])
+    keys, bits = _sorted_cells(keys.iloc[ordem[inicio]].reset_index(drop=True),
+                               np.bitwise_or.reduceat(bits[ordem], inicio, axis=0))
+    return {'keys': keys, 'bits': bits, 'couriers': couriers}
+
+def slice_courier_sets(sets, date_max=None, traffic=None, weather=None):
+    """
+        Esta função aplica os filtros da barra lateral sobre as células dos
+        conjuntos de entregadores ( mesma regra do slice_cube ).
+
+        Input: conjuntos de entregadores e filtros
+        Output: conjuntos de entregadores só com as células selecionadas
+    """
+    mask = filter_mask(sets['keys'], date_max, traffic, weather)
+    return {'keys': sets['keys'].loc[mask, :].reset_index(drop=True),
+            'bits': sets['bits'][mask],
+            'couriers': sets['couriers']}
+
+def count_distinct(sets, by=None):
+    """
+        Esta função conta os entregadores distintos das células selecionadas,
+        fazendo a união ( OR ) dos bitsets.
+
+        Input:
+            - sets: conjuntos de entregadores ( já filtrados )
+            - by: None para o total, nome de uma coluna de COURIER_DIMENSIONS ou
+              array com o rótulo do grupo de cada célula
+        Output: número de entregadores ( by=None ) ou dataframe com as
+                colunas do grupo e Delivery_person_ID
+    """
+    bits = sets['bits']
+    if by is None:
+        return int(_POPCOUNT[np.bitwise_or.reduce(bits, axis=0)].sum()) if len(bits) else 0
+
+    rotulos = sets['keys'][by] if isinstance(by, str) else pd.Series(np.asarray(by))
+    nome = by if isinstance(by, str) else 'group'
+    if len(bits) == 0:
+        return pd.DataFrame({nome: rotulos, 'Delivery_person_ID': np.zeros(0, dtype=int)})
+
+    # ordena as células por grupo e faz a união dos bitsets de cada grupo
+    codigos, grupos = pd.factorize(rotulos, sort=True)
+    ordem = np.argsort(codigos, kind='stable')
+    inicio = np.flatnonzero(np.r_[True, np.diff(codigos[ordem]) != 0])
+    unioes = np.bitwise_or.reduceat(bits[ordem], inicio, axis=0)
+    return pd.DataFrame({nome: grupos, 'Delivery_person_ID': _POPCOUNT[unioes].sum(axis=1).astype(int)})
+
+#===================================================#
+#     Maior tempo de entrega por entregador
+#===================================================#
+# Dimensões das células do maior tempo: os filtros da barra lateral, a
+# cidade e o entregador ( usado pelo top_delivers )
+COURIER_MAX_DIMENSIONS = COURIER_DIMENSIONS + ['City', 'Delivery_person_ID']
+
+def build_courier_max(df):
+    """
+        Esta função monta, para cada célula de COURIER_MAX_DIMENSIONS, o maior
+        Time_taken(min) do entregador. Como o máximo dos máximos é o máximo,
+        as células filtradas dão o maior tempo de cada entregador por cidade
+        sem voltar às linhas do dataset.
+
+        Input: dataframe limpo
+        Output: dataframe com as dimensões e Time_taken(min)
+    """
+    return (df.loc[:, COURIER_MAX_DIMENSIONS + ['Time_taken(min)']]
+              .groupby(COURIER_MAX_DIMENSIONS, observed=True, sort=True)
+              .max()
+              .sort_index()
+              .reset_index())
+
+def merge_courier_max(cells, new):
+    """
+        Esta função junta duas tabelas de build_courier_max, ficando com o
+        maior tempo de cada célula.
+
+        Input: as duas tabelas
+        Output: dataframe com o maior tempo de cada célula
+    """
+    cells, new = _unify_categories(cells, new, COURIER_MAX_DIMENSIONS)
+    return (pd.concat([cells, new], ignore_index=True)
+              .groupby(COURIER_MAX_DIMENSIONS, observed=True, sort=True)
+              .max()
+              .sort_index()
+              .reset_index())
+
+def load_courier_max(path=DATASET_PATH):
+    """
+        Esta função retorna as células do maior tempo por entregador, montadas
+        uma única vez para cada versão do csv.
+
+        Input: caminho do csv
+        Output: dataframe de build_courier_max
+    """
+    return load_derived('courier_max', build_courier_max, path, merge=merge_courier_max)
+
+#===================================================#
+#     Agregados lidos em blocos
+#===================================================#
+def stream_aggregates(path=DATASET_PATH, chunksize=100_000):
+    """
+        Esta função monta o cubo e os conjuntos de entregadores lendo e
+        limpando o csv em blocos ( iter_clean_chunks ), sem montar o dataframe
+        limpo inteiro: cada bloco vira um cubo e um conjunto de entregadores
+        que são somados aos anteriores ( merge_cube, merge_courier_sets ).
+
+        O resultado é o mesmo de build_cube e build_courier_sets sobre o
+        dataset completo.
+
+        Input: caminho do csv e linhas por bloco
+        Output: tupla ( cubo, conjuntos de entregadores )
+    """
+    cube, sets = None, None
+    for bloco, _ in iter_clean_chunks(path, chunksize):
+        if len(bloco) == 0:
+            continue
+        novo_cube, novos_sets = build_cube(bloco), build_courier_sets(bloco)
+        cube = novo_cube if cube is None else merge_cube(cube, novo_cube)
+        sets = novos_sets if sets is None else merge_courier_sets(sets, novos_sets)
+    return cube, sets
@@ -0,0 +1,863 @@
+# importando bibliotecas
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from utils.geo import delivery_distance
+from utils.profiling import stage
+
+#===================================================#
+#     Carregamento compartilhado do dataset
+#===================================================#
+# Caminho padrão do dataset usado pelas páginas
+DATASET_PATH = 'train.csv'
+
+# Cache do processo: o dataframe limpo fica em memória entre os reruns e
+# entre as sessões do streamlit, indexado pelo caminho absoluto do arquivo
+_cache = {}
+_lock = threading.Lock()
+
+# Versão do formato do cache colunar: deve ser incrementada sempre que o
+# clean_code mudar o resultado, para invalidar os caches já gravados
+CACHE_VERSION = 6
+
+# Colunas de texto que chegam com espaços no final
+STRIP_COLUMNS = ['ID', 'Delivery_person_ID', 'Road_traffic_density', 'Type_of_order',
+                 'Type_of_vehicle', 'Festival', 'City']
+
+# Colunas de baixa cardinalidade guardadas como categóricas, com o conjunto
+# fixo de categorias na ordem usada pelo dashboard. Valores fora do conjunto
+# são acrescentados no final, e o Delivery_person_ID usa as categorias
+# encontradas nos dados
+CATEGORIES = {
+    'City': ['Metropolitian', 'Urban', 'Semi-Urban'],
+    'Road_traffic_density': ['Low', 'Medium', 'High', 'Jam'],
+    'Weatherconditions': ['conditions Cloudy', 'conditions Fog', 'conditions Sandstorms',
+                          'conditions Stormy', 'conditions Sunny', 'conditions Windy'],
+    'Type_of_order': ['Buffet', 'Drinks', 'Meal', 'Snack'],
+    'Type_of_vehicle': ['bicycle', 'electric_scooter', 'motorcycle', 'scooter'],
+    'Festival': ['No', 'Yes'],
+    'Delivery_person_ID': [],
+}
+
+# Cache colunar compartilhado: o feather é gravado sem compressão e em um
+# único lote, e o dataframe é montado sobre os buffers do arquivo mapeado em
+# memória, sem cópia ( ver read_cache ). Todas as sessões e todos os
+# processos do servidor que leem o mesmo cache usam as mesmas páginas de
+# memória do sistema operacional. Com CURRY_SHARED_CACHE=0 o cache volta a
+# ser comprimido e cada processo tem a sua cópia
+SHARED_CACHE = os.environ.get('CURRY_SHARED_CACHE', '1') != '0'
+
+# Linhas por bloco na leitura do csv ao gravar o cache colunar: com 0 o csv
+# é lido e limpo de uma vez; com um valor positivo o pico de memória fica
+# limitado pelo tamanho do bloco ( ver build_cache_chunked )
+CHUNK_ROWS = int(os.environ.get('CURRY_CHUNK_ROWS', 0))
+
+# Processos usados para limpar o csv ao gravar o cache colunar: com mais de
+# um, o csv é dividido em partições limpas em paralelo e os agregados são
+# montados junto ( ver utils.parallel )
+CLEAN_WORKERS = int(os.environ.get('CURRY_CLEAN_WORKERS', 1))
+
+# Sentinelas de valor vazio usadas no csv original, por coluna
+NA_VALUES = {
+    'Delivery_person_Age': ['NaN '],
+    'Delivery_person_Ratings': ['NaN '],
+    'multiple_deliveries': ['NaN '],
+    'Festival': ['NaN '],
+    'Weatherconditions': ['conditions NaN'],
+    'Road_traffic_density': ['NaN '],
+    'City': ['NaN '],
+}
+
+def read_dataset(path, **kwargs):
+    """
+        Esta função lê o csv já convertendo as sentinelas de valor vazio
+        ('NaN ', 'conditions NaN') em NaN durante o parse, para que as colunas
+        numéricas já saiam do read_csv como float em vez de texto.
+
+        Input: caminho do csv (e argumentos extras do pd.read_csv)
+        Output: Dataframe bruto
+    """
+    return pd.read_csv(path, na_values=NA_VALUES, **kwargs)
+
+def clean_code(df):
+    """Esta função tem a responsabilidade de limpar o dataframe
+
+        Tipos de limpeza:
+        1. Remoção de dados do NaN
+        2. Conversão de numeros e strings
+        3. Mudança do tipo de coluna de dados
+        4. Remoção dos espaços das variáveis
+        5. Formatação da colunas de datas
+        6.Limpeza da coluna tempo ( remoção do texto da variavel )
+
+        Todas as regras de exclusão são combinadas em uma única máscara e o
+        dataframe resultante é montado uma única vez, sem cópias
+        intermediárias. As operações de texto são feitas apenas sobre os
+        valores distintos de cada coluna, e as colunas de CATEGORIES saem
+        como categóricas ( os groupby e filtros rodam sobre os códigos
+        inteiros; use observed=True nos groupby ). A coluna distance, com a
+        distância em km do restaurante ao local de entrega, é calculada aqui
+        uma única vez. As linhas saem ordenadas por Order_Date. Aceita tanto o dataframe lido com
+        read_dataset quanto o lido com pd.read_csv puro, e não altera o
+        dataframe de entrada.
+
+        Input: Dataframe
+        Output: Dataframe
+    """
+    # Remover spaco da string o comando strip excluir espaços vazios no início
+    texto = {col: _por_valor_unico(df[col], lambda s: s.str.strip()) for col in STRIP_COLUMNS}
+
+    # Conversao de texto para numeros ( sentinelas viram NaN )
+    numeros = {col: pd.to_numeric(df[col], errors='coerce')
+               for col in ['Delivery_person_Age', 'Delivery_person_Ratings', 'multiple_deliveries']}
+
+    # Comando para remover o texto de números e convertendo numeros
+    numeros['Time_taken(min)'] = _por_valor_unico(
+        df['Time_taken(min)'],
+        lambda s: pd.to_numeric(s.astype(str).str.replace('(min)', '', regex=False), errors='coerce'))
+
+    # Máscara única com todas as linhas vazias
+    # ( Conceitos de seleção condicional )
+    linhas_validas = (pd.notna(numeros['Delivery_person_Age'])
+                      & pd.notna(numeros['multiple_deliveries'])
+                      & pd.notna(numeros['Time_taken(min)'])
+                      & pd.notna(texto['Festival']) & (texto['Festival'] != 'NaN')
+                      & (df['Weatherconditions'].notna() & (df['Weatherconditions'] != 'conditions NaN')).to_numpy()
+                      & pd.notna(texto['Road_traffic_density']) & (texto['Road_traffic_density'] != 'NaN')
+                      & pd.notna(texto['City']) & (texto['City'] != 'NaN'))
+    linhas_validas = np.asarray(linhas_validas, dtype=bool)
+
+    linhas = np.flatnonzero(linhas_validas)
+
+    # Conversao de texto para data
+    datas = pd.to_datetime(df['Order_Date'].to_numpy()[linhas], format='%d-%m-%Y')
+
+    # Linhas ordenadas pela data do pedido, para que o filtro de data seja
+    # uma busca binária ( ver utils.filters.date_slice )
+    ordem = np.argsort(datas.to_numpy(), kind='stable')
+    linhas = linhas[ordem]
+
+    # Montagem do dataframe final, filtrando e ordenando cada coluna uma única vez
+    colunas = {}
+    for col in df.columns:
+        if col in numeros:
+            valores = np.asarray(numeros[col])
+        elif col in texto:
+            valores = texto[col]
+        else:
+            valores = df[col].to_numpy()
+        colunas[col] = valores[linhas]
+
+    for col in ['Delivery_person_Age', 'multiple_deliveries', 'Time_taken(min)']:
+        colunas[col] = colunas[col].astype(int)
+
+    colunas['Order_Date'] = datas[ordem]
+
+    # Conversao das colunas de baixa cardinalidade para categorias
+    for col, categorias in CATEGORIES.items():
+        colunas[col] = _categorizar(colunas[col], categorias)
+
+    df = pd.DataFrame(colunas, index=df.index[linhas])
+
+    # Distancia entre o restaurante e o local de entrega ( km )
+    df['distance'] = delivery_distance(df)
+    return df
+
+def _por_valor_unico(serie, func):
+    """
+        Aplica `func` apenas aos valores distintos da série e expande o
+        resultado para todas as linhas pelos códigos do factorize. As colunas
+        do dataset têm poucos valores distintos, então a operação de texto
+        roda sobre dezenas de valores em vez de milhões de linhas.
+
+        Input: série e função que recebe e retorna uma série
+        Output: array numpy com o resultado por linha ( NaN nas linhas vazias )
+    """
+    codigos, unicos = pd.factorize(serie)
+    # dtype object para que uma coluna toda vazia ( ex: lote pequeno ) ainda aceite o .str
+    valores = func(pd.Series(unicos, dtype=object)).to_numpy()
+    # o código -1 ( valor vazio ) aponta para o NaN anexado no final
+    valores = np.append(valores, np.array([np.nan], dtype=valores.dtype if valores.dtype.kind == 'f' else object))
+    return valores[codigos]
+
+def _categorizar(valores, categorias):
+    """
+        Converte os valores em categórica com o conjunto fixo de categorias,
+        acrescentando no final ( em ordem alfabética ) os valores que não
+        estão no conjunto, para que nenhuma linha vire NaN.
+
+        Input: array de valores e lista de categorias
+        Output: pd.Categorical
+    """
+    return pd.Categorical(valores, categories=category_list(categorias, pd.unique(valores)))
+
+def category_list(categorias, valores):
+    """
+        Esta função retorna a lista de categorias usada pelo clean_code para
+        os valores encontrados: o conjunto fixo e depois os valores que não
+        estão nele, em ordem alfabética.
+
+        Input: lista fixa de categorias ( de CATEGORIES ) e valores encontrados
+        Output: lista de categorias
+    """
+    conhecidas = set(categorias)
+    return list(categorias) + sorted(v for v in set(valores) if v not in conhecidas and not pd.isna(v))
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+        Esta função calcula o hash md5 do conteúdo do arquivo, lendo em blocos
+        para não carregar o arquivo inteiro na memória.
+
+        Input: caminho do arquivo
+        Output: hash hexadecimal
+    """
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(chunk_size), b''):
+            md5.update(bloco)
+    return md5.hexdigest()
+
+def file_signature(path):
+    """
+        Esta função retorna a assinatura barata do arquivo (tamanho e mtime),
+        usada para saber se é preciso recalcular o hash do conteúdo.
+
+        Input: caminho do arquivo
+        Output: tupla (tamanho, mtime em nanosegundos)
+    """
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+def cache_paths(path):
+    """
+        Esta função retorna os caminhos do cache colunar do csv: o arquivo
+        feather com o dataframe limpo e o json com a chave do cache.
+
+        Input: caminho do csv
+        Output: tupla (caminho do feather, caminho do json)
+    """
+    base = os.path.splitext(path)[0]
+    return base + '.clean.feather', base + '.clean.json'
+
+def derived_path(path, name):
+    """
+        Esta função retorna o caminho do arquivo em que uma estrutura derivada
+        ( ex: o cubo ) é guardada ao lado do cache colunar do csv.
+
+        Input: caminho do csv e nome da estrutura no load_derived
+        Output: caminho do arquivo
+    """
+    return os.path.splitext(path)[0] + f'.clean.{name}.pkl'
+
+def _read_derived(path, name, digest):
+    """Lê a estrutura derivada gravada para o hash `digest` do csv ( None se não existir )."""
+    try:
+        with open(derived_path(path, name), 'rb') as f:
+            gravado = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if gravado.get('version') != CACHE_VERSION or gravado.get('digest') != digest:
+        return None
+    return gravado['value']
+
+def _write_derived(path, name, digest, value):
+    """Grava a estrutura derivada junto com o hash do csv que a gerou."""
+    try:
+        with _replace_file(derived_path(path, name)) as tmp_path:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'version': CACHE_VERSION, 'digest': digest, 'value': value}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as error:
+        warnings.warn(f'Não foi possível gravar {name} de {path}: {error}')
+
+@contextmanager
+def _replace_file(path):
+    """
+        Grava `path` por um arquivo temporário único ao lado dele: o bloco
+        recebe o caminho temporário e, se terminar sem erro, o arquivo
+        substitui `path` com os.replace. Cada processo grava no seu próprio
+        temporário, então réplicas montando o cache ao mesmo tempo no mesmo
+        volume não sobrescrevem o arquivo uma da outra.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        # o mkstemp cria o arquivo só com leitura para o dono
+        os.chmod(tmp_path, 0o644)
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _read_cache_meta(path):
+    """Lê a chave gravada junto do cache colunar ( None se não existir )."""
+    _, meta_path = cache_paths(path)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    return meta
+
+def _write_cache_meta(path, signature, digest, rows):
+    """Grava a chave do cache colunar ( tamanho, mtime e hash do csv ) e a quantidade de linhas do csv."""
+    _, meta_path = cache_paths(path)
+    meta = {'version': CACHE_VERSION, 'size': signature[0], 'mtime_ns': signature[1], 'digest': digest,
+            'rows': rows}
+    with _replace_file(meta_path) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+
+def read_cache(path):
+    """
+        Esta função lê o dataframe limpo do cache colunar, usando memory map
+        no arquivo feather.
+
+        Com SHARED_CACHE as colunas são views somente leitura dos buffers do
+        arquivo mapeado ( _shared_column ): números e datas viram arrays numpy
+        sobre o arquivo, as categóricas usam os índices do dicionário como
+        códigos e os textos ficam em ArrowStringArray. Os cortes por data
+        ( date_slice ) continuam sendo views; qualquer tentativa de alterar o
+        dataframe compartilhado gera erro.
+
+        Input: caminho do csv
+        Output: Dataframe limpo
+    """
+    data_path, _ = cache_paths(path)
+    table = feather.read_table(data_path, memory_map=True)
+    if not SHARED_CACHE:
+        df = table.to_pandas().set_index('index')
+        df.index.name = None
+        return df
+
+    colunas = {nome: _shared_column(coluna) for nome, coluna in zip(table.column_names, table.columns)}
+    index = pd.Index(colunas.pop('index'), copy=False)
+    return pd.DataFrame(colunas, index=index, copy=False)
+
+def _shared_column(coluna):
+    """
+        Converte a coluna do arrow para pandas sem copiar os dados quando
+        possível ( coluna em um único lote e sem valores vazios ); nos outros
+        casos a coluna é copiada.
+    """
+    tipo = coluna.type
+    if pa.types.is_string(tipo) or pa.types.is_large_string(tipo):
+        return pd.arrays.ArrowStringArray(coluna)
+    if coluna.num_chunks != 1 or coluna.null_count:
+        return coluna.to_pandas().array
+    bloco = coluna.chunk(0)
+    if pa.types.is_dictionary(tipo):
+        codigos = bloco.indices.to_numpy(zero_copy_only=True)
+        return pd.Categorical.from_codes(codigos, categories=bloco.dictionary.to_pandas())
+    if pa.types.is_integer(tipo) or pa.types.is_floating(tipo) or pa.types.is_timestamp(tipo):
+        return bloco.to_numpy(zero_copy_only=True)
+    return coluna.to_pandas().array
+
+def build_cache(path, signature=None, digest=None):
+    """
+        Esta função lê e limpa o csv e grava o resultado no cache colunar ao
+        lado do csv, junto com a chave ( tamanho, mtime e hash ) do csv.
+
+        Input: caminho do csv
+        Output: Dataframe limpo
+    """
+    return _build_cache(path, signature, digest)[0]
+
+def _build_cache(path, signature=None, digest=None):
+    """
+        Grava o cache colunar do csv ( em blocos com CHUNK_ROWS, em paralelo
+        com CLEAN_WORKERS ou de uma vez ) e retorna o dataframe limpo e as
+        estruturas derivadas já montadas no caminho ( nome -> ( estrutura,
+        builder, merge ) ).
+    """
+    if signature is None:
+        signature = file_signature(path)
+    if digest is None:
+        digest = file_digest(path)
+
+    if CLEAN_WORKERS > 1:
+        # importado aqui porque utils.parallel depende deste módulo
+        from utils.parallel import parallel_clean
+        with stage('parallel_clean'):
+            df, rows, derived = parallel_clean(path, CLEAN_WORKERS)
+        with stage('write_cache'):
+            gravado = write_cache(path, df, signature, digest, rows)
+        return _shared(path, df, gravado), derived
+
+    if CHUNK_ROWS > 0:
+        try:
+            with stage('build_cache_chunked'):
+                build_cache_chunked(path, CHUNK_ROWS, signature, digest)
+            with stage('read_cache'):
+                return read_cache(path), {}
+        except OSError as error:
+            warnings.warn(f'Não foi possível gravar o cache colunar de {path} em blocos: {error}')
+
+    with stage('read_csv'):
+        raw = read_dataset(path)
+    with stage('clean_code'):
+        df = clean_code(raw)
+    with stage('write_cache'):
+        gravado = write_cache(path, df, signature, digest, len(raw))
+    return _shared(path, df, gravado), {}
+
+def _shared(path, df, gravado):
+    """
+        Troca o dataframe recém-limpo pela versão compartilhada lida do cache
+        colunar ( SHARED_CACHE ), para que o processo que montou o cache também
+        use as páginas compartilhadas em vez da sua cópia.
+    """
+    if gravado and SHARED_CACHE:
+        return read_cache(path)
+    return df
+
+def iter_clean_chunks(path, chunksize):
+    """
+        Esta função lê o csv em blocos de `chunksize` linhas e limpa cada bloco
+        com o clean_code. Os rótulos das linhas continuam a numeração do csv,
+        mas cada bloco tem as suas próprias categorias ( ver category_list ).
+
+        Input: caminho do csv e linhas por bloco
+        Output: gerador de tuplas ( bloco limpo, linhas lidas do csv )
+    """
+    with read_dataset(path, chunksize=chunksize) as reader:
+        for raw in reader:
+            yield clean_code(raw), len(raw)
+
+def build_cache_chunked(path, chunksize, signature=None, digest=None):
+    """
+        Esta função grava o cache colunar lendo e limpando o csv em blocos, sem
+        ter o csv inteiro nem o dataframe limpo inteiro em memória.
+
+        1. Cada bloco limpo ( já ordenado por Order_Date ) é gravado em um
+           feather temporário, com as colunas categóricas como texto.
+        2. As datas são agrupadas em faixas de até `chunksize` linhas; para
+           cada faixa, o trecho de cada bloco temporário ( lido com memory
+           map ) é juntado e ordenado por data, com as categorias do csv
+           completo, e gravado no cache como um lote do arquivo Arrow.
+
+        O resultado é o mesmo do build_cache; o pico de memória fica limitado
+        pelo tamanho do bloco ( ou pelo maior dia, se for maior que o bloco ).
+        Como o arquivo tem vários lotes, no read_cache só os textos ficam sem
+        cópia; as colunas numéricas são juntadas em cada processo.
+
+        Input: caminho do csv, linhas por bloco, assinatura e hash do csv
+        Output: quantidade de linhas do cache
+    """
+    if signature is None:
+        signature = file_signature(path)
+    if digest is None:
+        digest = file_digest(path)
+
+    data_path, _ = cache_paths(path)
+    tmp_dir = tempfile.mkdtemp(prefix='.clean.', dir=os.path.dirname(os.path.abspath(data_path)))
+    try:
+        # primeira passada: blocos limpos gravados como texto
+        partes = []
+        valores = {col: set() for col in CATEGORIES}
+        rows = 0
+        for i, (bloco, lidas) in enumerate(iter_clean_chunks(path, chunksize)):
+            rows += lidas
+            for col in CATEGORIES:
+                valores[col].update(bloco[col].cat.categories)
+            parte = os.path.join(tmp_dir, f'{i}.feather')
+            feather.write_feather(bloco.astype({col: object for col in CATEGORIES}).reset_index(), parte,
+                                  compression='uncompressed')
+            datas, contagens = np.unique(bloco['Order_Date'].to_numpy(), return_counts=True)
+            partes.append((datas, np.r_[0, np.cumsum(contagens)]))
+            del bloco
+
+        categorias = {col: category_list(CATEGORIES[col], valores[col]) for col in CATEGORIES}
+        tabelas = [feather.read_table(os.path.join(tmp_dir, f'{i}.feather'), memory_map=True)
+                   for i in range(len(partes))]
+        schema = pa.unify_schemas([t.schema for t in tabelas]).remove_metadata() if tabelas else None
+
+        # faixas de datas com até chunksize linhas
+        por_data = {}
+        for datas, inicio in partes:
+            for data, n in zip(datas, np.diff(inicio)):
+                por_data[data] = por_data.get(data, 0) + n
+        faixas, faixa, total = [], [], 0
+        for data in sorted(por_data):
+            if faixa and total + por_data[data] > chunksize:
+                faixas.append((faixa[0], faixa[-1]))
+                faixa, total = [], 0
+            faixa.append(data)
+            total += por_data[data]
+        if faixa:
+            faixas.append((faixa[0], faixa[-1]))
+
+        # segunda passada: cada faixa de datas vira um lote do cache
+        writer = None
+        with _replace_file(data_path) as tmp_path, pa.OSFile(tmp_path, 'wb') as sink:
+            for primeira, ultima in faixas:
+                trechos = []
+                for (datas, inicio), tabela in zip(partes, tabelas):
+                    a = inicio[np.searchsorted(datas, primeira, side='left')]
+                    b = inicio[np.searchsorted(datas, ultima, side='right')]
+                    if b > a:
+                        trechos.append(tabela.slice(a, b - a).cast(schema))
+                df = pa.concat_tables(trechos).to_pandas()
+                # em datas iguais os blocos ( e as linhas ) seguem a ordem do csv
+                df = df.take(np.argsort(df['Order_Date'].to_numpy(), kind='stable'))
+                for col in CATEGORIES:
+                    df[col] = pd.Categorical(df[col], categories=categorias[col])
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pa.ipc.new_file(sink, table.schema,
+                                             options=pa.ipc.IpcWriteOptions(compression=None if SHARED_CACHE else 'lz4'))
+                writer.write_table(table)
+                del df, table
+            if writer is None:
+                raise OSError(f'{path} não tem linhas válidas')
+            writer.close()
+        del tabelas
+        _write_cache_meta(path, signature, digest, rows)
+        return sum(por_data.values())
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def write_cache(path, df, signature, digest, rows):
+    """
+        Esta função grava o dataframe limpo no cache colunar do csv, junto com
+        a chave do csv e a quantidade de linhas do csv ( usada para numerar as
+        linhas acrescentadas por append_batch ).
+
+        Input: caminho do csv, dataframe limpo, assinatura, hash e linhas do csv
+        Output: True se o cache foi gravado
+    """
+    data_path, _ = cache_paths(path)
+    # sem compressão e em um único lote, para que read_cache não copie as colunas
+    opcoes = {'compression': 'uncompressed', 'chunksize': max(len(df), 1)} if SHARED_CACHE else {}
+    try:
+        # o arquivo antigo é substituído, nunca alterado: os processos que
+        # ainda o têm mapeado continuam lendo a versão anterior
+        with _replace_file(data_path) as tmp_path:
+            feather.write_feather(df.reset_index(), tmp_path, **opcoes)
+        _write_cache_meta(path, signature, digest, rows)
+    except OSError as error:
+        # sem permissão de escrita o dashboard continua funcionando, só sem cache
+        warnings.warn(f'Não foi possível gravar o cache colunar de {path}: {error}')
+        return False
+    return True
+
+def _load_cleaned(path, signature, digest):
+    """
+        Retorna o dataframe limpo a partir do cache colunar quando o hash do
+        csv bate com a chave gravada; caso contrário reconstrói o cache. Junto
+        vão as estruturas derivadas montadas na reconstrução ( _build_cache ).
+    """
+    meta = _read_cache_meta(path)
+    if meta is not None and meta['digest'] == digest:
+        try:
+            with stage('read_cache'):
+                df = read_cache(path)
+        except (OSError, pa.ArrowException):
+            return _build_cache(path, signature, digest)
+        if (meta['size'], meta['mtime_ns']) != signature:
+            try:
+                _write_cache_meta(path, signature, digest, meta['rows'])
+            except OSError:
+                pass
+        return df, {}
+    return _build_cache(path, signature, digest)
+
+def load_dataset(path=DATASET_PATH):
+    """
+        Esta função retorna o dataframe limpo, lendo e limpando o csv apenas
+        quando o arquivo mudou.
+
+        O resultado fica guardado em memória e é compartilhado entre todas as
+        sessões. A cada chamada a assinatura (tamanho e mtime) do arquivo é
+        comparada com a do cache; se ela mudou, o hash do conteúdo é
+        recalculado e o csv só é processado de novo se o conteúdo mudou.
+
+        Quando o processo começa, o dataframe é lido do cache colunar gravado
+        ao lado do csv ( ver build_cache ), sem precisar fazer o parse do csv.
+
+        O dataframe retornado é compartilhado: as páginas não devem alterá-lo,
+        apenas criar cópias filtradas.
+
+        Input: caminho do csv
+        Output: Dataframe limpo
+    """
+    path = os.path.abspath(path)
+    signature = file_signature(path)
+
+    with _lock:
+        entry = _cache.get(path)
+        if entry is not None and entry['signature'] == signature:
+            return entry['df']
+
+        # a chave gravada no cache colunar evita recalcular o hash no início
+        meta = _read_cache_meta(path)
+        if meta is not None and (meta['size'], meta['mtime_ns']) == signature:
+            digest = meta['digest']
+        else:
+            digest = file_digest(path)
+
+        if entry is not None and entry['digest'] == digest:
+            # só o mtime mudou, o conteúdo é o mesmo
+            entry['signature'] = signature
+            return entry['df']
+
+        df, derived = _load_cleaned(path, signature, digest)
+        _cache[path] = {'signature': signature, 'digest': digest, 'df': df,
+                        'derived': {name: value for name, (value, _, _) in derived.items()},
+                        'mergers': {name: (builder, merge) for name, (_, builder, merge) in derived.items()}}
+        return df
+
+def dataset_version(path=DATASET_PATH):
+    """
+        Esta função retorna o hash do conteúdo do csv atualmente carregado,
+        usado para compor as chaves dos caches que dependem do dataset.
+
+        Input: caminho do csv
+        Output: hash hexadecimal
+    """
+    load_dataset(path)
+    with _lock:
+        return _cache[os.path.abspath(path)]['digest']
+
+def load_derived(name, builder, path=DATASET_PATH, merge=None):
+    """
+        Esta função retorna uma estrutura derivada do dataset limpo ( cubo,
+        índices, etc. ), calculada uma única vez para cada versão do dataset
+        e compartilhada entre as sessões como o próprio dataframe.
+
+        Input:
+            - name: nome da estrutura no cache
+            - builder: função que recebe o dataframe limpo e monta a estrutura
+            - path: caminho do csv
+            - merge: função que recebe a estrutura atual e a estrutura montada
+              só com as linhas novas e retorna a estrutura atualizada. Com ela
+              a estrutura é atualizada no append_batch em vez de ser
+              descartada e montada de novo no próximo acesso, e fica gravada
+              ao lado do cache colunar ( derived_path ): os outros processos
+              leem a versão atualizada em vez de montá-la com o histórico
+        Output: estrutura retornada pelo builder
+    """
+    df = load_dataset(path)
+    path = os.path.abspath(path)
+
+    with _lock:
+        entry = _cache[path]
+        if entry['df'] is not df:
+            # o dataset foi recarregado entre as duas chamadas
+            df = entry['df']
+        derived = entry.setdefault('derived', {})
+        if name not in derived:
+            valor = _read_derived(path, name, entry['digest']) if merge is not None else None
+            if valor is None:
+                valor = builder(df)
+                if merge is not None:
+                    _write_derived(path, name, entry['digest'], valor)
+            derived[name] = valor
+        entry.setdefault('mergers', {})[name] = (builder, merge)
+        return derived[name]
+
+#===================================================#
+#     Ingestão incremental
+#===================================================#
+def _merge_categories(old, new):
+    """
+        Converte as colunas categóricas dos dois dataframes para o mesmo
+        conjunto de categorias, o mesmo que o clean_code daria para o csv
+        completo ( conjunto fixo e depois os valores extras em ordem
+        alfabética ).
+
+        Input: dataframe atual e dataframe das linhas novas
+        Output: tupla com os dois dataframes convertidos
+    """
+    old = old.copy(deep=False)
+    new = new.copy(deep=False)
+    for col, categorias in CATEGORIES.items():
+        todas = category_list(categorias, set(old[col].cat.categories) | set(new[col].cat.categories))
+        if list(old[col].cat.categories) != todas:
+            old[col] = old[col].cat.set_categories(todas)
+        if list(new[col].cat.categories) != todas:
+            new[col] = new[col].cat.set_categories(todas)
+    return old, new
+
+def _check_header(path, batch_path):
+    """Confere se o lote tem o mesmo cabeçalho do csv."""
+    with open(path, 'rb') as f, open(batch_path, 'rb') as g:
+        if f.readline().rstrip(b'\r\n') != g.readline().rstrip(b'\r\n'):
+            raise ValueError(f'o cabeçalho de {batch_path} não é o mesmo de {path}')
+
+def _append_csv(path, batch_path):
+    """Acrescenta as linhas do lote ( sem o cabeçalho ) no final do csv."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        tamanho = f.tell()
+        if tamanho:
+            f.seek(tamanho - 1)
+            final = f.read(1)
+    with open(batch_path, 'rb') as f:
+        f.readline()
+        linhas = f.read()
+    with open(path, 'ab') as f:
+        if tamanho and final != b'\n':
+            f.write(b'\n')
+        f.write(linhas)
+
+def append_batch(batch_path, path=DATASET_PATH):
+    """
+        Esta função acrescenta um lote de pedidos novos ( csv com o mesmo
+        cabeçalho do dataset ) sem processar o histórico de novo.
+
+        Só as linhas do lote passam pelo clean_code. Elas são intercaladas
+        com o dataframe limpo pela data do pedido ( na mesma posição que
+        teriam no clean_code do csv completo ), as linhas do lote são
+        acrescentadas no csv e o cache colunar é regravado com a nova chave.
+
+        As estruturas derivadas que têm `merge` ( as de utils.parallel.PARTIALS:
+        o cubo, os conjuntos de entregadores e o maior tempo por entregador,
+        além das registradas no load_derived ) são atualizadas com a
+        estrutura montada só com as linhas novas e gravadas ao lado do cache
+        colunar com a nova chave. Assim o dashboard e o serviço de métricas,
+        que rodam em outros processos, leem os agregados atualizados em vez
+        de montá-los de novo com o histórico. As que dependem da posição das
+        linhas ( bitmaps, índices espaciais ) são descartadas e montadas de
+        novo no próximo acesso.
+
+        Input: caminho do lote e caminho do csv
+        Output: quantidade de linhas novas que passaram na limpeza
+    """
+    # importado aqui porque utils.parallel depende deste módulo
+    from utils.parallel import PARTIALS
+
+    # garante que o cache colunar corresponde ao csv antes de acrescentar
+    load_dataset(path)
+    path = os.path.abspath(path)
+    _check_header(path, batch_path)
+
+    raw = read_dataset(batch_path)
+    novos = clean_code(raw)
+
+    with _lock:
+        entry = _cache[path]
+        meta = _read_cache_meta(path)
+        if meta is not None and meta['digest'] == entry['digest']:
+            rows = meta['rows']
+        else:
+            rows = len(read_dataset(path, usecols=[0]))
+
+        # as linhas do lote continuam a numeração das linhas do csv
+        novos.index = novos.index + rows
+        atual, novos = _merge_categories(entry['df'], novos)
+
+        # intercalação estável: em datas iguais as linhas antigas vêm antes
+        df = pd.concat([atual, novos])
+        ordem = np.argsort(df['Order_Date'].to_numpy(), kind='stable')
+        df = df.take(ordem)
+
+        _append_csv(path, batch_path)
+        signature = file_signature(path)
+        digest = file_digest(path)
+        df = _shared(path, df, write_cache(path, df, signature, digest, rows + len(raw)))
+
+        derived = {}
+        mergers = {name: funcs for name, funcs in {**PARTIALS, **entry.get('mergers', {})}.items()
+                   if funcs[1] is not None}
+        for name, (builder, merge) in mergers.items():
+            # a versão atual: a do processo, a gravada ou, na primeira vez,
+            # montada com o histórico
+            atual = entry.get('derived', {}).get(name)
+            if atual is None:
+                atual = _read_derived(path, name, entry['digest'])
+            if atual is None:
+                atual = builder(entry['df'])
+            derived[name] = merge(atual, builder(novos)) if len(novos) else atual
+            _write_derived(path, name, digest, derived[name])
+
+        _cache[path] = {'signature': signature, 'digest': digest, 'df': df,
+                        'derived': derived, 'mergers': mergers}
+    return len(novos)
+
+def main():
+    """
+        Linha de comando para gerar o cache colunar no deploy, antes da
+        primeira sessão do dashboard.
+
+        Uso: python -m utils.dataset train.csv
+             python -m utils.dataset train.csv --append lote.csv
+    """
+    parser = argparse.ArgumentParser(description='Gera o cache colunar do dataset limpo.')
+    parser.add_argument('csv', nargs='*', default=[DATASET_PATH], help='csv(s) de entrada')
+    parser.add_argument('--force', action='store_true', help='reconstrói mesmo se o cache estiver válido')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS,
+                        help='lê e limpa o csv em blocos de N linhas ( 0 = de uma vez )')
+    parser.add_argument('--workers', type=int, default=CLEAN_WORKERS,
+                        help='limpa o csv em partições com N processos')
+    parser.add_argument('--append', metavar='LOTE', nargs='+',
+                        help='acrescenta os lotes no csv ( um único csv ), limpando só as linhas novas')
+    args = parser.parse_args()
+
+    if args.append:
+        if len(args.csv) != 1:
+            parser.error('--append aceita um único csv')
+        for batch_path in args.append:
+            n = append_batch(batch_path, args.csv[0])
+            print(f'{batch_path}: {n} linhas acrescentadas em {args.csv[0]}')
+        return
+
+    for path in args.csv:
+        path = os.path.abspath(path)
+        signature = file_signature(path)
+        digest = file_digest(path)
+        meta = _read_cache_meta(path)
+        data_path, _ = cache_paths(path)
+        if not args.force and meta is not None and meta['digest'] == digest and os.path.exists(data_path):
+            print(f'{path}: cache válido em {data_path}')
+            continue
+        if args.workers > 1:
+            from utils.parallel import parallel_clean
+            df, rows, _ = parallel_clean(path, args.workers)
+            write_cache(path, df, signature, digest, rows)
+            n = len(df)
+        elif args.chunksize > 0:
+            n = build_cache_chunked(path, args.chunksize, signature, digest)
+        else:
+            n = len(build_cache(path, signature, digest))
+        print(f'{path}: {n} linhas gravadas em {data_path}')
+
+    pico = peak_rss_mb()
+    if pico is not None:
+        print(f'pico de memória ( RSS ): {pico:.1f} MiB')
+
+def peak_rss_mb():
+    """
+        Esta função retorna o pico de memória residente ( RSS ) do processo,
+        em MiB, ou None onde o módulo resource não existe ( Windows ).
+
+        Output: pico de memória em MiB
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # o macOS informa em bytes, o Linux em KiB
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 2**10
+
+if __name__ == '__main__':
+    main()
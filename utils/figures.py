@@ -0,0 +1,215 @@
+# importando bibliotecas
+import threading
+
+import folium
+import numpy as np
+import plotly.express as px
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from utils.metrics import (METRICS, avg_distance, city_traffic_medians, distance_by_city, orders_by_bucket,
+                           orders_by_day, orders_per_courier_by_bucket, traffic_city, traffic_share)
+from utils.timebuckets import GRANULARITIES
+
+_plotly_ready = False
+_plotly_lock = threading.Lock()
+
+def init_plotly():
+    """
+        Esta função faz a carga do plotly que normalmente acontece no primeiro
+        gráfico serializado ( o template padrão e o orjson ). Essa carga falha
+        se duas threads ( a sessão, o prefetch das abas e o warm-up ) montarem
+        o primeiro gráfico ao mesmo tempo, então deve ser chamada antes de
+        iniciar as threads que montam gráficos. As chamadas seguintes não
+        fazem nada.
+    """
+    global _plotly_ready
+    with _plotly_lock:
+        if not _plotly_ready:
+            pio.to_json(px.bar(pd.DataFrame({'x': [0], 'y': [0]}), x='x', y='y'))
+            _plotly_ready = True
+
+#===================================================#
+#     Gráficos da visão empresa
+#===================================================#
+def contry_maps (df):
+    """
+        Esta função vai retornar um mapa com a localização de cada cidade por tipo de 
+        tráfego.
+
+        Input: dataframe 
+        output: html do mapa
+    """
+    data_plot = city_traffic_medians(df)
+
+    # Desenhar o mapa
+    map = folium.Map()
+
+    for index, location_info in data_plot.iterrows():
+        folium.Marker( [location_info['Delivery_location_latitude'],
+             location_info['Delivery_location_longitude']],
+             popup=location_info[['City', 'Road_traffic_density']] ).add_to( map)
+
+    # html renderizado uma vez, para poder ser guardado no cache
+    return folium.Figure().add_child( map ).render()
+    
+def order_share_by_week (cube, couriers, granularity = 'week'):
+    """
+        Esta função vai retornar um grafico de linhas com a quantidades
+        de pedidos por entregador por semana ( ou por dia ou mês ).
+
+        Input: células do cubo, conjuntos de entregadores ( já filtrados ) e
+               granularidade ( 'day', 'week' ou 'month' )
+        output: grafico de linhas
+    """
+    df_aux = orders_per_courier_by_bucket(cube, couriers, granularity)
+    # gráfico
+    fig = px.line( df_aux, x='bucket', y='order_by_delivery', hover_data=_period_columns(df_aux),
+                   labels={'bucket': granularity} )
+    return fig
+
+def ordern_by_week (cube, granularity = 'week'):
+    """
+        Esta função vai retornar um grafico de linhas com a quantidades
+        de pedidos por semana ( ou por dia ou mês ).
+
+        Input: células do cubo e granularidade ( 'day', 'week' ou 'month' )
+        output: grafico de linhas
+    """
+    df_aux = orders_by_bucket(cube, granularity)
+    #grafico
+    fig = px.line(df_aux, x= 'bucket', y = 'ID', hover_data=_period_columns(df_aux), labels={'bucket': granularity})
+    return fig
+
+def _period_columns(df):
+    """Colunas inteiras do período ( year, week, month, day ) presentes na tabela."""
+    return [col for col in ['year', 'week', 'month', 'day'] if col in df.columns]
+
+def _as_text(df, cols):
+    """
+        Converte as colunas categóricas para texto antes do plotly: o plotly
+        agrupa pelas categorias fixas e falha nas que os filtros deixaram sem
+        pedidos ( ex: uma cidade sem entregas no trânsito escolhido ).
+    """
+    return df.astype({col: str for col in cols})
+
+def traffic_order_city (cube):
+    """
+        Esta função retorna um grafico de bolhas comparando o volume de pedidos
+        por cidade e tipo de tráfego.
+        
+        Input: células do cubo com os dados para realizar os calculos
+        Output: grafico de bolhas
+    """
+    df_aux = _as_text(traffic_city(cube), ['City', 'Road_traffic_density'])
+    #grafico
+    fig = px.scatter(df_aux, x = 'City', y = 'Road_traffic_density', size ='ID', color = 'City')
+    return fig
+
+def traffic_order_share(cube):
+    """
+       Esta função vai retornar um grafico de pizza com a distribuição dos
+       pedidos por tipo de tráfego.
+       
+       Input: células do cubo com os dados para o calculo
+       Output: grafico de pizza.
+    """
+    df_aux = _as_text(traffic_share(cube), ['Road_traffic_density'])
+    #grafico
+    fig = px.pie(df_aux, values = 'perc_ID', names = 'Road_traffic_density')
+    return fig
+            
+def order_metric(cube):
+    """
+        Esta função vai retornar um grafico de barras com a quantidades
+        de pedidos por dia.
+        
+        Input: células do cubo
+        output: grafico de barras
+    """
+    df_aux = orders_by_day(cube)
+    #grafico
+    fig = px.bar(df_aux, x = 'Order_Date', y ='ID')
+    return fig
+
+#===================================================#
+#     Gráficos da visão restaurantes
+#===================================================#
+def avg_std_time_on_traffic(stats):
+    """ 
+        Esta função retorna um grafico onde mostra a media e o desvio padrão do tempo de
+        entrega de cada condição de tráfego em cada uma das cidades
+    """
+    df_aux = _as_text(stats['City_traffic'].reset_index(), ['City', 'Road_traffic_density'])
+
+    fig = px.sunburst(df_aux, path=['City', 'Road_traffic_density'], values='avg_time', 
+                      color='std_time', color_continuous_scale='RdBu',
+                      color_continuous_midpoint=np.average(df_aux['std_time']))
+    return fig
+
+def avg_std_time_graph(stats):
+    """
+        Esta função vai retornar um grafico de barras onde ele mostra a media e o
+        desvio padrão do tempo de entregas de cada cidade.
+    
+    """
+    df_aux = stats['City'].reset_index()
+    fig = go.Figure()
+    fig.add_trace( go.Bar(name = 'Control', x = df_aux['City'], y = df_aux['avg_time'], error_y=dict(type='data', array=df_aux['std_time'])))
+    fig.update_layout(barmode='group')
+    return fig
+
+def distance(cube,fig):
+    """
+        Esta funçao possui dois parâmetros:
+        1- células do cubo com os dados para o calculo
+        2-fig onde possui duas condições:
+            caso o fig for False, a função vai retornar a distancia media dos restaurantes até o local de entraga
+            caso o fig for True, a função vai retornar um grafico onde mostra a distancia media dos restaurantes até o local de entrega
+            de cada cidade.
+
+        A distancia de cada entrega já vem calculada na coluna distance do dataset limpo,
+        e o cubo guarda a soma das distancias de cada célula.
+    """
+    if fig == False:
+        return avg_distance(cube)
+    else:
+        df_aux = distance_by_city(cube)
+        # destaque pelo rótulo: a ordem das cidades segue as categorias e
+        # alguma cidade pode ter ficado sem pedidos nos filtros
+        pull = [0.1 if city == 'Semi-Urban' else 0 for city in df_aux['City']]
+        fig = go.Figure(data=[go.Pie(labels=df_aux['City'],values=df_aux['distance'], pull= pull)])
+        return fig
+
+#===================================================#
+#     Gráficos e tabelas guardados no cache de cada página
+#===================================================#
+# página -> nome no cache de renderização -> função que recebe o FilteredData
+# do estado dos filtros. As páginas montam os gráficos por estes nomes
+# ( cached_render ) e o utils.warmup pré-calcula os mesmos nomes.
+PAGE_CHARTS = {
+    'visao_empresa': {
+        'order_metric': lambda data: order_metric(data.cube),
+        'traffic_order_share': lambda data: traffic_order_share(data.cube),
+        'traffic_order_city': lambda data: traffic_order_city(data.cube),
+        # visão tática: um gráfico por granularidade ( ordern_by_week, ordern_by_day, ... )
+        **{f'ordern_by_{g}': lambda data, g=g: ordern_by_week(data.cube, g) for g in GRANULARITIES},
+        **{f'order_share_by_{g}': lambda data, g=g: order_share_by_week(data.cube, data.couriers, g)
+           for g in GRANULARITIES},
+        'contry_maps': lambda data: contry_maps(data.rows),
+    },
+    'visao_entregadores': {
+        'overall_metrics': METRICS['overall_metrics'],
+        'ratings_by_courier': METRICS['ratings_by_courier'],
+        'ratings_by_traffic': METRICS['ratings_by_traffic'],
+        'ratings_by_weather': METRICS['ratings_by_weather'],
+        'top_delivers': METRICS['top_delivers'],
+    },
+    'visao_restaurantes': {
+        'time_stats': METRICS['time_stats'],
+        'avg_std_time_graph': lambda data: avg_std_time_graph(data.stats),
+        'distance': lambda data: distance(data.cube, fig=True),
+        'avg_std_time_on_traffic': lambda data: avg_std_time_on_traffic(data.stats),
+    },
+}
@@ -0,0 +1,125 @@
+# importando bibliotecas
+import numpy as np
+
+from utils.dataset import DATASET_PATH, load_derived
+
+#===================================================#
+#     Filtros da barra lateral sobre as linhas
+#===================================================#
+def date_slice(df, date_max):
+    """
+        Esta função retorna as linhas com Order_Date anterior a `date_max`.
+
+        O dataset limpo está ordenado por Order_Date, então o corte é uma busca
+        binária e o resultado é uma fatia ( view ) das linhas, sem varrer nem
+        copiar o dataframe.
+
+        Input: dataframe ordenado por Order_Date e data limite ( exclusiva )
+        Output: Dataframe ( fatia )
+    """
+    datas = df['Order_Date'].to_numpy()
+    fim = np.searchsorted(datas, np.datetime64(date_max, 'ns'), side='left')
+    return df.iloc[:fim]
+
+def filter_rows(df, date_max=None, traffic=None, weather=None, city=None, index=None):
+    """
+        Esta função aplica os filtros da barra lateral sobre as linhas do
+        dataset: primeiro o corte de data ( date_slice ) e depois os filtros de
+        trânsito, clima e cidade, combinados em uma única máscara sobre a
+        fatia. Com o índice de bitmaps ( build_bitmap_index ) a máscara sai
+        de OR/AND dos bitmaps pré-calculados em vez do isin.
+
+        Os filtros que selecionam todas as categorias são ignorados; se nenhum
+        filtro de categoria restringir as linhas, o resultado é a própria
+        fatia, sem cópia.
+
+        Input:
+            - df: dataframe limpo ( ordenado por Order_Date )
+            - date_max: data limite ( exclusiva )
+            - traffic: lista de condições de trânsito selecionadas
+            - weather: lista de condições climáticas selecionadas
+            - city: lista de cidades selecionadas
+            - index: índice de bitmaps do mesmo dataframe ( opcional )
+        Output: Dataframe filtrado ( não deve ser alterado )
+    """
+    if date_max is not None:
+        df = date_slice(df, date_max)
+
+    filtros = {'Road_traffic_density': traffic, 'Weatherconditions': weather, 'City': city}
+    if index is not None:
+        if index['rows'] < len(df):
+            raise ValueError('o índice de bitmaps não corresponde ao dataframe')
+        mask = bitmap_mask(index, filtros, len(df))
+    else:
+        mask = None
+        for col, selecionadas in filtros.items():
+            if selecionadas is None or set(df[col].cat.categories) <= set(selecionadas):
+                continue
+            col_mask = df[col].isin(selecionadas).to_numpy()
+            mask = col_mask if mask is None else mask & col_mask
+
+    if mask is None:
+        return df
+    return df.loc[mask, :]
+
+#===================================================#
+#     Índice de bitmaps dos filtros de categoria
+#===================================================#
+# Colunas com um bitmap por categoria
+BITMAP_COLUMNS = ['Road_traffic_density', 'Weatherconditions', 'City']
+
+def build_bitmap_index(df):
+    """
+        Esta função monta um bitmap por valor de cada coluna de BITMAP_COLUMNS
+        ( bit i ligado = linha i tem o valor ), compactado com np.packbits
+        para ocupar 1 bit por linha.
+
+        Input: dataframe limpo ( ordenado por Order_Date )
+        Output: dicionário com a quantidade de linhas e os bitmaps de cada
+                coluna ( {coluna: {valor: bitmap}} )
+    """
+    bitmaps = {}
+    for col in BITMAP_COLUMNS:
+        codes = df[col].cat.codes.to_numpy()
+        bitmaps[col] = {valor: np.packbits(codes == i)
+                        for i, valor in enumerate(df[col].cat.categories)}
+    return {'rows': len(df), 'bitmaps': bitmaps}
+
+def load_bitmap_index(path=DATASET_PATH):
+    """
+        Esta função retorna o índice de bitmaps do dataset, montado uma única
+        vez para cada versão do csv.
+
+        Input: caminho do csv
+        Output: dicionário de build_bitmap_index
+    """
+    return load_derived('bitmap_index', build_bitmap_index, path)
+
+def bitmap_mask(index, filtros, rows):
+    """
+        Esta função combina os bitmaps das categorias selecionadas: OR entre
+        os valores de uma coluna e AND entre as colunas, só sobre os bytes das
+        primeiras `rows` linhas ( a fatia do corte de data ).
+
+        Input:
+            - index: índice de bitmaps
+            - filtros: dicionário {coluna: lista de valores selecionados}
+            - rows: quantidade de linhas do início do dataset
+        Output: array booleano com `rows` posições, ou None se nenhum filtro
+                restringir as linhas
+    """
+    n_bytes = (rows + 7) // 8
+    resultado = None
+    for col, selecionadas in filtros.items():
+        bitmaps = index['bitmaps'][col]
+        if selecionadas is None or set(bitmaps) <= set(selecionadas):
+            continue
+        col_bits = np.zeros(n_bytes, dtype=np.uint8)
+        for valor in selecionadas:
+            if valor in bitmaps:
+                col_bits |= bitmaps[valor][:n_bytes]
+        resultado = col_bits if resultado is None else resultado & col_bits
+
+    if resultado is None:
+        return None
+    return np.unpackbits(resultado, count=rows).view(bool)
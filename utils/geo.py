@@ -0,0 +1,33 @@
+# importando bibliotecas
+import numpy as np
+
+# Raio médio da Terra em km ( o mesmo usado pelo pacote haversine )
+EARTH_RADIUS_KM = 6371.0088
+
+# Colunas de coordenadas do dataset
+COORD_COLUMNS = ['Restaurant_latitude', 'Restaurant_longitude',
+                 'Delivery_location_latitude', 'Delivery_location_longitude']
+
+def haversine_np(lat1, lon1, lat2, lon2):
+    """
+        Esta função calcula a distância em km pelo círculo máximo entre dois
+        pontos, de forma vetorizada com numpy ( mesma fórmula do pacote
+        haversine, mas sobre arrays inteiros em vez de linha a linha ).
+
+        Input: latitudes e longitudes em graus ( escalares ou arrays )
+        Output: distância em km
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    d = (np.sin((lat2 - lat1) * 0.5) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(d))
+
+def delivery_distance(df):
+    """
+        Esta função retorna a distância em km entre o restaurante e o local de
+        entrega de cada linha do dataframe.
+
+        Input: dataframe com as colunas de COORD_COLUMNS
+        Output: array numpy com as distâncias
+    """
+    return haversine_np(*(df[col].to_numpy() for col in COORD_COLUMNS))
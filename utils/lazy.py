@@ -0,0 +1,113 @@
+# importando bibliotecas
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.render_cache import RENDER_CACHE
+
+#===================================================#
+#     Abas com cálculo sob demanda
+#===================================================#
+# Quantidade de threads que montam os gráficos das abas escondidas
+PREFETCH_WORKERS = int(os.environ.get('CURRY_PREFETCH_WORKERS', '1'))
+
+# Sessões lembradas com o seu último estado dos filtros ( as mais antigas saem primeiro )
+PREFETCH_SESSIONS = 1024
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='curry-prefetch')
+# ( nome, fingerprint ) na fila -> sessões que pediram esse gráfico
+_pending = {}
+# sessão -> fingerprint do último rerun: os gráficos de estados anteriores
+# que ainda estão na fila são descartados
+_latest = OrderedDict()
+_lock = threading.Lock()
+
+def lazy_tabs(labels, key):
+    """
+        Esta função substitui o st.tabs. O st.tabs executa o conteúdo de todas
+        as abas a cada rerun, mesmo as que o usuário não está vendo; aqui as
+        abas são um seletor horizontal e a página só executa o bloco da aba
+        escolhida ( if aba == ... ).
+
+        Input: rótulos das abas e chave do widget
+        Output: rótulo da aba ativa
+    """
+    return st.radio('Aba', labels, horizontal=True, key=key, label_visibility='collapsed')
+
+def _session_id():
+    """Identificador da sessão do streamlit do rerun atual ( None fora do streamlit )."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+def _set_latest(session, fingerprint):
+    """Guarda o estado dos filtros do rerun atual da sessão."""
+    with _lock:
+        _latest[session] = fingerprint
+        _latest.move_to_end(session)
+        while len(_latest) > PREFETCH_SESSIONS:
+            _latest.popitem(last=False)
+
+def prefetch(name, fingerprint, func, *args, session=None, **kwargs):
+    """
+        Esta função agenda em segundo plano a montagem de um gráfico que
+        ainda não está no cache de renderização, para que a próxima visita à
+        aba encontre o resultado pronto. Não faz nada se o gráfico já estiver
+        no cache ou na fila.
+
+        Com `session`, o gráfico só é montado se o estado dos filtros ainda
+        for o último da sessão ( ou de outra sessão que pediu o mesmo
+        gráfico ) quando chegar a sua vez na fila: arrastar um slider gera um
+        rerun por posição, e os estados intermediários são descartados em
+        vez de disputar a CPU com o rerun atual.
+
+        Erros na montagem em segundo plano são ignorados: o gráfico é montado
+        de novo ( e o erro aparece ) quando a aba for aberta.
+
+        Input: mesmos argumentos de cached_render e a sessão que pediu
+    """
+    key = (name, fingerprint)
+    with _lock:
+        if key in RENDER_CACHE:
+            return
+        if key in _pending:
+            _pending[key].add(session)
+            return
+        _pending[key] = {session}
+
+    def tarefa():
+        try:
+            with _lock:
+                atual = any(s is None or _latest.get(s) == fingerprint for s in _pending[key])
+            if atual:
+                RENDER_CACHE.memoize(name, fingerprint, func, *args, **kwargs)
+        finally:
+            with _lock:
+                _pending.pop(key, None)
+
+    _executor.submit(tarefa)
+
+def prefetch_tabs(active, fingerprint, tabs, charts):
+    """
+        Esta função agenda em segundo plano os gráficos de todas as abas
+        diferentes da ativa. Os gráficos agendados em reruns anteriores da
+        mesma sessão, com outro estado dos filtros, deixam de ser montados.
+
+        Input:
+            - active: rótulo da aba ativa
+            - fingerprint: chave do estado dos filtros
+            - tabs: dicionário {aba: lista de nomes de gráficos}
+            - charts: dicionário {nome: ( função, argumentos... )}
+    """
+    session = _session_id()
+    if session is not None:
+        _set_latest(session, fingerprint)
+    for tab, names in tabs.items():
+        if tab == active:
+            continue
+        for name in names:
+            func, *args = charts[name]
+            prefetch(name, fingerprint, func, *args, session=session)
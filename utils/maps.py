@@ -0,0 +1,135 @@
+# importando bibliotecas
+import folium
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement
+from folium.plugins import HeatMap
+from jinja2 import Template
+
+#===================================================#
+#     Mapas com todos os pontos do dataset
+#===================================================#
+# Colunas de coordenadas de cada tipo de ponto
+MAP_POINTS = {
+    'delivery': ('Delivery_location_latitude', 'Delivery_location_longitude'),
+    'restaurant': ('Restaurant_latitude', 'Restaurant_longitude'),
+}
+
+# Tamanho padrão da célula da grade de agregação, em graus ( ~5 km )
+CLUSTER_CELL_DEG = 0.05
+HEATMAP_CELL_DEG = 0.01
+
+# Limite de células enviadas ao navegador; acima dele a grade fica mais grossa
+MAX_CELLS = 5000
+
+class CircleLayer(MacroElement):
+    """
+        Camada do folium com todos os círculos em um único array javascript,
+        criados no navegador por um laço, em vez de um objeto folium.Marker
+        ( e um trecho de javascript ) por ponto.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.featureGroup();
+        {{ this.data|tojson }}.forEach(function(p) {
+            L.circleMarker([p[0], p[1]], {radius: p[2], color: '{{ this.color }}',
+                                          fillOpacity: 0.5, weight: 1})
+             .bindTooltip(p[3])
+             .addTo({{ this.get_name() }});
+        });
+        {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, data, color='#d62728'):
+        super().__init__()
+        self._name = 'CircleLayer'
+        self.data = data
+        self.color = color
+
+def valid_points(df, points='delivery'):
+    """
+        Esta função retorna as coordenadas do tipo de ponto escolhido,
+        descartando as coordenadas zeradas ( sem localização ).
+
+        Input: dataframe e tipo de ponto ( chave de MAP_POINTS )
+        Output: arrays de latitude e longitude e a máscara das linhas usadas
+    """
+    lat_col, lon_col = MAP_POINTS[points]
+    lat = df[lat_col].to_numpy(dtype=float)
+    lon = df[lon_col].to_numpy(dtype=float)
+    mask = ~((lat == 0) & (lon == 0)) & np.isfinite(lat) & np.isfinite(lon)
+    return lat[mask], lon[mask], mask
+
+def grid_aggregate(df, points='delivery', cell_deg=CLUSTER_CELL_DEG, max_cells=MAX_CELLS):
+    """
+        Esta função agrupa os pontos em uma grade de `cell_deg` graus, de forma
+        vetorizada, e retorna uma linha por célula ocupada com o centroide dos
+        pontos, a quantidade de pedidos e o tempo médio de entrega. Se houver
+        mais de `max_cells` células ocupadas, o tamanho da célula dobra até
+        caber no limite.
+
+        Input: dataframe, tipo de ponto, tamanho da célula em graus e limite de células
+        Output: dataframe com lat, lon, count e avg_time
+    """
+    lat, lon, mask = valid_points(df, points)
+    tempo = df['Time_taken(min)'].to_numpy(dtype=float)[mask]
+    if len(lat) == 0:
+        return pd.DataFrame({'lat': [], 'lon': [], 'count': [], 'avg_time': []})
+
+    while True:
+        celulas = np.stack([np.floor(lat / cell_deg), np.floor(lon / cell_deg)], axis=1).astype(np.int64)
+        unicas, celula = np.unique(celulas, axis=0, return_inverse=True)
+        if len(unicas) <= max_cells:
+            break
+        cell_deg *= 2
+    celula = celula.ravel()
+
+    count = np.bincount(celula)
+    return pd.DataFrame({'lat': np.bincount(celula, lat) / count,
+                         'lon': np.bincount(celula, lon) / count,
+                         'count': count,
+                         'avg_time': np.bincount(celula, tempo) / count})
+
+def _base_map(lat, lon):
+    """Cria o mapa enquadrado nos pontos."""
+    map = folium.Map(tiles='cartodbpositron')
+    if len(lat):
+        map.fit_bounds([[lat.min(), lon.min()], [lat.max(), lon.max()]])
+    return map
+
+def cluster_map(df, points='delivery', cell_deg=CLUSTER_CELL_DEG):
+    """
+        Esta função retorna o html de um mapa com os pontos agrupados no
+        servidor em uma grade ( grid_aggregate ): um círculo por célula, com
+        raio proporcional ao log da quantidade de pedidos.
+
+        Input: dataframe, tipo de ponto e tamanho da célula em graus
+        Output: html do mapa
+    """
+    grid = grid_aggregate(df, points, cell_deg)
+    raio = 3 + 2 * np.log1p(grid['count'].to_numpy())
+    textos = [f'{c} pedidos - {t:.1f} min' for c, t in zip(grid['count'], grid['avg_time'])]
+    data = [list(p) for p in zip(grid['lat'].round(5), grid['lon'].round(5), raio.round(1), textos)]
+
+    map = _base_map(grid['lat'].to_numpy(), grid['lon'].to_numpy())
+    cor = '#d62728' if points == 'delivery' else '#1f77b4'
+    CircleLayer(data, color=cor).add_to(map)
+    return folium.Figure().add_child(map).render()
+
+def heatmap_map(df, points='delivery', cell_deg=HEATMAP_CELL_DEG):
+    """
+        Esta função retorna o html de um mapa de calor dos pontos. Os pontos
+        são agregados antes na grade ( grid_aggregate ), então o navegador
+        recebe uma linha por célula com o peso da quantidade de pedidos, e não
+        uma linha por pedido.
+
+        Input: dataframe, tipo de ponto e tamanho da célula em graus
+        Output: html do mapa
+    """
+    grid = grid_aggregate(df, points, cell_deg)
+    data = np.column_stack([grid['lat'].round(5), grid['lon'].round(5), grid['count']]).tolist()
+
+    map = _base_map(grid['lat'].to_numpy(), grid['lon'].to_numpy())
+    HeatMap(data, radius=15, blur=10).add_to(map)
+    return folium.Figure().add_child(map).render()
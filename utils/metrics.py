@@ -0,0 +1,542 @@
+# importando bibliotecas
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import (count_distinct, filter_mask, load_courier_max, load_courier_sets, load_cube, rollup,
+                        rollup_many, slice_courier_sets, slice_cube)
+from utils.dataset import DATASET_PATH, dataset_version, load_dataset
+from utils.filters import filter_rows, load_bitmap_index
+from utils.maps import MAP_POINTS
+from utils.render_cache import filter_fingerprint
+from utils.spatial import radius_query
+from utils.timebuckets import bucket_columns, bucket_start
+
+#===================================================#
+#     Agregações das células do cubo
+#===================================================#
+def _rollup(cube, by, measure='Time_taken(min)'):
+    """rollup das células filtradas ou, no batch, do CubeBatch."""
+    if isinstance(cube, BatchCells):
+        return cube.rollup(by, measure)
+    return rollup(cube, by, measure)
+
+def _totals(cube, cols):
+    """Soma das colunas nas células filtradas ou, no batch, do CubeBatch."""
+    if isinstance(cube, BatchCells):
+        return cube.totals(cols)
+    return cube.loc[:, cols].sum()
+
+#===================================================#
+#     Métricas da visão empresa
+#===================================================#
+def orders_by_day(cube):
+    """
+        Esta função soma a quantidade de pedidos por dia a partir das células
+        do cubo.
+
+        Input: células do cubo
+        Output: dataframe com Order_Date e ID ( pedidos )
+    """
+    return (_rollup(cube, 'Order_Date')
+              .rename(columns={'count': 'ID'})
+              .loc[:, ['Order_Date', 'ID']])
+
+def traffic_share(cube):
+    """
+        Esta função retorna a quantidade e o percentual de pedidos por tipo de
+        tráfego.
+
+        Input: células do cubo
+        Output: dataframe com Road_traffic_density, ID e perc_ID
+    """
+    df_aux = (_rollup(cube, 'Road_traffic_density')
+                .rename(columns={'count': 'ID'})
+                .loc[:, ['Road_traffic_density', 'ID']])
+    df_aux['perc_ID'] = 100*(df_aux['ID'] / df_aux['ID'].sum())
+    return df_aux
+
+def traffic_city(cube):
+    """
+        Esta função retorna a quantidade de pedidos por tipo de tráfego e
+        cidade.
+
+        Input: células do cubo
+        Output: dataframe com Road_traffic_density, City e ID
+    """
+    return (_rollup(cube, ['Road_traffic_density','City'])
+              .rename(columns={'count': 'ID'})
+              .loc[:, ['Road_traffic_density', 'City', 'ID']])
+
+def orders_by_bucket(cube, granularity='week'):
+    """
+        Esta função soma a quantidade de pedidos por período ( dia, semana
+        ISO ou mês ) a partir das contagens por dia do cubo.
+
+        Input: células do cubo e granularidade de GRANULARITIES
+        Output: dataframe com bucket ( início do período ), as colunas
+                inteiras do período ( ex: year e week ) e ID, em ordem
+                cronológica
+    """
+    df_aux = orders_by_day(cube)
+    df_aux = (df_aux['ID'].groupby(bucket_start(df_aux['Order_Date'], granularity))
+                .sum()
+                .rename_axis('bucket')
+                .reset_index())
+    return _with_bucket_columns(df_aux, granularity)
+
+def couriers_by_bucket(couriers, granularity='week'):
+    """
+        Esta função conta os entregadores distintos de cada período pela
+        união dos conjuntos de entregadores dos dias do período.
+
+        Input: conjuntos de entregadores ( já filtrados ) e granularidade
+        Output: dataframe com bucket, as colunas inteiras do período e
+                Delivery_person_ID
+    """
+    df_aux = (count_distinct(couriers, by = bucket_start(couriers['keys']['Order_Date'], granularity))
+                .rename(columns={'group': 'bucket'}))
+    df_aux['bucket'] = df_aux['bucket'].astype('datetime64[ns]')
+    return _with_bucket_columns(df_aux, granularity)
+
+def _with_bucket_columns(df, granularity):
+    """Acrescenta as colunas inteiras do período logo depois de bucket."""
+    colunas = bucket_columns(df['bucket'], granularity)
+    for pos, (nome, valores) in enumerate(colunas.items(), start=1):
+        df.insert(pos, nome, valores)
+    return df
+
+def orders_per_courier_by_bucket(cube, couriers, granularity='week'):
+    """
+        Esta função retorna a quantidade de pedidos por entregador em cada
+        período: os pedidos saem das contagens por dia do cubo e os
+        entregadores únicos da união dos conjuntos de entregadores de cada dia.
+
+        Input: células do cubo, conjuntos de entregadores ( já filtrados ) e
+               granularidade
+        Output: dataframe com bucket, as colunas inteiras do período, ID,
+                Delivery_person_ID e order_by_delivery
+    """
+    df_aux1 = orders_by_bucket(cube, granularity)
+    df_aux2 = couriers_by_bucket(couriers, granularity)
+
+    df_aux = pd.merge( df_aux1, df_aux2, how='inner' )
+    df_aux['order_by_delivery'] = df_aux['ID'] / df_aux['Delivery_person_ID']
+    return df_aux
+
+def city_traffic_medians(df):
+    """
+        Esta função retorna a mediana da localização das entregas de cada
+        cidade e tipo de tráfego ( os pontos do mapa da visão geográfica ).
+
+        Input: dataframe ( linhas filtradas )
+        Output: dataframe com City, Road_traffic_density e as coordenadas
+    """
+    return (df.loc[:, ['City', 'Road_traffic_density', 'Delivery_location_latitude', 'Delivery_location_longitude']]
+              .groupby( ['City','Road_traffic_density'], observed=True)
+              .median()
+              .reset_index())
+
+def geo_drilldown(df, index, lat, lon, radius_km, date_max=None, traffic=None, weather=None):
+    """
+        Esta função retorna os pedidos a até `radius_km` do ponto ( lat, lon ),
+        agregados por célula da grade do índice espacial.
+
+        Input: dataframe, índice espacial, centro, raio em km e os filtros da
+               barra lateral
+        Output: dataframe com lat, lon, pedidos, tempo médio e distância média
+                de cada célula
+    """
+    # só as linhas das células próximas passam pelo haversine; as posições
+    # voltam em ordem crescente, então o recorte continua ordenado por data
+    pos, _ = radius_query(index, lat, lon, radius_km)
+    df_aux = filter_rows(df.iloc[pos], date_max = date_max, traffic = traffic, weather = weather)
+
+    lat_col, lon_col = MAP_POINTS[index['points']]
+    cell_deg = index['cell_deg']
+    df_aux = (df_aux.assign(lat = (np.floor(df_aux[lat_col] / cell_deg) + 0.5) * cell_deg,
+                            lon = (np.floor(df_aux[lon_col] / cell_deg) + 0.5) * cell_deg)
+                    .groupby(['lat','lon'])
+                    .agg(pedidos = ('Time_taken(min)','size'),
+                         tempo_medio = ('Time_taken(min)','mean'),
+                         distancia_media = ('distance','mean'))
+                    .sort_values('pedidos', ascending = False)
+                    .reset_index())
+    return df_aux
+
+#===================================================#
+#     Métricas da visão entregadores
+#===================================================#
+def overall_metrics(df):
+    """
+        Esta função calcula a maior e a menor idade dos entregadores e a melhor
+        e a pior condição de veiculo.
+
+        Input: dataframe
+        Output: dicionário com maior_idade, menor_idade, melhor_condicao e pior_condicao
+    """
+    return {'maior_idade': df.loc[:,'Delivery_person_Age'].max(),
+            'menor_idade': df.loc[:,'Delivery_person_Age'].min(),
+            'melhor_condicao': df.loc[:,'Vehicle_condition'].max(),
+            'pior_condicao': df.loc[:,'Vehicle_condition'].min()}
+
+def ratings_by_courier(df):
+    """
+        Esta função retorna a avaliação média de cada entregador.
+
+        Input: dataframe
+        Output: dataframe com Delivery_person_ID e Delivery_person_Ratings
+    """
+    df_avg = (df.loc[:,['Delivery_person_Ratings','Delivery_person_ID']]
+                .groupby('Delivery_person_ID', observed=True)
+                .mean()
+                .reset_index())
+    return df_avg
+
+def ratings_by(df, col):
+    """
+        Esta função retorna a média e o desvio padrão das avaliações para cada
+        valor da coluna `col` ( ex: Road_traffic_density ou Weatherconditions ).
+
+        Input: dataframe e nome da coluna
+        Output: dataframe com `col`, Delivery_mean e Delivery_std
+    """
+    df_agg = (df.loc[:,['Delivery_person_Ratings',col]].groupby(col, observed=True)
+                .agg({'Delivery_person_Ratings':['mean','std']}).reset_index())
+    #mudando as colunuas
+    df_agg.columns = [col,'Delivery_mean', 'Delivery_std']
+    return df_agg
+
+def top_delivers(df, k=10):
+    """
+        Esta função retorna os k entregadores mais rapidos e os k entregadores
+        mais lentos de cada cidade presente nos dados.
+
+        O maior tempo de cada entregador por cidade é calculado em um único
+        groupby, e em cada cidade os k menores e os k maiores saem de uma
+        seleção parcial ( argpartition ), sem ordenar todos os entregadores;
+        só os k selecionados são ordenados. Nos empates de tempo vale o
+        código do entregador em ordem crescente, nas duas listas, como na
+        ordenação estável de sort_values + head(10) da versão original.
+
+        Input: dataframe ( ou células de load_courier_max ) com City,
+               Delivery_person_ID e Time_taken(min), e k
+        Output: tupla com os dataframes dos mais rapidos e dos mais lentos
+    """
+    df2 = (df.loc[:,['Time_taken(min)','Delivery_person_ID','City']]
+             .groupby(['City','Delivery_person_ID'], observed=True)
+             .max()
+             .reset_index())
+
+    # chave única de cada linha: o tempo ( crescente nos rápidos, decrescente
+    # nos lentos ) e, no empate, o código do entregador
+    n = len(df2['Delivery_person_ID'].cat.categories)
+    tempo = df2['Time_taken(min)'].to_numpy().astype(np.int64)
+    codigos = df2['Delivery_person_ID'].cat.codes.to_numpy().astype(np.int64)
+    chave = tempo * n + codigos
+    chave_lenta = ((tempo.max() if len(tempo) else 0) - tempo) * n + codigos
+
+    rapidos, lentos = [], []
+    grupos = df2.groupby('City', observed=True).indices
+    for city in df2['City'].cat.categories:
+        if city not in grupos:
+            continue
+        linhas = grupos[city]
+        if len(linhas) > k:
+            menores = linhas[np.argpartition(chave[linhas], k - 1)[:k]]
+            maiores = linhas[np.argpartition(chave_lenta[linhas], k - 1)[:k]]
+        else:
+            menores = maiores = linhas
+        rapidos.append(menores[np.argsort(chave[menores])])
+        lentos.append(maiores[np.argsort(chave_lenta[maiores])])
+
+    colunas = ['City','Delivery_person_ID','Time_taken(min)']
+    vazio = np.zeros(0, dtype=np.int64)
+    df_rapidos = df2.iloc[np.concatenate(rapidos or [vazio])].loc[:, colunas].reset_index(drop = True)
+    df_lentos = df2.iloc[np.concatenate(lentos or [vazio])].loc[:, colunas].reset_index(drop = True)
+    return df_rapidos, df_lentos
+
+#===================================================#
+#     Métricas da visão restaurantes
+#===================================================#
+def time_rollup(cube, by):
+    """
+        Esta função retorna a quantidade de pedidos, o tempo medio e o desvio
+        padrão do tempo de entrega agrupados pelas colunas de `by`, a partir
+        das células do cubo ( ou de qualquer tabela com as mesmas colunas de
+        contagem e somas ).
+
+        Input: células do cubo e coluna(s) do agrupamento
+        Output: dataframe indexado pelas colunas de `by`, com count, avg_time e std_time
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    df_aux = (_rollup(cube, by, measure = 'Time_taken(min)')
+                .set_index(by)
+                .loc[:, ['count','mean','std']])
+    df_aux.columns = ['count', 'avg_time', 'std_time']
+    return df_aux
+
+# Recortes do tempo de entrega usados pelos widgets da página: nome -> colunas
+TIME_SLICES = {
+    'Festival': ['Festival'],
+    'City': ['City'],
+    'City_traffic': ['City', 'Road_traffic_density'],
+    'City_order': ['City', 'Type_of_order'],
+}
+
+def time_stats(cube):
+    """
+        Esta função calcula de uma vez todos os recortes do tempo de entrega
+        ( TIME_SLICES ): as células do cubo são agregadas uma única vez por
+        Festival, City, Road_traffic_density e Type_of_order, e cada recorte
+        sai dessa tabela pequena. O resultado é lido pelo rótulo ( ex:
+        stats['Festival'].loc['Yes','avg_time'] ).
+
+        Input: células do cubo ( já filtradas )
+        Output: dicionário nome do recorte -> dataframe de time_rollup
+    """
+    if isinstance(cube, BatchCells):
+        # no batch cada recorte já é uma passada para todos os estados
+        return {nome: time_rollup(cube, by) for nome, by in TIME_SLICES.items()}
+
+    dims = sorted({col for by in TIME_SLICES.values() for col in by})
+    cols = ['count', 'Time_taken(min)_n', 'Time_taken(min)_sum', 'Time_taken(min)_sumsq']
+    base = cube.groupby(dims, observed=True)[cols].sum().reset_index()
+    return {nome: time_rollup(base, by) for nome, by in TIME_SLICES.items()}
+
+def avg_std_time(stats, festival, stat):
+    """
+        Esta função retorna o tempo medio ou o desvio padrão do tempo de entrega
+        com ou sem festival, lido pelo rótulo no resultado de time_stats.
+
+        Input:
+            - stats: resultado de time_stats
+            - festival: 'Yes' ou 'No'
+            - stat: 'avg_time' ou 'std_time'
+        Output: numero arredondado ( '-' se os filtros não deixaram nenhum
+                pedido com esse valor de Festival )
+    """
+    df_aux = stats['Festival']
+    if festival not in df_aux.index or pd.isna(df_aux.loc[festival, stat]):
+        return '-'
+    return np.round(df_aux.loc[festival, stat],2)
+
+def avg_distance(cube):
+    """
+        Esta função retorna a distancia media dos restaurantes até o local de
+        entrega, a partir da soma das distancias guardada no cubo.
+
+        Input: células do cubo
+        Output: numero arredondado
+    """
+    total = _totals(cube, ['distance_n','distance_sum'])
+    return np.round(total['distance_sum'] / total['distance_n'],2)
+
+def distance_by_city(cube):
+    """
+        Esta função retorna a distancia media dos restaurantes até o local de
+        entrega em cada cidade.
+
+        Input: células do cubo
+        Output: dataframe com City e distance
+    """
+    return (_rollup(cube, 'City', measure = 'distance')
+              .rename(columns={'mean': 'distance'})
+              .loc[:, ['City', 'distance']])
+
+#===================================================#
+#     Motor das métricas com os filtros
+#===================================================#
+class FilteredData:
+    """
+        Entradas das métricas para um estado dos filtros da barra lateral:
+        as células do cubo, os conjuntos de entregadores, as células do maior
+        tempo por entregador e as linhas do dataset, todas já filtradas.
+
+        Cada entrada é calculada só na primeira vez em que alguma métrica
+        precisa dela e depois é reaproveitada pelas outras métricas do mesmo
+        estado ( com segurança entre threads ). Os dados vêm dos caches do
+        processo ( load_dataset, load_cube, ... ), então criar um FilteredData
+        é barato.
+    """
+
+    def __init__(self, path=DATASET_PATH, date_max=None, traffic=None, weather=None):
+        self.path = path
+        self.filters = {'date_max': date_max, 'traffic': traffic, 'weather': weather}
+        self._values = {}
+        # reentrante: uma entrada pode depender de outra ( stats usa o cube )
+        self._lock = threading.RLock()
+
+    def _get(self, name, func):
+        with self._lock:
+            if name not in self._values:
+                self._values[name] = func()
+            return self._values[name]
+
+    @property
+    def cube(self):
+        return self._get('cube', lambda: slice_cube(load_cube(self.path), **self.filters))
+
+    @property
+    def couriers(self):
+        return self._get('couriers', lambda: slice_courier_sets(load_courier_sets(self.path), **self.filters))
+
+    @property
+    def max_cells(self):
+        def cells():
+            courier_max = load_courier_max(self.path)
+            return courier_max.loc[filter_mask(courier_max, **self.filters), :]
+        return self._get('max_cells', cells)
+
+    @property
+    def rows(self):
+        return self._get('rows', lambda: filter_rows(load_dataset(self.path), index=load_bitmap_index(self.path),
+                                                     **self.filters))
+
+    @property
+    def stats(self):
+        return self._get('stats', lambda: time_stats(self.cube))
+
+    def fingerprint(self, *values):
+        """Chave do estado dos filtros na versão atual do dataset ( filter_fingerprint )."""
+        return filter_fingerprint(dataset_version(self.path), *values, **self.filters)
+
+# Métricas do motor: nome -> função que recebe o FilteredData
+METRICS = {
+    # visão empresa
+    'orders_by_day': lambda data: orders_by_day(data.cube),
+    'traffic_share': lambda data: traffic_share(data.cube),
+    'traffic_city': lambda data: traffic_city(data.cube),
+    'orders_by_week': lambda data: orders_by_bucket(data.cube, 'week'),
+    'orders_by_month': lambda data: orders_by_bucket(data.cube, 'month'),
+    'orders_per_courier_by_day': lambda data: orders_per_courier_by_bucket(data.cube, data.couriers, 'day'),
+    'orders_per_courier_by_week': lambda data: orders_per_courier_by_bucket(data.cube, data.couriers, 'week'),
+    'orders_per_courier_by_month': lambda data: orders_per_courier_by_bucket(data.cube, data.couriers, 'month'),
+    'city_traffic_medians': lambda data: city_traffic_medians(data.rows),
+    # visão entregadores
+    'overall_metrics': lambda data: overall_metrics(data.rows),
+    'ratings_by_courier': lambda data: ratings_by_courier(data.rows),
+    'ratings_by_traffic': lambda data: ratings_by(data.rows, 'Road_traffic_density'),
+    'ratings_by_weather': lambda data: ratings_by(data.rows, 'Weatherconditions'),
+    'top_delivers': lambda data: top_delivers(data.max_cells, k=10),
+    # visão restaurantes
+    'distinct_couriers': lambda data: count_distinct(data.couriers),
+    'avg_distance': lambda data: avg_distance(data.cube),
+    'distance_by_city': lambda data: distance_by_city(data.cube),
+    'time_stats': lambda data: data.stats,
+}
+
+def compute(names=None, path=DATASET_PATH, date_max=None, traffic=None, weather=None, data=None):
+    """
+        Esta função calcula métricas de METRICS para um estado dos filtros,
+        sem o streamlit.
+
+        Uso:
+            tabelas = compute(['orders_by_day', 'top_delivers'], date_max=pd.Timestamp(2022, 3, 1),
+                              traffic=['Low', 'Jam'])
+
+        Input:
+            - names: nome de uma métrica, lista de nomes ou None para todas
+            - path: caminho do csv
+            - date_max, traffic, weather: filtros da barra lateral ( None =
+              sem filtro )
+            - data: FilteredData já criado ( no lugar de path e filtros )
+        Output: a tabela da métrica ( names com um nome ) ou dicionário
+                nome -> tabela
+    """
+    data = data or FilteredData(path, date_max, traffic, weather)
+    if isinstance(names, str):
+        return METRICS[names](data)
+    return {name: METRICS[name](data) for name in (names or METRICS)}
+
+#===================================================#
+#     Vários estados dos filtros de uma vez
+#===================================================#
+class CubeBatch:
+    """
+        Células do cubo para vários estados dos filtros de uma vez: guarda a
+        máscara de cada estado ( filter_mask ) e faz cada agregação pedida
+        pelas métricas uma única vez para todos os estados ( rollup_many ).
+    """
+
+    def __init__(self, cube, states):
+        self.cube = cube
+        self.masks = np.column_stack([filter_mask(cube, **state) for state in states]) if states else \
+            np.zeros((len(cube), 0), dtype=bool)
+        self._rollups = {}
+        self._lock = threading.Lock()
+
+    def rollup(self, by, measure):
+        """Rollup de todos os estados ( lista, um dataframe por estado )."""
+        key = (tuple([by] if isinstance(by, str) else by), measure)
+        with self._lock:
+            if key not in self._rollups:
+                self._rollups[key] = rollup_many(self.cube, list(key[0]), self.masks, measure)
+            return self._rollups[key]
+
+    def totals(self, cols):
+        """Soma das colunas nas células de cada estado ( estados x colunas )."""
+        return self.masks.T.astype(float) @ self.cube[cols].to_numpy(dtype=float)
+
+class BatchCells:
+    """
+        As células do cubo de um estado dentro de um CubeBatch. As métricas do
+        cubo recebem este objeto no lugar das células filtradas e as
+        agregações saem do CubeBatch ( ver _rollup e _totals ).
+    """
+
+    def __init__(self, batch, i):
+        self.batch = batch
+        self.i = i
+
+    def rollup(self, by, measure):
+        return self.batch.rollup(by, measure)[self.i]
+
+    def totals(self, cols):
+        return pd.Series(self.batch.totals(cols)[self.i], index=cols)
+
+def batch_data(states, path=DATASET_PATH):
+    """
+        Esta função cria o FilteredData de cada estado dos filtros, com as
+        células do cubo de todos os estados em um único CubeBatch: as
+        métricas do cubo de todos os estados saem de uma passada por
+        agregação.
+
+        Input: lista de dicionários com date_max, traffic e weather e o
+               caminho do csv
+        Output: lista de FilteredData, na ordem de `states`
+    """
+    states = [{'date_max': s.get('date_max'), 'traffic': s.get('traffic'), 'weather': s.get('weather')}
+              for s in states]
+    cubos = CubeBatch(load_cube(path), states)
+    dados = []
+    for i, state in enumerate(states):
+        data = FilteredData(path, **state)
+        data._values['cube'] = BatchCells(cubos, i)
+        dados.append(data)
+    return dados
+
+def batch(states, names=None, path=DATASET_PATH):
+    """
+        Esta função calcula as métricas para vários estados dos filtros de uma
+        vez ( ex: todas as combinações de trânsito para pré-calcular o cache ).
+
+        As métricas do cubo fazem cada agregação uma única vez para todos os
+        estados, em uma passada sobre as células ( batch_data ); estados
+        repetidos são calculados uma vez só, e as outras entradas ( linhas,
+        entregadores ) são filtradas uma vez por estado e compartilhadas entre
+        as métricas. O resultado é o mesmo do compute de cada estado.
+
+        Input:
+            - states: lista de dicionários com date_max, traffic e weather
+            - names: métricas de METRICS ( None para todas )
+            - path: caminho do csv
+        Output: lista com o dicionário nome -> tabela de cada estado, na
+                ordem de `states`
+    """
+    chaves = [filter_fingerprint(s.get('date_max'), s.get('traffic'), s.get('weather')) for s in states]
+    unicos = dict(zip(chaves, states))
+    dados = batch_data(list(unicos.values()), path)
+    resultados = {chave: compute(names, data=data) for chave, data in zip(unicos, dados)}
+    return [resultados[chave] for chave in chaves]
@@ -0,0 +1,110 @@
+# importando bibliotecas
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import (build_courier_max, build_courier_sets, build_cube, merge_courier_max,
+                        merge_courier_sets, merge_cube)
+from utils.dataset import CATEGORIES, category_list, clean_code, read_dataset
+
+#===================================================#
+#     Limpeza e agregação em paralelo
+#===================================================#
+# Agregados parciais montados em cada partição: nome no load_derived ->
+# ( builder, merge ). Todos são somas, uniões ou máximos, então o merge dos
+# parciais é exato
+PARTIALS = {
+    'cube': (build_cube, merge_cube),
+    'courier_sets': (build_courier_sets, merge_courier_sets),
+    'courier_max': (build_courier_max, merge_courier_max),
+}
+
+def partition_csv(path, partitions):
+    """
+        Esta função divide o csv em trechos contínuos de linhas com tamanhos
+        parecidos em bytes, cortando sempre no fim de uma linha.
+
+        Input: caminho do csv e quantidade de partições
+        Output: lista de tuplas ( byte inicial, byte final ) sem o cabeçalho
+    """
+    tamanho = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        inicio = f.tell()
+        cortes = [inicio]
+        for i in range(1, partitions):
+            f.seek(max(inicio + (tamanho - inicio) * i // partitions, cortes[-1]))
+            f.readline()
+            cortes.append(min(f.tell(), tamanho))
+    cortes.append(tamanho)
+    return [(a, b) for a, b in zip(cortes[:-1], cortes[1:]) if b > a]
+
+def _clean_partition(path, columns, inicio, fim):
+    """
+        Lê e limpa um trecho do csv e monta os agregados parciais ( roda em
+        um processo do pool ).
+    """
+    with open(path, 'rb') as f:
+        f.seek(inicio)
+        dados = f.read(fim - inicio)
+    raw = read_dataset(io.BytesIO(dados), header=None, names=columns)
+    df = clean_code(raw)
+    partials = {name: builder(df) for name, (builder, _) in PARTIALS.items()} if len(df) else {}
+    return df, len(raw), partials
+
+def parallel_clean(path, workers=None):
+    """
+        Esta função lê e limpa o csv em partições de linhas ( partition_csv )
+        em um pool de processos: cada processo faz o parse e o clean_code do
+        seu trecho e monta os agregados parciais de PARTIALS ( contagem, soma e
+        soma dos quadrados do cubo, que já inclui a distância por cidade, os
+        conjuntos de entregadores e o maior tempo por entregador ).
+
+        As partições limpas são juntadas com as mesmas categorias e ordenadas
+        por Order_Date de forma estável, então o dataframe é o mesmo do
+        clean_code sobre o csv inteiro; os parciais são juntados com os merges
+        exatos de utils.cube.
+
+        Input: caminho do csv e quantidade de processos ( padrão: núcleos )
+        Output: tupla ( dataframe limpo, linhas do csv, dicionário nome ->
+                ( agregado, builder, merge ) do load_derived )
+    """
+    workers = workers or os.cpu_count() or 1
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    trechos = partition_csv(path, workers)
+
+    if workers == 1:
+        resultados = [_clean_partition(path, columns, a, b) for a, b in trechos]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultados = list(pool.map(_clean_partition, *zip(*[(path, columns, a, b) for a, b in trechos])))
+
+    # os rótulos das linhas continuam a numeração do csv
+    partes, rows = [], 0
+    for df, lidas, _ in resultados:
+        df.index = df.index + rows
+        partes.append(df)
+        rows += lidas
+
+    # as mesmas categorias em todas as partições
+    for col, fixas in CATEGORIES.items():
+        todas = category_list(fixas, set().union(*[set(p[col].cat.categories) for p in partes]))
+        for p in partes:
+            p[col] = p[col].cat.set_categories(todas)
+
+    # cada partição já está ordenada por data; em datas iguais vale a ordem do csv
+    df = pd.concat(partes)
+    df = df.take(np.argsort(df['Order_Date'].to_numpy(), kind='stable'))
+
+    derived = {}
+    for name, (builder, merge) in PARTIALS.items():
+        parciais = [p[name] for _, _, p in resultados if p]
+        if parciais:
+            total = parciais[0]
+            for parcial in parciais[1:]:
+                total = merge(total, parcial)
+            derived[name] = (total, builder, merge)
+    return df, rows, derived
@@ -0,0 +1,215 @@
+# importando bibliotecas
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+#===================================================#
+#     Tempos de cada etapa das páginas
+#===================================================#
+# Quantidade de medidas guardadas por etapa para os percentis ( janela móvel )
+PROFILE_WINDOW = int(os.environ.get('CURRY_PROFILE_WINDOW', '500'))
+
+# Com CURRY_PROFILE_MEMORY=1 cada etapa também mede a memória alocada pelo
+# python ( tracemalloc ), o que deixa o dashboard mais lento
+PROFILE_MEMORY = os.environ.get('CURRY_PROFILE_MEMORY', '0') == '1'
+
+# Com CURRY_DEBUG=1 o painel de tempos aparece na barra lateral de todas as
+# páginas; sem ela, só com ?debug=1 na url
+DEBUG_PANEL = os.environ.get('CURRY_DEBUG', '0') == '1'
+
+# Percentis mostrados no painel e exportados
+QUANTILES = [0.5, 0.9, 0.99]
+
+# Log estruturado: com CURRY_PROFILE_LOG=<arquivo> cada etapa medida vira uma
+# linha JSON no arquivo ( logger curry.profile )
+PROFILE_LOG = os.environ.get('CURRY_PROFILE_LOG')
+logger = logging.getLogger('curry.profile')
+if PROFILE_LOG:
+    _handler = logging.FileHandler(PROFILE_LOG)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+if PROFILE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+# página do rerun atual ( cada sessão do streamlit roda em uma thread )
+_page = contextvars.ContextVar('curry_page', default='background')
+_inicio = contextvars.ContextVar('curry_page_start', default=None)
+
+# ( página, etapa ) -> medidas recentes e totais acumulados
+_samples = {}
+_totals = {}
+_lock = threading.Lock()
+
+def profile_page(page):
+    """
+        Esta função marca o início do rerun de uma página: as etapas medidas
+        a seguir ( stage ) ficam associadas a ela, e o profile_panel no fim da
+        página registra o tempo total do rerun.
+
+        Input: nome da página ( ex: 'visao_empresa' )
+        Output: None
+    """
+    _page.set(page)
+    _inicio.set(time.perf_counter())
+
+def record(stage_name, seconds, memory=None, page=None):
+    """
+        Esta função guarda uma medida de uma etapa.
+
+        Input: nome da etapa, duração em segundos, pico de memória em bytes
+               ( opcional ) e página ( padrão: a página do rerun atual )
+        Output: None
+    """
+    page = page or _page.get()
+    key = (page, stage_name)
+    with _lock:
+        if key not in _samples:
+            _samples[key] = (deque(maxlen=PROFILE_WINDOW), deque(maxlen=PROFILE_WINDOW))
+            _totals[key] = [0, 0.0]
+        tempos, memorias = _samples[key]
+        tempos.append(seconds)
+        if memory is not None:
+            memorias.append(memory)
+        _totals[key][0] += 1
+        _totals[key][1] += seconds
+
+    if PROFILE_LOG:
+        logger.info(json.dumps({'ts': time.time(), 'page': page, 'stage': stage_name,
+                                'seconds': round(seconds, 6), 'memory_bytes': memory}))
+
+@contextmanager
+def stage(stage_name):
+    """
+        Mede o tempo ( e, com PROFILE_MEMORY, o pico de memória alocada ) do
+        bloco e guarda a medida na etapa `stage_name` da página atual.
+
+        Uso:
+            with stage('load_dataset'):
+                df = load_dataset('train.csv')
+
+        Em etapas aninhadas o pico de memória da etapa de fora só considera o
+        trecho depois da etapa de dentro.
+    """
+    medir_memoria = PROFILE_MEMORY and tracemalloc.is_tracing()
+    if medir_memoria:
+        atual, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        memoria = None
+        if medir_memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            memoria = max(pico - atual, 0)
+        record(stage_name, duracao, memoria)
+
+def stage_stats(page=None):
+    """
+        Esta função retorna os percentis móveis de cada etapa ( últimas
+        PROFILE_WINDOW medidas ) e os totais acumulados.
+
+        Input: página ( None para todas )
+        Output: dataframe com page, stage, count, total_s, last_ms, mean_ms,
+                os percentis de QUANTILES em ms e, se houver, o pico de
+                memória mediano em MiB
+    """
+    with _lock:
+        itens = [(key, list(t), list(m), list(_totals[key])) for key, (t, m) in _samples.items()
+                 if page is None or key[0] == page]
+
+    linhas = []
+    for (pagina, etapa), tempos, memorias, (count, total) in itens:
+        ms = np.array(tempos) * 1000
+        linha = {'page': pagina, 'stage': etapa, 'count': count, 'total_s': total,
+                 'last_ms': ms[-1], 'mean_ms': ms.mean()}
+        for q in QUANTILES:
+            linha[f'p{int(q * 100)}_ms'] = np.quantile(ms, q)
+        if memorias:
+            linha['p50_mib'] = np.median(memorias) / 2**20
+        linhas.append(linha)
+
+    colunas = ['page', 'stage', 'count', 'total_s', 'last_ms', 'mean_ms'] + [f'p{int(q * 100)}_ms' for q in QUANTILES]
+    df = pd.DataFrame(linhas, columns=colunas + (['p50_mib'] if any('p50_mib' in l for l in linhas) else []))
+    return df.sort_values(['page', 'total_s'], ascending=[True, False]).reset_index(drop=True)
+
+def export_json(page=None):
+    """
+        Esta função exporta os percentis de stage_stats como JSON ( uma lista
+        de objetos, um por etapa ).
+
+        Input: página ( None para todas )
+        Output: texto JSON
+    """
+    return stage_stats(page).to_json(orient='records')
+
+def _label(valor):
+    """Escapa um valor de label no formato de texto do Prometheus."""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text(page=None):
+    """
+        Esta função exporta as medidas no formato de texto do Prometheus, como
+        um summary por etapa: os percentis da janela móvel e a soma e a
+        contagem acumuladas.
+
+        Input: página ( None para todas )
+        Output: texto no formato de exposição do Prometheus
+    """
+    df = stage_stats(page)
+    linhas = ['# HELP curry_stage_seconds Duração de cada etapa das páginas do dashboard.',
+              '# TYPE curry_stage_seconds summary']
+    for _, linha in df.iterrows():
+        labels = f'page="{_label(linha["page"])}",stage="{_label(linha["stage"])}"'
+        for q in QUANTILES:
+            linhas.append(f'curry_stage_seconds{{{labels},quantile="{q}"}} {linha[f"p{int(q * 100)}_ms"] / 1000:.6f}')
+        linhas.append(f'curry_stage_seconds_sum{{{labels}}} {linha["total_s"]:.6f}')
+        linhas.append(f'curry_stage_seconds_count{{{labels}}} {linha["count"]}')
+    return '\n'.join(linhas) + '\n'
+
+def reset():
+    """Apaga todas as medidas."""
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+
+def profile_panel():
+    """
+        Esta função registra o tempo total do rerun da página ( desde o
+        profile_page ) e, se o painel estiver ligado ( CURRY_DEBUG=1 ou
+        ?debug=1 na url ), mostra na barra lateral os percentis das etapas da
+        página e os botões para baixar as medidas em JSON e no formato do
+        Prometheus.
+
+        Input: None
+        Output: None
+    """
+    import streamlit as st
+
+    inicio = _inicio.get()
+    if inicio is not None:
+        record('total', time.perf_counter() - inicio)
+        _inicio.set(None)
+
+    if not (DEBUG_PANEL or st.experimental_get_query_params().get('debug') == ['1']):
+        return
+
+    page = _page.get()
+    with st.sidebar.expander('Debug: tempo por etapa', expanded=True):
+        df = stage_stats(page)
+        st.dataframe(df.drop(columns='page').set_index('stage').round(2))
+        st.download_button('Baixar JSON', export_json(), file_name='curry_profile.json', mime='application/json')
+        st.download_button('Baixar Prometheus', prometheus_text(), file_name='curry_profile.prom', mime='text/plain')
@@ -0,0 +1,164 @@
+# importando bibliotecas
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from utils.profiling import record, stage
+
+#===================================================#
+#     Cache dos gráficos e tabelas renderizados
+#===================================================#
+# Limite de memória do cache em MB, configurável pela variável de ambiente
+DEFAULT_MAX_MB = int(os.environ.get('CURRY_RENDER_CACHE_MB', '256'))
+
+def filter_fingerprint(*values, **filters):
+    """
+        Esta função gera uma chave curta e estável para o estado dos filtros:
+        listas viram listas ordenadas ( a ordem da multiselect não importa ) e
+        datas viram texto ISO.
+
+        Input: valores e filtros ( ex: versão do dataset, data, listas )
+        Output: hash hexadecimal de 16 caracteres
+    """
+    def normalizar(valor):
+        if isinstance(valor, (list, tuple, set, frozenset)):
+            return sorted(normalizar(v) for v in valor)
+        if isinstance(valor, (datetime.date, pd.Timestamp)):
+            return pd.Timestamp(valor).isoformat()
+        if valor is None or isinstance(valor, (str, int, float, bool)):
+            return valor
+        return repr(valor)
+
+    estado = {'values': [normalizar(v) for v in values],
+              'filters': {k: normalizar(v) for k, v in filters.items()}}
+    texto = json.dumps(estado, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode()).hexdigest()[:16]
+
+class RenderCache:
+    """
+        Cache LRU dos resultados das funções de gráfico, com limite de memória.
+
+        As figuras do plotly são guardadas como JSON ( e reconstruídas a cada
+        leitura, para que cada sessão receba o seu próprio objeto ), as
+        tabelas como DataFrame e os mapas como o HTML já renderizado. Quando o
+        total passa de max_bytes, as entradas usadas há mais tempo saem.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 2**20):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """Retorna o valor guardado na chave ( KeyError se não existir )."""
+        with self._lock:
+            kind, payload, _ = self._entries[key]
+            self._entries.move_to_end(key)
+        return _decode(kind, payload)
+
+    def put(self, key, value):
+        """Guarda o valor na chave, removendo as entradas mais antigas se preciso."""
+        kind, payload, size = _encode(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[2]
+            self._entries[key] = (kind, payload, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, _, removido) = self._entries.popitem(last=False)
+                self.total_bytes -= removido
+
+    def memoize(self, name, fingerprint, func, *args, **kwargs):
+        """
+            Retorna o resultado de func(*args, **kwargs) guardado para o par
+            ( name, fingerprint ), chamando a função apenas na primeira vez.
+
+            O tempo de montagem fica na etapa `name` do utils.profiling e o da
+            leitura do cache na etapa `name (cache)`.
+
+            Input:
+                - name: nome do gráfico ( ex: 'order_metric' )
+                - fingerprint: chave do estado dos filtros ( filter_fingerprint )
+                - func, args, kwargs: função que monta o gráfico e seus argumentos
+            Output: resultado da função
+        """
+        key = (name, fingerprint)
+        inicio = time.perf_counter()
+        try:
+            value = self.get(key)
+        except KeyError:
+            pass
+        else:
+            with self._lock:
+                self.hits += 1
+            record(f'{name} (cache)', time.perf_counter() - inicio)
+            return value
+
+        with stage(name):
+            value = func(*args, **kwargs)
+            with self._lock:
+                self.misses += 1
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Remove todas as entradas."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Retorna o número de entradas, bytes usados, acertos e faltas."""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.total_bytes,
+                    'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
+
+def _encode(value):
+    """Converte o valor para o formato guardado e calcula o tamanho em bytes."""
+    if isinstance(value, go.Figure):
+        payload = value.to_json()
+        return 'figure', payload, len(payload)
+    if isinstance(value, pd.DataFrame):
+        return 'frame', value, int(value.memory_usage(deep=True).sum())
+    if isinstance(value, str):
+        return 'text', value, len(value)
+    if isinstance(value, (tuple, dict)):
+        # várias tabelas montadas juntas ( ex: top_delivers, time_stats )
+        partes = value.values() if isinstance(value, dict) else value
+        return 'value', value, sum(_encode(v)[2] for v in partes)
+    return 'value', value, 64
+
+def _decode(kind, payload):
+    """Reconstrói o valor guardado."""
+    if kind == 'figure':
+        return pio.from_json(payload)
+    return payload
+
+# Cache compartilhado entre todas as sessões do processo
+RENDER_CACHE = RenderCache()
+
+def cached_render(name, fingerprint, func, *args, **kwargs):
+    """
+        Atalho para RENDER_CACHE.memoize: retorna o gráfico/tabela guardado
+        para o estado dos filtros ou monta e guarda um novo.
+
+        As tabelas retornadas são compartilhadas e não devem ser alteradas.
+    """
+    return RENDER_CACHE.memoize(name, fingerprint, func, *args, **kwargs)
@@ -0,0 +1,144 @@
+# importando bibliotecas
+import numpy as np
+import pandas as pd
+
+from utils.dataset import DATASET_PATH, load_derived
+from utils.geo import haversine_np
+from utils.maps import MAP_POINTS
+
+#===================================================#
+#     Índice espacial em grade
+#===================================================#
+# Tamanho da célula do índice em graus ( ~5 km na latitude )
+SPATIAL_CELL_DEG = 0.05
+
+# km por grau de latitude ( raio médio da Terra )
+KM_PER_DEG = 111.195
+
+# Deslocamento para que os índices de longitude fiquem positivos na chave
+_LON_OFFSET = 1 << 20
+_LON_RANGE = 1 << 21
+
+def _cell_coords(lat, lon, cell_deg):
+    """Retorna os índices inteiros ( linha, coluna ) da célula de cada ponto."""
+    return (np.floor(np.asarray(lat) / cell_deg).astype(np.int64),
+            np.floor(np.asarray(lon) / cell_deg).astype(np.int64))
+
+def _cell_key(ix, iy):
+    """Combina os índices da célula em uma chave inteira ordenável ( por linha e coluna )."""
+    return ix * _LON_RANGE + (iy + _LON_OFFSET)
+
+def build_spatial_index(df, points='restaurant', cell_deg=SPATIAL_CELL_DEG):
+    """
+        Esta função monta um índice em grade sobre as coordenadas do tipo de
+        ponto escolhido: as linhas ficam ordenadas pela chave da célula, de
+        forma que as linhas de uma célula são um trecho contínuo e as células
+        de uma mesma faixa de latitude são um intervalo de chaves.
+
+        Junto vão os agregados por célula: quantidade de pedidos, tempo médio
+        de entrega e distância média.
+
+        Input: dataframe limpo, tipo de ponto ( chave de MAP_POINTS ) e
+               tamanho da célula em graus
+        Output: dicionário com
+            - points, cell_deg
+            - lat, lon: coordenadas de cada linha ( na ordem do dataframe )
+            - order: posições das linhas ordenadas pela célula
+            - keys, starts: chave de cada célula ocupada e início do seu
+              trecho em `order` ( starts tem uma posição a mais, o fim )
+            - cells: dataframe com os agregados de cada célula
+    """
+    lat_col, lon_col = MAP_POINTS[points]
+    lat = df[lat_col].to_numpy(dtype=float)
+    lon = df[lon_col].to_numpy(dtype=float)
+
+    ix, iy = _cell_coords(lat, lon, cell_deg)
+    chaves = _cell_key(ix, iy)
+    order = np.argsort(chaves, kind='stable')
+    chaves_ordenadas = chaves[order]
+
+    keys, starts, counts = np.unique(chaves_ordenadas, return_index=True, return_counts=True)
+    celula = np.repeat(np.arange(len(keys)), counts)
+
+    tempo = df['Time_taken(min)'].to_numpy(dtype=float)[order]
+    distancia = df['distance'].to_numpy(dtype=float)[order]
+    cells = pd.DataFrame({
+        'lat': (keys // _LON_RANGE + 0.5) * cell_deg,
+        'lon': (keys % _LON_RANGE - _LON_OFFSET + 0.5) * cell_deg,
+        'count': counts,
+        'avg_time': np.bincount(celula, tempo) / counts,
+        'avg_distance': np.bincount(celula, distancia) / counts,
+    })
+
+    return {'points': points, 'cell_deg': cell_deg, 'lat': lat, 'lon': lon,
+            'order': order, 'keys': keys, 'starts': np.append(starts, len(order)),
+            'cells': cells}
+
+def load_spatial_index(points='restaurant', path=DATASET_PATH):
+    """
+        Esta função retorna o índice espacial do tipo de ponto, montado uma
+        única vez para cada versão do csv.
+
+        Input: tipo de ponto e caminho do csv
+        Output: dicionário de build_spatial_index
+    """
+    return load_derived(f'spatial_{points}', lambda df: build_spatial_index(df, points), path)
+
+def _cells_in_bbox(index, lat_min, lat_max, lon_min, lon_max):
+    """Retorna as posições ( em keys ) das células que cruzam o retângulo."""
+    ix0, iy0 = _cell_coords(lat_min, lon_min, index['cell_deg'])
+    ix1, iy1 = _cell_coords(lat_max, lon_max, index['cell_deg'])
+    linhas = np.arange(ix0, ix1 + 1)
+    # em cada faixa de latitude as células do retângulo são um intervalo de chaves
+    inicio = np.searchsorted(index['keys'], _cell_key(linhas, iy0), side='left')
+    fim = np.searchsorted(index['keys'], _cell_key(linhas, iy1), side='right')
+    if len(linhas) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate([np.arange(a, b) for a, b in zip(inicio, fim)])
+
+def _rows_in_cells(index, cells):
+    """Retorna as posições das linhas das células indicadas."""
+    if len(cells) == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = index['starts']
+    return np.concatenate([index['order'][starts[c]:starts[c + 1]] for c in cells])
+
+def bbox_query(index, lat_min, lat_max, lon_min, lon_max):
+    """
+        Esta função retorna as posições ( iloc ) das linhas com o ponto dentro
+        do retângulo, lendo só as células que cruzam o retângulo.
+
+        Input: índice espacial e limites do retângulo em graus
+        Output: array com as posições das linhas, em ordem crescente
+    """
+    rows = _rows_in_cells(index, _cells_in_bbox(index, lat_min, lat_max, lon_min, lon_max))
+    lat, lon = index['lat'][rows], index['lon'][rows]
+    dentro = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+    return np.sort(rows[dentro])
+
+def radius_query(index, lat, lon, radius_km):
+    """
+        Esta função retorna as linhas com o ponto a até `radius_km` km de
+        ( lat, lon ): as candidatas saem do retângulo que envolve o círculo e
+        só elas passam pelo haversine.
+
+        Input: índice espacial, centro ( graus ) e raio em km
+        Output: posições das linhas ( ordem crescente ) e suas distâncias em km
+    """
+    dlat = radius_km / KM_PER_DEG
+    dlon = radius_km / (KM_PER_DEG * max(np.cos(np.radians(lat)), 1e-6))
+    rows = _rows_in_cells(index, _cells_in_bbox(index, lat - dlat, lat + dlat, lon - dlon, lon + dlon))
+    rows = np.sort(rows)
+    dist = haversine_np(lat, lon, index['lat'][rows], index['lon'][rows])
+    dentro = dist <= radius_km
+    return rows[dentro], dist[dentro]
+
+def bbox_cells(index, lat_min, lat_max, lon_min, lon_max):
+    """
+        Esta função retorna os agregados ( quantidade, tempo médio e distância
+        média ) das células que cruzam o retângulo, sem ler as linhas.
+
+        Input: índice espacial e limites do retângulo em graus
+        Output: dataframe com as células
+    """
+    return index['cells'].iloc[_cells_in_bbox(index, lat_min, lat_max, lon_min, lon_max)]
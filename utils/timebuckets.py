@@ -0,0 +1,70 @@
+# importando bibliotecas
+import numpy as np
+
+#===================================================#
+#     Períodos de tempo ( dia, semana, mês )
+#===================================================#
+# Granularidades aceitas pelas funções deste módulo
+GRANULARITIES = ['day', 'week', 'month']
+
+def _days(dates):
+    """Converte datas ( Series, índice ou array ) para datetime64 em dias."""
+    return np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]')
+
+def bucket_start(dates, granularity='week'):
+    """
+        Esta função retorna o início do período de cada data, só com
+        aritmética de datetime64 ( sem formatar as datas como texto ): o
+        próprio dia, a segunda-feira da semana ISO ou o primeiro dia do mês.
+
+        Input: datas ( Series, índice ou array ) e granularidade de GRANULARITIES
+        Output: array datetime64[ns] com o início do período de cada data
+    """
+    dias = _days(dates)
+    if granularity == 'day':
+        inicio = dias
+    elif granularity == 'week':
+        # 1970-01-01 foi uma quinta-feira: ( n + 3 ) % 7 é o dia da semana
+        # com segunda = 0
+        n = dias.astype(np.int64)
+        inicio = (n - (n + 3) % 7).astype('datetime64[D]')
+    elif granularity == 'month':
+        inicio = dias.astype('datetime64[M]').astype('datetime64[D]')
+    else:
+        raise ValueError(f'granularidade inválida: {granularity!r} ( válidas: {", ".join(GRANULARITIES)} )')
+    return inicio.astype('datetime64[ns]')
+
+def iso_year_week(dates):
+    """
+        Esta função retorna o ano e a semana ISO de cada data ( semanas de
+        segunda a domingo; a semana 1 é a que tem a primeira quinta-feira do
+        ano, então o ano ISO pode ser diferente do ano da data ).
+
+        Input: datas ( Series, índice ou array )
+        Output: tupla de arrays inteiros ( ano, semana )
+    """
+    n = _days(dates).astype(np.int64)
+    # a quinta-feira da mesma semana decide o ano e a semana
+    quinta = n - (n + 3) % 7 + 3
+    ano = quinta.astype('datetime64[D]').astype('datetime64[Y]')
+    semana = (quinta - ano.astype('datetime64[D]').astype(np.int64)) // 7 + 1
+    return ano.astype(np.int64) + 1970, semana
+
+def bucket_columns(starts, granularity='week'):
+    """
+        Esta função retorna as colunas inteiras que identificam cada período:
+        ano e semana ISO, ano e mês ou, por dia, ano, mês e dia.
+
+        Input: inícios dos períodos ( bucket_start ) e granularidade
+        Output: dicionário nome da coluna -> array inteiro
+    """
+    if granularity == 'week':
+        ano, semana = iso_year_week(starts)
+        return {'year': ano, 'week': semana}
+
+    meses = _days(starts).astype('datetime64[M]').astype(np.int64)
+    colunas = {'year': meses // 12 + 1970, 'month': meses % 12 + 1}
+    if granularity == 'day':
+        dias = _days(starts)
+        colunas['day'] = (dias - dias.astype('datetime64[M]').astype('datetime64[D]')).astype(np.int64) + 1
+    return colunas
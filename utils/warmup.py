@@ -0,0 +1,214 @@
+# importando bibliotecas
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.cube import load_courier_max, load_courier_sets, load_cube
+from utils.dataset import CATEGORIES, DATASET_PATH, load_dataset
+from utils.figures import PAGE_CHARTS, init_plotly
+from utils.filters import load_bitmap_index
+from utils.metrics import batch_data
+from utils.profiling import profile_page, stage
+from utils.render_cache import RENDER_CACHE
+
+#===================================================#
+#     Pré-cálculo dos estados mais usados
+#===================================================#
+# Com CURRY_WARMUP=0 o pré-cálculo na subida do processo fica desligado
+WARMUP = os.environ.get('CURRY_WARMUP', '1') == '1'
+
+# Threads do pré-cálculo ( os gráficos de cada página e estado são uma tarefa )
+WARMUP_WORKERS = int(os.environ.get('CURRY_WARMUP_WORKERS', '2'))
+
+# Arquivo JSON com a lista de estados pré-calculados ( no lugar de
+# DEFAULT_STATES ), ex: [{"traffic": ["Jam"]}, {"date_max": "2022-03-01"}]
+WARMUP_STATES = os.environ.get('CURRY_WARMUP_STATES')
+
+# Valores iniciais da barra lateral das páginas: um estado pré-calculado
+# usa estes valores nos filtros que não informar
+SIDEBAR_DEFAULTS = {
+    'date_max': pd.Timestamp(2022, 4, 13),
+    'traffic': list(CATEGORIES['Road_traffic_density']),
+    'weather': list(CATEGORIES['Weatherconditions']),
+}
+
+# Filtros da barra lateral de cada página ( a visão empresa não tem clima )
+PAGE_FILTERS = {
+    'visao_empresa': ['date_max', 'traffic'],
+    'visao_entregadores': ['date_max', 'traffic', 'weather'],
+    'visao_restaurantes': ['date_max', 'traffic', 'weather'],
+}
+
+# Estados pré-calculados por padrão: a barra lateral como ela abre e cada
+# condição de trânsito sozinha
+DEFAULT_STATES = [{}] + [{'traffic': [t]} for t in CATEGORIES['Road_traffic_density']]
+
+logger = logging.getLogger('curry.warmup')
+
+_started = False
+_lock = threading.Lock()
+
+def load_states(path=WARMUP_STATES):
+    """
+        Esta função lê a lista de estados do arquivo JSON ( DEFAULT_STATES sem
+        arquivo ).
+
+        Input: caminho do JSON ( lista de objetos com date_max, traffic e
+               weather, todos opcionais )
+        Output: lista de dicionários de filtros
+    """
+    if not path:
+        return DEFAULT_STATES
+    with open(path) as f:
+        states = json.load(f)
+    if not isinstance(states, list) or not all(isinstance(s, dict) for s in states):
+        raise ValueError(f'{path}: esperada uma lista de objetos com date_max, traffic e weather')
+    return states
+
+def page_state(page, state):
+    """
+        Esta função completa um estado com os valores iniciais da barra
+        lateral e deixa só os filtros que a página tem, com os mesmos valores
+        que os widgets da página entregam ( para que as chaves do cache de
+        renderização sejam as mesmas ).
+
+        Input: nome da página e dicionário de filtros
+        Output: dicionário com date_max, traffic e weather
+    """
+    filtros = {}
+    for nome in ['date_max', 'traffic', 'weather']:
+        if nome not in PAGE_FILTERS[page]:
+            filtros[nome] = None
+            continue
+        valor = state.get(nome, SIDEBAR_DEFAULTS[nome])
+        filtros[nome] = pd.Timestamp(valor) if nome == 'date_max' else list(valor)
+    return filtros
+
+def _load(path):
+    """Carrega o dataset e os agregados compartilhados pelas páginas."""
+    with stage('warmup load'):
+        load_dataset(path)
+        load_bitmap_index(path)
+        load_cube(path)
+        load_courier_sets(path)
+        load_courier_max(path)
+
+def _render(page, data):
+    """
+        Monta os gráficos e tabelas de uma página para um estado que ainda não
+        estão no cache. Erros vão para o log.
+
+        Output: True se o estado foi montado sem erro
+    """
+    profile_page('warmup')
+    try:
+        fingerprint = data.fingerprint()
+        for nome, func in PAGE_CHARTS[page].items():
+            if (nome, fingerprint) not in RENDER_CACHE:
+                RENDER_CACHE.memoize(nome, fingerprint, func, data)
+    except Exception:
+        logger.exception('pré-cálculo de %s com %s falhou', page, data.filters)
+        return False
+    return True
+
+def warm_up(states=None, pages=None, path=DATASET_PATH, workers=WARMUP_WORKERS):
+    """
+        Esta função pré-calcula os gráficos e tabelas das páginas para uma
+        lista de estados dos filtros, guardando-os no cache de renderização
+        com as mesmas chaves que as páginas usam.
+
+        Primeiro carrega o dataset e os agregados; depois, por página, as
+        células do cubo de todos os estados são agregadas juntas
+        ( metrics.batch_data ). O primeiro estado de cada página é montado
+        antes dos outros, nesta thread, para ficar pronto primeiro: é o
+        estado mais usado ( a barra lateral como ela abre, em
+        DEFAULT_STATES ). Os demais estados vão para o pool de threads.
+
+        Erros são registrados no log e não interrompem os outros estados: a
+        página monta o gráfico de novo ( e mostra o erro ) quando for aberta.
+
+        Input:
+            - states: lista de dicionários de filtros ( padrão: load_states )
+            - pages: páginas de PAGE_CHARTS ( padrão: todas )
+            - path: caminho do csv
+            - workers: threads do pool
+        Output: quantidade de ( página, estado ) pré-calculados sem erro
+    """
+    states = load_states() if states is None else states
+    pages = list(pages or PAGE_CHARTS)
+    init_plotly()
+    _load(path)
+
+    primeiros, resto = [], []
+    for page in pages:
+        dados = batch_data([page_state(page, s) for s in states], path)
+        primeiros += [(page, data) for data in dados[:1]]
+        resto += [(page, data) for data in dados[1:]]
+
+    ok = sum(_render(page, data) for page, data in primeiros)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='curry-warmup') as executor:
+        ok += sum(executor.map(lambda item: _render(*item), resto))
+    return ok
+
+def start_warmup(path=DATASET_PATH):
+    """
+        Esta função inicia o warm_up em segundo plano, uma única vez por
+        processo ( as chamadas seguintes não fazem nada ). As páginas chamam
+        na subida, para que o primeiro usuário depois de um deploy já
+        encontre os estados mais usados prontos.
+
+        A carga do plotly ( init_plotly ) é feita aqui, na thread da sessão,
+        mesmo com o pré-cálculo desligado: o prefetch das abas também monta
+        gráficos em segundo plano.
+
+        Input: caminho do csv
+        Output: a thread do pré-cálculo ou None ( desligado ou já iniciado )
+    """
+    global _started
+    init_plotly()
+    with _lock:
+        if _started or not WARMUP:
+            return None
+        _started = True
+
+    def executar():
+        try:
+            warm_up(path=path)
+        except Exception:
+            logger.exception('pré-cálculo falhou')
+
+    thread = threading.Thread(target=executar, name='curry-warmup', daemon=True)
+    thread.start()
+    return thread
+
+def main():
+    """
+        Linha de comando para conferir uma lista de estados e medir o tempo do
+        pré-cálculo ( o cache de renderização é do processo: no dashboard o
+        pré-cálculo roda na subida, com start_warmup ).
+
+        Uso: python -m utils.warmup --states estados.json
+    """
+    parser = argparse.ArgumentParser(description='Pré-calcula os gráficos dos estados mais usados dos filtros.')
+    parser.add_argument('--csv', default=DATASET_PATH)
+    parser.add_argument('--states', default=WARMUP_STATES, help='JSON com a lista de estados')
+    parser.add_argument('--pages', nargs='+', choices=list(PAGE_CHARTS))
+    parser.add_argument('--workers', type=int, default=WARMUP_WORKERS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    states = load_states(args.states)
+    inicio = time.perf_counter()
+    ok = warm_up(states, args.pages, args.csv, args.workers)
+    total = len(states) * len(args.pages or PAGE_CHARTS)
+    print(f'{ok}/{total} ( página, estado ) pré-calculados em {time.perf_counter() - inicio:.1f} s; '
+          f'cache: {RENDER_CACHE.stats()}')
+
+if __name__ == '__main__':
+    main()